@@ -83,9 +83,58 @@ DATABASES = {
     'default': {
         'ENGINE': config('DATABASE_ENGINE', default='django.db.backends.sqlite3'),
         'NAME': config('DATABASE_NAME', default=str(BASE_DIR / 'db.sqlite3')),
+        'USER': config('DATABASE_USER', default=''),
+        'PASSWORD': config('DATABASE_PASSWORD', default=''),
+        'HOST': config('DATABASE_HOST', default=''),
+        'PORT': config('DATABASE_PORT', default=''),
     }
 }
 
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    # Take the write lock when a transaction starts, so that concurrent
+    # workers (process_jobs, Passenger) wait for each other instead of
+    # failing with "database is locked"
+    DATABASES['default']['OPTIONS'] = {
+        'transaction_mode': 'IMMEDIATE',
+        'timeout': 20,
+    }
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# API responses are cached until content changes (see core/cache.py).
+# locmem is per process: on Passenger, where several workers run, use
+# CACHE_BACKEND=django.core.cache.backends.filebased.FileBasedCache so that
+# invalidations made from the admin are seen by every worker.
+# 'cache-state' holds the content generation (and the optional hit/miss
+# counters) apart from the responses, so that culling never evicts it.
+
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=str(BASE_DIR / 'cache')),
+        'OPTIONS': {
+            'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=1000, cast=int),
+        },
+    },
+    'cache-state': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_STATE_LOCATION', default=str(BASE_DIR / 'cache-state')),
+    },
+}
+RESPONSE_CACHE_TIMEOUT = config('RESPONSE_CACHE_TIMEOUT', default=86400, cast=int)  # seconds
+RESPONSE_CACHE_STATS = config('RESPONSE_CACHE_STATS', default=False, cast=bool)  # shared hit/miss counters
+
+# Precomputed API snapshots (see core/snapshots.py), regenerated from the
+# admin and served without touching the database. Snapshots embed absolute
+# media URLs, so API_BASE_URL must be the public URL of the backend.
+API_SNAPSHOTS = config('API_SNAPSHOTS', default=False, cast=bool)
+API_SNAPSHOT_ROOT = config('API_SNAPSHOT_ROOT', default=str(BASE_DIR / 'snapshots'))
+API_BASE_URL = config('API_BASE_URL', default='http://localhost:8000')
+
+# Static export of the public API (`manage.py export_api_snapshot`)
+API_EXPORT_ROOT = config('API_EXPORT_ROOT', default=str(BASE_DIR / 'api_export'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -126,8 +175,9 @@ STATIC_ROOT = os.path.join(str(BASE_DIR), 'staticfiles')
 
 # WhiteNoise configuration for serving static files
 STORAGES = {
+    # Uploads are named by content hash and deduplicated (core/storage.py)
     "default": {
-        "BACKEND": "django.core.files.storage.FileSystemStorage",
+        "BACKEND": "core.storage.ContentAddressedStorage",
     },
     "staticfiles": {
         "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
@@ -137,6 +187,38 @@ STORAGES = {
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(str(BASE_DIR), 'media')
 
+# Media served by core.media.serve_media. Set MEDIA_SENDFILE to 'x-sendfile'
+# (Apache mod_xsendfile) or 'x-accel-redirect' (nginx, internal location
+# MEDIA_ACCEL_PREFIX aliased to MEDIA_ROOT) to let the web server stream files.
+MEDIA_SENDFILE = config('MEDIA_SENDFILE', default='')
+MEDIA_ACCEL_PREFIX = config('MEDIA_ACCEL_PREFIX', default='/protected-media/')
+MEDIA_CACHE_MAX_AGE = config('MEDIA_CACHE_MAX_AGE', default=86400, cast=int)  # non content-hashed files
+
+# Widths (px) of the responsive WebP/JPEG derivatives generated for uploaded images
+IMAGE_DERIVATIVE_WIDTHS = [320, 640, 1280, 1920]
+
+# Background jobs (`python manage.py process_jobs`)
+JOB_WORKERS = config('JOB_WORKERS', default=2, cast=int)
+JOB_RETRY_DELAY = 30  # seconds, doubled after each failed attempt
+JOB_LOCK_TIMEOUT = 600  # seconds before a job held by a dead worker is retried
+
+# Contact form throttling (see core/throttling.py): token buckets of
+# (capacity, tokens regained per minute) per client IP and for all clients.
+# 'memory' keeps them per process, 'cache' shares them through CACHES.
+CONTACT_THROTTLE_RATES = {
+    'ip': (5, 1),
+    'global': (30, 10),
+}
+THROTTLE_BACKEND = config('THROTTLE_BACKEND', default='memory')
+
+# Contact notification outbox (`python manage.py process_outbox`)
+OUTBOX_BATCH_SIZE = config('OUTBOX_BATCH_SIZE', default=20, cast=int)  # emails sent per SMTP connection
+OUTBOX_RETRY_DELAY = 60  # seconds, doubled after each failed attempt
+OUTBOX_LOCK_TIMEOUT = 600  # seconds before an email held by a dead worker is retried
+
+# Project search (`/api/projects/search/?q=`, see core/search.py)
+SEARCH_MAX_RESULTS = config('SEARCH_MAX_RESULTS', default=50, cast=int)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -153,13 +235,29 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
+    # orjson, or DRF's stdlib JSON where it cannot be installed (see core/renderers.py)
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    # Reverse proxies in front of Django. Client IPs (contact throttling) are read
+    # from X-Forwarded-For only behind that many proxies, REMOTE_ADDR otherwise:
+    # left unset, DRF would trust a header any client can forge
+    'NUM_PROXIES': config('NUM_PROXIES', default=0, cast=int),
 }
 
 # Email settings - use console backend by default for development. You can
 # override these in your .env for SMTP in production (e.g. on cPanel).
 EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
 DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='no-reply@localhost')
-CONTACT_EMAIL = config('CONTACT_EMAIL', default='admin@example.com')
+# Recipient of contact notifications when SITE_OWNER_EMAIL is unset; without
+# either, messages are only stored (no placeholder address is ever mailed)
+CONTACT_EMAIL = config('CONTACT_EMAIL', default='')
 
 # SMTP options (only used when EMAIL_BACKEND points to an SMTP backend)
 EMAIL_HOST = config('EMAIL_HOST', default='')
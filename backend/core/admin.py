@@ -1,10 +1,81 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from django.forms.models import BaseInlineFormSet
+from django.utils import timezone
 from django.utils.html import format_html
-from .models import CompanyInfo, Service, Project, ProjectImage, Testimonial, ContactMessage, GalleryImage
+from .models import (
+    CompanyInfo, Service, Project, ProjectImage, Testimonial, ContactMessage, GalleryImage, Job, OutboxEmail,
+)
+from .images import derivative_url, image_names, load_derivatives
+from .outbox import requeue
+from .snapshots import affected_endpoints, refresh_snapshots, snapshots_enabled
+
+
+class SnapshotAdminMixin:
+    """Regenerate the API snapshots affected by every change made in the admin"""
+
+    def save_model(self, request, obj, form, change):
+        if snapshots_enabled() and obj.pk:
+            # Endpoints of the previous version (e.g. old slug) must be refreshed too
+            previous = type(obj).objects.filter(pk=obj.pk).first()
+            obj._previous_snapshot_endpoints = affected_endpoints(previous) if previous else set()
+        super().save_model(request, obj, form, change)
+
+    def save_related(self, request, form, formsets, change):
+        # Called after save_model and the inlines, including from list_editable
+        super().save_related(request, form, formsets, change)
+        if snapshots_enabled():
+            obj = form.instance
+            refresh_snapshots(getattr(obj, '_previous_snapshot_endpoints', set()) | affected_endpoints(obj))
+
+    def delete_model(self, request, obj):
+        endpoints = affected_endpoints(obj) if snapshots_enabled() else set()
+        super().delete_model(request, obj)
+        if endpoints:
+            refresh_snapshots(endpoints)
+
+    def delete_queryset(self, request, queryset):
+        endpoints = set()
+        if snapshots_enabled():
+            for obj in queryset:
+                endpoints |= affected_endpoints(obj)
+        super().delete_queryset(request, queryset)
+        if endpoints:
+            refresh_snapshots(endpoints)
+
+
+def attach_derivatives(objs, names=()):
+    """Load the derivatives of the images of `objs` (and `names`) in one query, attached as `_derivatives`"""
+    names = [name for obj in objs for name in image_names(obj)] + list(names)
+    derivatives = load_derivatives({}, names)
+    for obj in objs:
+        obj._derivatives = derivatives
+    return derivatives
+
+
+def thumbnail(obj, field, width, style, derivatives=None):
+    """<img> of a generated derivative of an image field, the original until derivatives exist"""
+    file = getattr(obj, field)
+    if not file:
+        return "-"
+    if derivatives is None:
+        derivatives = getattr(obj, '_derivatives', None)
+    if derivatives is None or file.name not in derivatives:
+        derivatives = attach_derivatives([obj])
+    # Twice the displayed width for high density screens
+    url = derivative_url(derivatives[file.name], width * 2) or file.url
+    return format_html('<img src="{}" loading="lazy" style="{}" />', url, style)
+
+
+class ThumbnailChangeList(ChangeList):
+    def get_results(self, request):
+        super().get_results(request)
+        # One query for the thumbnails of the whole page
+        attach_derivatives(self.result_list)
 
 
 @admin.register(CompanyInfo)
-class CompanyInfoAdmin(admin.ModelAdmin):
+class CompanyInfoAdmin(SnapshotAdminMixin, admin.ModelAdmin):
     list_display = ['company_name', 'phone', 'email', 'updated_at']
     fieldsets = (
         ('Informations générales', {
@@ -31,7 +102,7 @@ class CompanyInfoAdmin(admin.ModelAdmin):
 
 
 @admin.register(Service)
-class ServiceAdmin(admin.ModelAdmin):
+class ServiceAdmin(SnapshotAdminMixin, admin.ModelAdmin):
     list_display = ['title', 'order', 'is_active', 'updated_at']
     list_filter = ['is_active']
     search_fields = ['title', 'description']
@@ -40,26 +111,39 @@ class ServiceAdmin(admin.ModelAdmin):
     ordering = ['order', 'title']
 
 
+class ProjectImageFormSet(BaseInlineFormSet):
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        for image in queryset:
+            # Rows share the edited project: no query per row for __str__ and previews
+            image.project = self.instance
+        return queryset
+
+
 class ProjectImageInline(admin.TabularInline):
     model = ProjectImage
+    formset = ProjectImageFormSet
     extra = 1
-    fields = ['image', 'caption', 'is_visible', 'order']
+    fields = ['image', 'image_preview', 'caption', 'is_visible', 'order']
     readonly_fields = ['image_preview']
     
     def image_preview(self, obj):
-        if obj.image:
-            return format_html('<img src="{}" style="max-height: 100px; max-width: 150px;" />', obj.image.url)
-        return "-"
+        if not obj.image:
+            return "-"
+        # Derivatives of every project image are loaded with the project (ProjectAdmin.get_object)
+        return thumbnail(obj, 'image', 150, 'max-height: 100px; max-width: 150px;',
+                         derivatives=getattr(obj.project, '_derivatives', None))
     image_preview.short_description = "Aperçu"
 
 
 @admin.register(Project)
-class ProjectAdmin(admin.ModelAdmin):
+class ProjectAdmin(SnapshotAdminMixin, admin.ModelAdmin):
     list_display = ['title', 'service', 'location', 'completion_date', 'has_before_after', 'is_featured', 'is_active', 'order']
     list_filter = ['is_active', 'is_featured', 'has_before_after', 'service', 'completion_date']
     search_fields = ['title', 'description', 'location', 'slug']
     prepopulated_fields = {'slug': ('title',)}
     list_editable = ['is_featured', 'is_active', 'order']
+    list_select_related = ['service']
     ordering = ['-is_featured', 'order', '-completion_date']
     inlines = [ProjectImageInline]
     readonly_fields = ['featured_image_preview', 'before_image_preview']
@@ -81,34 +165,39 @@ class ProjectAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_object(self, request, object_id, from_field=None):
+        obj = super().get_object(request, object_id, from_field)
+        if obj is not None:
+            # Thumbnails of the project and of its inline images in one query
+            attach_derivatives([obj], obj.images.values_list('image', flat=True))
+        return obj
+    
     def featured_image_preview(self, obj):
-        if obj.featured_image:
-            return format_html('<img src="{}" style="max-height: 200px; max-width: 300px;" />', obj.featured_image.url)
-        return "-"
+        return thumbnail(obj, 'featured_image', 300, 'max-height: 200px; max-width: 300px;')
     featured_image_preview.short_description = "Aperçu image principale"
     
     def before_image_preview(self, obj):
-        if obj.before_image:
-            return format_html('<img src="{}" style="max-height: 200px; max-width: 300px;" />', obj.before_image.url)
-        return "-"
+        return thumbnail(obj, 'before_image', 300, 'max-height: 200px; max-width: 300px;')
     before_image_preview.short_description = "Aperçu image avant"
 
 
 @admin.register(Testimonial)
-class TestimonialAdmin(admin.ModelAdmin):
+class TestimonialAdmin(SnapshotAdminMixin, admin.ModelAdmin):
     list_display = ['client_name', 'client_location', 'rating', 'project', 'is_active', 'order']
     list_filter = ['is_active', 'rating']
     search_fields = ['client_name', 'client_location', 'content']
     list_editable = ['is_active', 'order']
+    list_select_related = ['project']
     ordering = ['order', '-created_at']
 
 
 @admin.register(GalleryImage)
-class GalleryImageAdmin(admin.ModelAdmin):
+class GalleryImageAdmin(SnapshotAdminMixin, admin.ModelAdmin):
     list_display = ['title', 'linked_project', 'category', 'is_active', 'order', 'image_thumbnail']
     list_filter = ['is_active', 'category', 'linked_project']
     search_fields = ['title', 'caption']
     list_editable = ['is_active', 'order']
+    list_select_related = ['linked_project']
     ordering = ['order', '-created_at']
     readonly_fields = ['image_preview']
     autocomplete_fields = ['linked_project']
@@ -126,29 +215,83 @@ class GalleryImageAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_changelist(self, request, **kwargs):
+        return ThumbnailChangeList
+    
     def image_thumbnail(self, obj):
-        if obj.image:
-            return format_html('<img src="{}" style="max-height: 50px; max-width: 75px; border-radius: 4px;" />', obj.image.url)
-        return "-"
+        return thumbnail(obj, 'image', 75, 'max-height: 50px; max-width: 75px; border-radius: 4px;')
     image_thumbnail.short_description = "Image"
     
     def image_preview(self, obj):
-        if obj.image:
-            return format_html('<img src="{}" style="max-height: 300px; max-width: 450px;" />', obj.image.url)
-        return "-"
+        return thumbnail(obj, 'image', 450, 'max-height: 300px; max-width: 450px;')
     image_preview.short_description = "Aperçu"
 
 
+class OutboxEmailInline(admin.TabularInline):
+    model = OutboxEmail
+    extra = 0
+    can_delete = False
+    fields = ['recipient', 'status', 'attempts', 'run_after', 'sent_at', 'last_error']
+    readonly_fields = fields
+    
+    def has_add_permission(self, request, obj=None):
+        # Notifications are queued with the message
+        return False
+
+
 @admin.register(ContactMessage)
 class ContactMessageAdmin(admin.ModelAdmin):
-    list_display = ['name', 'email', 'subject', 'status', 'created_at']
-    list_filter = ['status', 'created_at']
+    list_display = ['name', 'email', 'subject', 'status', 'notification_status', 'created_at']
+    list_filter = ['status', 'notifications__status', 'created_at']
     search_fields = ['name', 'email', 'subject', 'message']
     list_editable = ['status']
     ordering = ['-created_at']
     readonly_fields = ['name', 'email', 'phone', 'subject', 'message', 'created_at']
+    inlines = [OutboxEmailInline]
+    actions = ['resend_notifications']
     
     def has_add_permission(self, request):
         # Messages are created via the frontend only
         return False
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related('notifications')
+    
+    def notification_status(self, obj):
+        notifications = list(obj.notifications.all())
+        if not notifications:
+            return "-"
+        dead = [email for email in notifications if email.status == 'dead']
+        if dead:
+            return format_html('<strong style="color: #ba2121;">{}</strong>', dead[0].get_status_display())
+        return ", ".join(email.get_status_display() for email in notifications)
+    notification_status.short_description = "Notification"
+    
+    @admin.action(description="Renvoyer les notifications non envoyées")
+    def resend_notifications(self, request, queryset):
+        updated = requeue(OutboxEmail.objects.filter(message__in=queryset))
+        self.message_user(request, f"{updated} notification(s) remise(s) en file d'envoi")
 
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['key', 'kind', 'status', 'attempts', 'run_after', 'updated_at']
+    list_filter = ['status', 'kind']
+    search_fields = ['key', 'last_error']
+    ordering = ['-created_at']
+    readonly_fields = ['key', 'kind', 'payload', 'status', 'attempts', 'max_attempts', 'run_after',
+                       'locked_by', 'locked_at', 'last_error', 'created_at', 'updated_at']
+    actions = ['retry_jobs']
+    
+    def has_add_permission(self, request):
+        # Jobs are queued by the application only
+        return False
+    
+    @admin.action(description="Relancer les tâches sélectionnées")
+    def retry_jobs(self, request, queryset):
+        now = timezone.now()
+        # update() skips auto_now
+        updated = queryset.exclude(status='running').update(
+            status='pending', attempts=0, run_after=now, last_error='', updated_at=now,
+        )
+        self.message_user(request, f"{updated} tâche(s) relancée(s)")
@@ -0,0 +1,141 @@
+"""
+Response cache for the public read-only API.
+
+Every cached response is keyed on a global "content generation" counter.
+The counter is bumped by signals (see core/signals.py) whenever a content
+model is saved or deleted, so older entries simply stop being looked up:
+cached JSON is never stale.
+
+The counter lives in its own cache alias ('cache-state'), which only holds
+a few keys and is never culled, while responses may be culled when the
+response cache is full. Should the counter still be lost (cache cleared,
+restart with locmem), it restarts from the current time in milliseconds,
+never from a value older entries were stored under. Responses also expire
+after RESPONSE_CACHE_TIMEOUT seconds so that culled-out generations do not
+linger.
+
+Hit/miss counters are shared through the state cache too, which costs a
+write per request: they are only kept with RESPONSE_CACHE_STATS = True.
+
+Works with any Django cache backend. Use locmem for a single process and a
+shared backend (file-based on Passenger) when several workers serve the API.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+CACHE_ALIAS = 'default'
+STATE_CACHE_ALIAS = 'cache-state'
+GENERATION_KEY = 'core:content-generation'
+HITS_KEY = 'core:response-cache:hits'
+MISSES_KEY = 'core:response-cache:misses'
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def _state_cache():
+    return caches[STATE_CACHE_ALIAS]
+
+
+def _incr(key, initial=0):
+    """Increment a counter of the state cache, creating it at `initial` if needed. Returns the new value."""
+    cache = _state_cache()
+    cache.add(key, initial, None)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Key was evicted between add() and incr(), or the backend is a dummy
+        cache.set(key, initial + 1, None)
+        return initial + 1
+
+
+def _fresh_generation():
+    # Later than any generation handed out before, even if the counter was lost
+    return int(time.time() * 1000)
+
+
+def get_content_generation():
+    """Return the current content generation"""
+    generation = _state_cache().get(GENERATION_KEY)
+    if generation is None:
+        _state_cache().add(GENERATION_KEY, _fresh_generation(), None)
+        generation = _state_cache().get(GENERATION_KEY)
+    return generation
+
+
+def bump_content_generation():
+    """Invalidate every cached response by moving to a new generation"""
+    return _incr(GENERATION_KEY, initial=_fresh_generation())
+
+
+def _count(key):
+    if settings.RESPONSE_CACHE_STATS:
+        _incr(key)
+
+
+def response_cache_stats():
+    """Return hit/miss counters (zero unless RESPONSE_CACHE_STATS) and the current generation"""
+    cache = _state_cache()
+    return {
+        'generation': get_content_generation(),
+        'hits': cache.get(HITS_KEY, 0),
+        'misses': cache.get(MISSES_KEY, 0),
+    }
+
+
+def reset_response_cache_stats():
+    _state_cache().delete_many([HITS_KEY, MISSES_KEY])
+
+
+def response_cache_key(request):
+    """Build the cache key for a request within the current generation"""
+    # The absolute URI is used because serializers embed absolute media URLs
+    raw = '|'.join([request.build_absolute_uri(), request.META.get('HTTP_ACCEPT', '')])
+    digest = hashlib.md5(raw.encode('utf-8')).hexdigest()
+    return f'core:response:{get_content_generation()}:{digest}'
+
+
+class CachedResponseMixin:
+    """
+    Serve GET requests of a read-only viewset from the response cache.
+    Only successful responses are stored. Each response carries an
+    `X-Cache: HIT|MISS` header.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method != 'GET':
+            return super().dispatch(request, *args, **kwargs)
+
+        key = response_cache_key(request)
+        cached = _cache().get(key)
+        if cached is not None:
+            _count(HITS_KEY)
+            content, status, headers = cached
+            response = HttpResponse(content, status=status)
+            for header, value in headers:
+                response[header] = value
+            response['X-Cache'] = 'HIT'
+            # Honour If-None-Match / If-Modified-Since against the stored validators
+            return get_conditional_response(
+                request,
+                etag=response.get('ETag'),
+                last_modified=parse_http_date_safe(response.get('Last-Modified', '')),
+                response=response,
+            )
+
+        _count(MISSES_KEY)
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code == 200:
+            response.render()
+            _cache().set(
+                key, (response.content, response.status_code, list(response.items())), settings.RESPONSE_CACHE_TIMEOUT,
+            )
+        response['X-Cache'] = 'MISS'
+        return response
@@ -0,0 +1,110 @@
+"""
+Margin cropping for imported photos and screenshots.
+
+A pixel is margin when its squared RGB distance to one of MARGIN_COLORS is
+at most MARGIN_TOLERANCE². The content bounding box is found by scanning
+inward from each border in strips of about STRIP_PIXELS pixels: rows from
+the top and bottom, then columns from the left and right between those rows.
+Only the margins and the first strip of content on each side are examined,
+and the working memory is bounded by the strip size, whatever the image
+size. Distances are computed by Pillow in 8-bit integer arithmetic (lookup
+tables and saturating adds), with no float or full-size arrays.
+"""
+from PIL import ImageChops
+
+MARGIN_COLORS = (
+    (0, 0, 0),         # #000000 - Pure black (sides)
+    (36, 37, 39),      # #242527 - Dark gray (top/bottom)
+    (104, 105, 107),   # #68696b - iPhone notch area
+)
+# Allow for compression artifacts and slight color variations
+MARGIN_TOLERANCE = 15
+# Padding kept around the content to avoid cutting it
+CROP_PADDING = 2
+# Pixels examined per strip (about 1 MB per 8-bit working image)
+STRIP_PIXELS = 1 << 20
+
+
+def _square_table(value):
+    """Lookup table of min((v - value)², 255) for the 256 channel values"""
+    return [min((v - value) ** 2, 255) for v in range(256)]
+
+
+class MarginDetector:
+
+    def __init__(self, colors=MARGIN_COLORS, tolerance=MARGIN_TOLERANCE, strip_pixels=STRIP_PIXELS):
+        if tolerance ** 2 >= 255:
+            # Squared distances saturate at 255 in 8-bit images
+            raise ValueError('tolerance must be at most 15')
+        self.strip_pixels = strip_pixels
+        self.tables = [[_square_table(channel) for channel in color] for color in colors]
+        self.threshold = [255 if v <= tolerance ** 2 else 0 for v in range(256)]
+
+    def content_mask(self, region):
+        """8-bit mask of `region`, non-zero where pixels are not margin"""
+        bands = region.convert('RGB').split()
+        margin = None
+        for tables in self.tables:
+            distance = None
+            for band, table in zip(bands, tables):
+                squared = band.point(table)
+                distance = squared if distance is None else ImageChops.add(distance, squared)
+            matches = distance.point(self.threshold)
+            margin = matches if margin is None else ImageChops.lighter(margin, matches)
+        return ImageChops.invert(margin)
+
+    def strip_bbox(self, img, box):
+        bbox = self.content_mask(img.crop(box)).getbbox()
+        if bbox is None:
+            return None
+        return bbox[0] + box[0], bbox[1] + box[1], bbox[2] + box[0], bbox[3] + box[1]
+
+    def content_bbox(self, img):
+        """(left, top, right, bottom) of the content, right/bottom exclusive; None if all margin"""
+        width, height = img.size
+        rows = max(1, self.strip_pixels // width)
+
+        top = None
+        for y in range(0, height, rows):
+            bbox = self.strip_bbox(img, (0, y, width, min(y + rows, height)))
+            if bbox:
+                top = bbox[1]
+                break
+        if top is None:
+            return None
+
+        bottom = top + 1
+        for y in range(height, top, -rows):
+            bbox = self.strip_bbox(img, (0, max(top, y - rows), width, y))
+            if bbox:
+                bottom = bbox[3]
+                break
+
+        columns = max(1, self.strip_pixels // (bottom - top))
+        left = 0
+        for x in range(0, width, columns):
+            bbox = self.strip_bbox(img, (x, top, min(x + columns, width), bottom))
+            if bbox:
+                left = bbox[0]
+                break
+
+        right = left + 1
+        for x in range(width, left, -columns):
+            bbox = self.strip_bbox(img, (max(left, x - columns), top, x, bottom))
+            if bbox:
+                right = bbox[2]
+                break
+        return left, top, right, bottom
+
+
+def crop_margins(img, padding=CROP_PADDING, detector=None):
+    """`img` cropped to its content plus `padding` pixels; unchanged if it is all margin"""
+    bbox = (detector or MarginDetector()).content_bbox(img)
+    if bbox is None:
+        return img
+    left, top, right, bottom = bbox
+    width, height = img.size
+    return img.crop((
+        max(0, left - padding), max(0, top - padding),
+        min(width, right + padding), min(height, bottom + padding),
+    ))
@@ -0,0 +1,154 @@
+"""
+Sparse fieldsets of the public API.
+
+    /api/projects/?fields=slug,title,featured_image_url,featured_image_srcset,service_name
+    /api/projects/<slug>/?omit=description,images
+    /api/services/?compact=1
+
+`fields` keeps only the listed fields of each item and `omit` drops some.
+`compact` drops the fields repeating what the response already says: raw
+image paths next to their absolute `<name>_url`, `is_active` (always true
+in public responses) and the timestamps (sent as Last-Modified). `fields`
+and `omit` apply to the top-level items, `compact` to nested ones too.
+Unknown field names are answered 400.
+
+Aggregate endpoints such as /api/home/ treat their sections as the
+top-level fields: `fields` and `omit` select sections (skipping their
+queries) and `compact` applies to the items of every section.
+
+    /api/home/?fields=services,featured_projects&compact=1
+
+Viewsets then select only the columns read by the remaining fields, so list
+endpoints no longer fetch large TextFields such as `description`.
+"""
+from collections import namedtuple
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+COMPACT_OMIT = ('is_active', 'created_at', 'updated_at')
+
+Fieldset = namedtuple('Fieldset', ['fields', 'omit', 'compact'])
+
+
+def field_names(value):
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def parse_fieldset(query_params):
+    """The Fieldset requested by `fields`, `omit` and `compact`, or None"""
+    if not {'fields', 'omit', 'compact'} & set(query_params):
+        return None
+    try:
+        compact = serializers.BooleanField().run_validation(query_params.get('compact', 'false'))
+    except serializers.ValidationError as e:
+        raise serializers.ValidationError({'compact': e.detail})
+    fields = field_names(query_params['fields']) if 'fields' in query_params else None
+    return Fieldset(fields, field_names(query_params.get('omit', '')), compact)
+
+
+def check_names(fieldset, available):
+    """Answer 400 for names of `fields` or `omit` that are not in `available`"""
+    for param, names in (('fields', fieldset.fields or []), ('omit', fieldset.omit)):
+        unknown = [name for name in names if name not in available]
+        if unknown:
+            raise serializers.ValidationError({param: f"Champs inconnus : {', '.join(unknown)}"})
+
+
+def select_sections(fieldset, sections):
+    """
+    The `sections` of an aggregate response kept by `fieldset`, and the
+    fieldset for the serializers of the sections (only `compact` remains)
+    """
+    if not fieldset:
+        return list(sections), None
+    check_names(fieldset, sections)
+    kept = [
+        name for name in sections
+        if (fieldset.fields is None or name in fieldset.fields) and name not in fieldset.omit
+    ]
+    return kept, Fieldset(None, [], fieldset.compact)
+
+
+class SparseFieldsetSerializerMixin:
+    """
+    Fields restricted by the `fieldset` of the serializer context. Fields
+    computed from model columns other than their own name declare them in
+    Meta.column_sources, e.g. {'image_url': ['image']}.
+    """
+
+    def is_root(self):
+        parent = self.parent
+        return parent is None or (isinstance(parent, serializers.ListSerializer) and parent.parent is None)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        fieldset = self.context.get('fieldset')
+        if not fieldset:
+            return fields
+
+        if self.is_root():
+            check_names(fieldset, fields)
+            if fieldset.fields is not None:
+                # Explicitly requested fields are kept, even in compact mode
+                return {name: field for name, field in fields.items() if name in fieldset.fields}
+            for name in fieldset.omit:
+                fields.pop(name)
+        if fieldset.compact:
+            for name in [name for name in fields if name in COMPACT_OMIT or f'{name}_url' in fields]:
+                fields.pop(name)
+        return fields
+
+    def query_columns(self):
+        """Model fields read by the selected fields as .only() lookups, None when unknown"""
+        model = self.Meta.model
+        column_sources = getattr(self.Meta, 'column_sources', {})
+        columns = {model._meta.pk.name}
+        for name, field in self.fields.items():
+            if name in column_sources:
+                columns.update(column_sources[name])
+                continue
+            if field.source == '*':
+                return None
+            try:
+                model_field = model._meta.get_field(field.source_attrs[0])
+            except FieldDoesNotExist:
+                return None
+            if model_field.one_to_many or model_field.many_to_many:
+                # Prefetched by the view
+                continue
+            columns.add(field.source_attrs[0])
+            if len(field.source_attrs) > 1:
+                columns.add('__'.join(field.source_attrs))
+        return columns
+
+
+def serialized_queryset(queryset, serializer):
+    """`queryset` restricted to the columns read by `serializer`, when it knows them"""
+    columns = serializer.query_columns() if hasattr(serializer, 'query_columns') else None
+    if columns is None:
+        return queryset
+    return restrict_columns(queryset, columns)
+
+
+def restrict_columns(queryset, columns):
+    """`queryset` loading only `columns`, the ordering columns and the relations they traverse"""
+    ordering = queryset.query.order_by or queryset.model._meta.ordering
+    columns = set(columns) | {name.lstrip('-') for name in ordering if isinstance(name, str)}
+    relations = sorted({column.split('__')[0] for column in columns if '__' in column})
+    queryset = queryset.select_related(None)
+    if relations:
+        queryset = queryset.select_related(*relations)
+    return queryset.only(*columns)
+
+
+class SparseFieldsetMixin:
+    """Pass the requested fieldset to the serializer and fetch only the columns it reads"""
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fieldset'] = parse_fieldset(self.request.query_params)
+        return context
+
+    def get_queryset(self):
+        return serialized_queryset(super().get_queryset(), self.get_serializer())
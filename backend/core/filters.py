@@ -0,0 +1,73 @@
+"""
+Query-parameter filtering of the public list endpoints.
+
+Each filter is a serializer validating the query string (unknown parameters
+such as `cursor` or `page` are ignored, invalid values are answered 400)
+and translating it into conditions on indexed columns:
+
+    /api/projects/?service=cuisine&year_min=2022&year_max=2024&has_before_after=true&location=Évry
+    /api/gallery/?category=showcase&project=projet-3
+
+Years become a range on `completion_date` rather than a function of it, and
+slugs are matched through the unique slug index of the related table.
+Filtered lists keep keyset pagination, response caching and conditional GET
+since all three work from the full request URL.
+"""
+from datetime import date
+
+from rest_framework import serializers
+from rest_framework.filters import BaseFilterBackend
+
+from .models import GalleryImage
+
+
+class ProjectFilter(serializers.Serializer):
+    service = serializers.SlugField(required=False)
+    location = serializers.CharField(required=False, max_length=200)
+    year_min = serializers.IntegerField(required=False, min_value=1900, max_value=2100)
+    year_max = serializers.IntegerField(required=False, min_value=1900, max_value=2100)
+    has_before_after = serializers.BooleanField(required=False)
+
+    def validate(self, attrs):
+        if attrs.get('year_min', 0) > attrs.get('year_max', 2100):
+            raise serializers.ValidationError({'year_max': 'Doit être supérieur ou égal à year_min.'})
+        return attrs
+
+    def filter_queryset(self, queryset, data):
+        if 'service' in data:
+            queryset = queryset.filter(service__slug=data['service'])
+        if 'location' in data:
+            queryset = queryset.filter(location=data['location'])
+        if 'year_min' in data:
+            queryset = queryset.filter(completion_date__gte=date(data['year_min'], 1, 1))
+        if 'year_max' in data:
+            queryset = queryset.filter(completion_date__lt=date(data['year_max'] + 1, 1, 1))
+        if 'has_before_after' in data:
+            queryset = queryset.filter(has_before_after=data['has_before_after'])
+        return queryset
+
+
+class GalleryImageFilter(serializers.Serializer):
+    category = serializers.ChoiceField(required=False, choices=GalleryImage.CATEGORY_CHOICES)
+    project = serializers.SlugField(required=False)
+
+    def filter_queryset(self, queryset, data):
+        if 'category' in data:
+            queryset = queryset.filter(category=data['category'])
+        if 'project' in data:
+            queryset = queryset.filter(linked_project__slug=data['project'])
+        return queryset
+
+
+class QueryParamFilterBackend(BaseFilterBackend):
+    """Filter list requests with the view's `filter_class`"""
+
+    def filter_queryset(self, request, queryset, view):
+        filter_class = getattr(view, 'filter_class', None)
+        if filter_class is None or getattr(view, 'action', None) != 'list':
+            return queryset
+        # A plain dict: with a QueryDict, absent booleans would read as False
+        params = {name: value for name, value in request.query_params.dict().items() if value != ''}
+        filters = filter_class(data=params)
+        filters.is_valid(raise_exception=True)
+        return filters.filter_queryset(queryset, filters.validated_data)
@@ -0,0 +1,155 @@
+"""
+Responsive image derivatives.
+
+Every uploaded image (Project.featured_image, Project.before_image,
+ProjectImage.image and GalleryImage.image) is resized to the widths in
+IMAGE_DERIVATIVE_WIDTHS, encoded as WebP and JPEG, and recorded as
+ImageDerivative rows keyed on the source file name. Generation runs in the
+background job queue (core/jobs.py). Serializers expose the derivatives as
+srcset strings through SrcsetField.
+"""
+import hashlib
+import re
+from io import BytesIO
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Q
+from PIL import Image
+
+from .imaging import displayed_size, load_image
+from .models import Project, ProjectImage, GalleryImage, ImageDerivative
+
+# Image fields that get derivatives, per model
+IMAGE_FIELDS = {
+    Project: ('featured_image', 'before_image'),
+    ProjectImage: ('image',),
+    GalleryImage: ('image',),
+}
+
+# Pillow format name and encoder options per derivative format
+DERIVATIVE_FORMATS = {
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+# Derivative file names, <stem>_<width>w.<12 hex of their SHA-256>.<ext> under
+# ImageDerivative.file's upload_to: their URL changes with their content
+DERIVATIVE_NAME_RE = re.compile(
+    r'^derivatives/(?:[^/]+/)*[^/]+_\d+w\.[0-9a-f]{12}\.(?:%s)$'
+    % '|'.join(extension for _, extension, _ in DERIVATIVE_FORMATS.values())
+)
+
+
+def image_names(instance):
+    """Storage names of the images of `instance` that get derivatives"""
+    names = []
+    for field in IMAGE_FIELDS.get(type(instance), ()):
+        file = getattr(instance, field)
+        if file:
+            names.append(file.name)
+    return names
+
+
+def derivative_widths(original_width):
+    """Configured widths not larger than the original (never upscale)"""
+    widths = [width for width in settings.IMAGE_DERIVATIVE_WIDTHS if width <= original_width]
+    return widths or [original_width]
+
+
+def generate_derivatives(name, storage=default_storage):
+    """(Re)generate every derivative of the stored image `name`"""
+    with storage.open(name) as fh:
+        image = Image.open(fh)
+        widths = derivative_widths(displayed_size(image)[0])
+        # Decode at the smallest scale still covering the largest derivative
+        image = load_image(image, min_size=(max(widths), 0)).convert('RGB')
+
+    stem = Path(name).stem
+    derivatives = []
+    # Largest first, each step resized from the previous one to keep it cheap
+    for width in sorted(widths, reverse=True):
+        height = max(1, round(image.height * width / image.width))
+        image = image.resize((width, height), Image.Resampling.LANCZOS)
+        for fmt, (pil_format, extension, options) in DERIVATIVE_FORMATS.items():
+            buffer = BytesIO()
+            image.save(buffer, pil_format, **options)
+            content = buffer.getvalue()
+            # Content-hashed name (DERIVATIVE_NAME_RE), cached as immutable by core/media.py
+            digest = hashlib.sha256(content).hexdigest()[:12]
+            derivative = ImageDerivative(source=name, format=fmt, width=width, height=height)
+            derivative.file.save(f'{stem}_{width}w.{digest}.{extension}', ContentFile(content), save=False)
+            derivatives.append(derivative)
+
+    with transaction.atomic():
+        previous = list(ImageDerivative.objects.filter(source=name))
+        ImageDerivative.objects.filter(pk__in=[derivative.pk for derivative in previous]).delete()
+        ImageDerivative.objects.bulk_create(derivatives)
+    # Once the new rows exist: identical content has the same content-addressed
+    # name, and those files are kept as still in use
+    delete_files(previous)
+    return derivatives
+
+
+def delete_derivatives(names):
+    """Delete the derivative rows and files of the given source images"""
+    derivatives = list(ImageDerivative.objects.filter(source__in=names))
+    # Rows first: a content-addressed file is only removed once unreferenced
+    ImageDerivative.objects.filter(pk__in=[derivative.pk for derivative in derivatives]).delete()
+    delete_files(derivatives)
+
+
+def delete_files(derivatives):
+    for derivative in derivatives:
+        derivative.file.delete(save=False)
+
+
+def file_in_use(name):
+    """Whether a model row still references the stored file `name`"""
+    for model, fields in IMAGE_FIELDS.items():
+        condition = Q()
+        for field in fields:
+            condition |= Q(**{field: name})
+        if model.objects.filter(condition).exists():
+            return True
+    return ImageDerivative.objects.filter(file=name).exists()
+
+
+def missing_derivatives(names):
+    """Source names among `names` that have no derivatives yet"""
+    existing = set(
+        ImageDerivative.objects.filter(source__in=names).values_list('source', flat=True).distinct()
+    )
+    return [name for name in names if name not in existing]
+
+
+def load_derivatives(context, names):
+    """
+    Fetch the derivatives of `names` into the serializer context in a single
+    query, skipping names already loaded. Returns the context cache
+    {source: {format: [(width, url), ...]}}.
+    """
+    loaded = context.setdefault('image_derivatives', {})
+    missing = {name for name in names if name and name not in loaded}
+    if missing:
+        for name in missing:
+            loaded[name] = {}
+        for derivative in ImageDerivative.objects.filter(source__in=missing).only(
+            'source', 'format', 'width', 'file'
+        ):
+            loaded[derivative.source].setdefault(derivative.format, []).append(
+                (derivative.width, derivative.file.url)
+            )
+    return loaded
+
+
+def derivative_url(variants, min_width):
+    """URL of the smallest derivative at least `min_width` wide (else the largest), WebP first"""
+    for fmt in DERIVATIVE_FORMATS:
+        widths = sorted(variants.get(fmt, []))
+        if widths:
+            return next((url for width, url in widths if width >= min_width), widths[-1][1])
+    return None
@@ -0,0 +1,54 @@
+"""
+Image loading shared by the import command and derivative generation.
+
+Images are decoded once, at the smallest resolution that still covers the
+size the caller needs: JPEG files use draft mode (DCT scaling by 1/2, 1/4
+or 1/8 while decoding), other formats are shrunk right after decoding
+with Image.reduce(). EXIF orientation is applied once, so callers work on
+upright pixels and saved files carry no orientation tag.
+"""
+from PIL import ExifTags, Image, ImageOps
+
+# EXIF orientations that swap width and height
+TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}
+
+
+def orientation(img):
+    return img.getexif().get(ExifTags.Base.Orientation, 1)
+
+
+def displayed_size(img):
+    """(width, height) of an opened image once EXIF orientation is applied"""
+    width, height = img.size
+    if orientation(img) in TRANSPOSED_ORIENTATIONS:
+        return height, width
+    return width, height
+
+
+def load_image(img, min_size=None):
+    """
+    Decode an opened image, upright. With `min_size` (width, height in
+    displayed orientation, 0 for unconstrained) the result may be smaller
+    than the original but is never smaller than `min_size`.
+    """
+    transposed = orientation(img) in TRANSPOSED_ORIENTATIONS
+    if min_size:
+        width, height = min_size
+        if transposed:
+            width, height = height, width
+        width, height = max(1, width), max(1, height)
+        if img.format == 'JPEG':
+            img.draft(img.mode, (width, height))
+        img.load()
+        factor = min(img.width // width, img.height // height)
+        if factor >= 2:
+            img = img.reduce(factor)
+    else:
+        img.load()
+    ImageOps.exif_transpose(img, in_place=True)
+    return img
+
+
+def open_image(fp, min_size=None):
+    """Open and decode an image file (path or file object), see load_image"""
+    return load_image(Image.open(fp), min_size)
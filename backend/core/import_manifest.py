@@ -0,0 +1,90 @@
+"""
+Manifest of the images stored by `import_project_images`.
+
+For every media name the import produces, the manifest records its source
+file (path, size, mtime and SHA-256) and the stored file name, along with
+the processing parameters (crop settings, encoder options) in effect. An
+incremental import reuses the stored file of every image whose source and
+parameters are unchanged instead of cropping and encoding it again. Sources
+are only re-hashed when their size or mtime changed. It also records the
+rows the import created (hero images by title, project images by project
+slug) so that an incremental import only ever deletes its own rows.
+"""
+import hashlib
+import json
+from pathlib import Path
+
+from django.core.files.storage import default_storage
+
+MANIFEST_VERSION = 1
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ImportManifest:
+
+    def __init__(self, path, params, storage=default_storage):
+        self.path = Path(path)
+        # Compared with the JSON round-tripped value stored in the file
+        self.params = json.loads(json.dumps(params))
+        self.storage = storage
+        self.previous = {}
+        self.gallery = {}
+        self.project_images = {}
+        self.params_changed = False
+        if self.path.exists():
+            data = json.loads(self.path.read_text(encoding='utf-8'))
+            if data.get('version') == MANIFEST_VERSION:
+                self.previous = data.get('images', {})
+                self.gallery = data.get('gallery', {})
+                self.project_images = data.get('project_images', {})
+                self.params_changed = data.get('params') != self.params
+        self.images = {}
+        self.sources = {}
+
+    def fingerprint(self, name, img_path):
+        """Source fingerprint of `name`, reusing the previous hash when size and mtime match"""
+        stat = img_path.stat()
+        fingerprint = {'source': str(img_path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+        previous = self.previous.get(name)
+        if previous and all(previous.get(key) == value for key, value in fingerprint.items()):
+            fingerprint['sha256'] = previous['sha256']
+        else:
+            fingerprint['sha256'] = file_sha256(img_path)
+        self.sources[name] = fingerprint
+        return fingerprint
+
+    def unchanged(self, name, img_path):
+        """Stored name of `name` if its source and the parameters did not change, else None"""
+        fingerprint = self.fingerprint(name, img_path)
+        previous = self.previous.get(name)
+        if (
+            self.params_changed or not previous
+            or previous['sha256'] != fingerprint['sha256']
+            or not self.storage.exists(previous['stored'])
+        ):
+            return None
+        self.record(name, previous['stored'])
+        return previous['stored']
+
+    def record(self, name, stored):
+        self.images[name] = {**self.sources[name], 'stored': stored}
+
+    def save(self):
+        data = {
+            'version': MANIFEST_VERSION,
+            'params': self.params,
+            'images': self.images,
+            'gallery': self.gallery,
+            'project_images': self.project_images,
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(data, indent=2, sort_keys=True), encoding='utf-8')
+        tmp_path.replace(self.path)
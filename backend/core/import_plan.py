@@ -0,0 +1,181 @@
+"""
+Declarative manifest and execution plan of `import_project_images`.
+
+The manifest (JSON, or YAML when PyYAML is installed) describes the
+services, the projects with their import folders and the hero picks of the
+home page gallery, see core/import_projects.json:
+
+    {
+      "services": {"cuisine": {"slug": "cuisine", "title": "Aménagement Cuisine", ...}},
+      "projects": [{"number": 1, "title": "...", "service": "cuisine", "has_before_after": true, ...}],
+      "heroes": [{"folder": "1a", "index": 2, "title": "Cuisine Design", "project": "projet-1"}]
+    }
+
+Project folders default to `<number>a` (after) and `<number>b` (before)
+for before/after projects and `<number>` otherwise; "folders" overrides
+them. The plan lists every file to process and row to write; folders are
+scanned and image headers read in parallel.
+"""
+import json
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from PIL import Image
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+DEFAULT_MANIFEST = Path(__file__).with_name('import_projects.json')
+IMAGE_SUFFIXES = ['.jpg', '.jpeg', '.png']
+
+SERVICE_DEFAULTS = {'short_description': '', 'description': '', 'icon': 'HomeRepairService', 'order': 0}
+PROJECT_DEFAULTS = {
+    'location': '',
+    'short_description': '',
+    'description': '',
+    'duration': '',
+    'surface': '',
+    'has_before_after': False,
+}
+
+
+def image_files(folder):
+    """Sorted image files of an import folder"""
+    return sorted([f for f in folder.iterdir() if f.suffix.lower() in IMAGE_SUFFIXES])
+
+
+def project_image_name(img_path, slug, image_type):
+    dest_folder = 'featured' if image_type == 'featured' else 'before'
+    return f'projects/{dest_folder}/{slug}_{img_path.name}'
+
+
+def gallery_image_name(img_path, slug, order):
+    return f'projects/gallery/{slug}_{order}_{img_path.name}'
+
+
+def hero_image_name(img_path, folder_name):
+    return f'gallery/hero_{folder_name}_{img_path.name}'
+
+
+def image_pixels(img_path):
+    """Pixel count read from the image header, None if the file is not an image"""
+    try:
+        with Image.open(img_path) as img:
+            return img.width * img.height
+    except Exception:
+        return None
+
+
+def load_manifest(path=DEFAULT_MANIFEST):
+    """Read and validate a JSON or YAML manifest; raises ValueError when invalid"""
+    path = Path(path)
+    text = path.read_text(encoding='utf-8')
+    if path.suffix.lower() in ('.yaml', '.yml'):
+        if yaml is None:
+            raise ValueError('PyYAML is required to read YAML manifests')
+        data = yaml.safe_load(text)
+    else:
+        data = json.loads(text)
+    return validate_manifest(data)
+
+
+def validate_manifest(data):
+    """Manifest with defaults filled in and project slugs and folders resolved"""
+    if not isinstance(data, dict) or not isinstance(data.get('projects'), list):
+        raise ValueError('the manifest must be an object with a "projects" list')
+
+    services = {}
+    for key, service in (data.get('services') or {}).items():
+        if not service.get('slug') or not service.get('title'):
+            raise ValueError(f'service "{key}": "slug" and "title" are required')
+        services[key] = {**SERVICE_DEFAULTS, **service}
+
+    projects = []
+    numbers = set()
+    for project in data['projects']:
+        number = project.get('number')
+        if not isinstance(number, int) or not project.get('title'):
+            raise ValueError(f'project {number}: an integer "number" and a "title" are required')
+        if number in numbers:
+            raise ValueError(f'project {number}: duplicate number')
+        numbers.add(number)
+        if project.get('service') is not None and project['service'] not in services:
+            raise ValueError(f'project {number}: unknown service "{project["service"]}"')
+        project = {**PROJECT_DEFAULTS, 'service': None, **project}
+        if project['has_before_after']:
+            folders = {'after': f'{number}a', 'before': f'{number}b'}
+        else:
+            folders = {'after': str(number), 'before': None}
+        project['folders'] = {**folders, **project.get('folders', {})}
+        project['slug'] = project.get('slug') or f'projet-{number}'
+        projects.append(project)
+
+    heroes = []
+    for hero in data.get('heroes') or []:
+        if not hero.get('folder') or not hero.get('title') or not isinstance(hero.get('index', 0), int):
+            raise ValueError(f'hero {hero.get("title")}: "folder", "title" and an integer "index" are required')
+        heroes.append({'index': 0, 'project': None, **hero})
+    for position, hero in enumerate(heroes):
+        # The first hero is shown first
+        hero.setdefault('order', len(heroes) - position)
+
+    return {'services': services, 'projects': projects, 'heroes': heroes}
+
+
+class ImportPlan:
+    """Source files and media names of an import, found by scanning the folders of a manifest"""
+
+    def __init__(self, manifest, import_dir, workers=1):
+        self.manifest = manifest
+        self.import_dir = Path(import_dir)
+        folders = {hero['folder'] for hero in manifest['heroes']}
+        for project in manifest['projects']:
+            folders |= {folder for folder in project['folders'].values() if folder}
+        folders = sorted(folders)
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            self.folders = dict(zip(folders, executor.map(self.scan, folders)))
+
+    def scan(self, folder_name):
+        folder = self.import_dir / folder_name
+        return image_files(folder) if folder.is_dir() else None
+
+    def files(self, folder_name):
+        return (self.folders.get(folder_name) or []) if folder_name else []
+
+    def missing_folders(self, project):
+        return [folder for folder in project['folders'].values() if folder and self.folders[folder] is None]
+
+    def project_images(self, project):
+        """(after files, before files) of a project"""
+        return self.files(project['folders']['after']), self.files(project['folders']['before'])
+
+    def hero_images(self):
+        """(hero, source file) of every hero whose picked file exists"""
+        for hero in self.manifest['heroes']:
+            images = self.files(hero['folder'])
+            if len(images) > hero['index']:
+                yield hero, images[hero['index']]
+
+    def images(self):
+        """Every (image path, media name) the import stores, in import order"""
+        planned = []
+        for project in self.manifest['projects']:
+            slug = project['slug']
+            after, before = self.project_images(project)
+            if after:
+                planned.append((after[0], project_image_name(after[0], slug, 'featured')))
+                for order, img_path in enumerate(after[1:], start=1):
+                    planned.append((img_path, gallery_image_name(img_path, slug, order)))
+            if before:
+                planned.append((before[0], project_image_name(before[0], slug, 'before')))
+        for hero, img_path in self.hero_images():
+            planned.append((img_path, hero_image_name(img_path, hero['folder'])))
+        return planned
+
+    def pixels(self, paths, workers=1):
+        """{path: pixel count or None} of `paths`, reading headers in parallel"""
+        paths = sorted(set(paths))
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            return dict(zip(paths, executor.map(image_pixels, paths)))
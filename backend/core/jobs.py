@@ -0,0 +1,109 @@
+"""
+Database-backed background job queue.
+
+Jobs are Job rows identified by a unique key, so enqueuing the same work
+twice (e.g. saving a project repeatedly) never duplicates it. The
+`process_jobs` command claims pending jobs with a conditional UPDATE (works
+on SQLite without a broker), runs their handler and retries failures with
+exponential backoff until `max_attempts`, after which they stay `failed`
+and are visible in the admin.
+"""
+import logging
+import os
+import socket
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .cache import bump_content_generation
+from .images import generate_derivatives, image_names, missing_derivatives
+from .models import Job
+from .snapshots import image_endpoints, refresh_snapshots, snapshots_enabled
+
+logger = logging.getLogger(__name__)
+
+JOB_HANDLERS = {}
+
+
+def job_handler(kind):
+    """Register the function that processes jobs of `kind` (called with the payload)"""
+    def register(func):
+        JOB_HANDLERS[kind] = func
+        return func
+    return register
+
+
+def enqueue(kind, key, payload):
+    """Queue a job unless an identical one is already pending or running"""
+    job, created = Job.objects.get_or_create(key=key, defaults={'kind': kind, 'payload': payload})
+    if not created and job.status in ('done', 'failed'):
+        Job.objects.filter(pk=job.pk).update(
+            status='pending', payload=payload, attempts=0, run_after=timezone.now(),
+            last_error='', updated_at=timezone.now(),
+        )
+    return job
+
+
+def worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim_jobs(limit, worker=None):
+    """Atomically mark up to `limit` due jobs as running and return their ids"""
+    now = timezone.now()
+    # Jobs left running by a crashed worker become available again
+    Job.objects.filter(
+        status='running', locked_at__lt=now - timedelta(seconds=settings.JOB_LOCK_TIMEOUT),
+    ).update(status='pending', locked_by='', locked_at=None)
+
+    candidates = Job.objects.filter(status='pending', run_after__lte=now).order_by('run_after', 'pk')
+    claimed = []
+    for pk in candidates.values_list('pk', flat=True)[:limit]:
+        if Job.objects.filter(pk=pk, status='pending').update(
+            status='running', locked_by=worker or worker_id(), locked_at=now, updated_at=now,
+        ):
+            claimed.append(pk)
+    return claimed
+
+
+def run_job(pk):
+    """Run one claimed job and record its outcome. Returns the final status."""
+    job = Job.objects.get(pk=pk)
+    job.attempts += 1
+    try:
+        JOB_HANDLERS[job.kind](job.payload)
+    except Exception:
+        logger.exception('Job %s failed (attempt %s/%s)', job.key, job.attempts, job.max_attempts)
+        job.last_error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            job.status = 'failed'
+        else:
+            job.status = 'pending'
+            delay = settings.JOB_RETRY_DELAY * 2 ** (job.attempts - 1)
+            job.run_after = timezone.now() + timedelta(seconds=delay)
+    else:
+        job.status = 'done'
+        job.last_error = ''
+    job.locked_by = ''
+    job.locked_at = None
+    job.save(update_fields=['status', 'attempts', 'last_error', 'run_after', 'locked_by', 'locked_at', 'updated_at'])
+    return job.status
+
+
+def enqueue_image_derivatives(instance):
+    """Queue derivative generation for the images of `instance` that lack them"""
+    names = image_names(instance)
+    for name in missing_derivatives(names) if names else []:
+        enqueue('image_derivatives', f'image_derivatives:{name}', {'source': name})
+
+
+@job_handler('image_derivatives')
+def process_image_derivatives(payload):
+    name = payload['source']
+    generate_derivatives(name)
+    # Derivatives are bulk-created without signals but change serialized srcsets
+    bump_content_generation()
+    if snapshots_enabled():
+        refresh_snapshots(image_endpoints([name]))
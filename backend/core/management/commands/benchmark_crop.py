@@ -0,0 +1,120 @@
+"""
+Management command benchmarking the margin cropping engine
+Usage: python manage.py benchmark_crop [--sizes 1170x2532,6000x8000] [--repeat 3]
+
+Generates synthetic notched phone screenshots (dark gray bars, notch, black
+side margins around noisy content) and compares the time and peak memory of
+core.cropping with the previous full-image NumPy implementation (skipped
+when NumPy is not installed). Peak memory is the growth of the process
+peak RSS (Linux /proc), since Pillow allocations are invisible to tracemalloc.
+"""
+import statistics
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from PIL import Image, ImageDraw
+from core.cropping import MARGIN_COLORS, MARGIN_TOLERANCE, MarginDetector
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+PROC_STATUS = Path('/proc/self/status')
+PROC_CLEAR_REFS = Path('/proc/self/clear_refs')
+
+
+def synthetic_screenshot(width, height):
+    """A notched screenshot and the bounding box of its content"""
+    img = Image.new('RGB', (width, height), MARGIN_COLORS[1])
+    bar = height // 16
+    side = width // 20
+    notch = width // 3
+    ImageDraw.Draw(img).rectangle((width // 2 - notch // 2, 0, width // 2 + notch // 2, bar // 2), fill=MARGIN_COLORS[2])
+    ImageDraw.Draw(img).rectangle((0, bar, width - 1, height - bar - 1), fill=MARGIN_COLORS[0])
+
+    size = (width - 2 * side, height - 2 * bar)
+    noise = Image.effect_noise(size, 40)
+    # Channels chosen so that no content pixel is within tolerance of a margin color
+    content = Image.merge('RGB', (noise, noise.point(lambda v: v // 2 + 64), noise.point(lambda v: 255 - v)))
+    img.paste(content, (side, bar))
+    return img, (side, bar, width - side, height - bar)
+
+
+def numpy_content_bbox(img):
+    """Previous engine: full-image float distance arrays per margin color"""
+    img_array = np.array(img.convert('RGB'))
+    is_margin = np.zeros(img_array.shape[:2], dtype=bool)
+    for color in MARGIN_COLORS:
+        color_diff = np.abs(img_array - np.array(color))
+        color_distance = np.sqrt(np.sum(color_diff ** 2, axis=2))
+        is_margin |= (color_distance <= MARGIN_TOLERANCE)
+    content_mask = ~is_margin
+    rows = np.any(content_mask, axis=1)
+    cols = np.any(content_mask, axis=0)
+    if not (rows.any() and cols.any()):
+        return None
+    rmin, rmax = np.where(rows)[0][[0, -1]]
+    cmin, cmax = np.where(cols)[0][[0, -1]]
+    return int(cmin), int(rmin), int(cmax) + 1, int(rmax) + 1
+
+
+def _status_kib(field):
+    for line in PROC_STATUS.read_text().splitlines():
+        if line.startswith(field):
+            return int(line.split()[1])
+    return None
+
+
+def measure(func, img):
+    """(result, seconds, peak memory growth in MiB or None)"""
+    try:
+        PROC_CLEAR_REFS.write_text('5')  # reset the peak RSS (VmHWM)
+        baseline = _status_kib('VmRSS:')
+    except OSError:
+        baseline = None
+    start = time.perf_counter()
+    result = func(img)
+    elapsed = time.perf_counter() - start
+    peak = None
+    if baseline is not None:
+        peak = (_status_kib('VmHWM:') - baseline) / 1024
+    return result, elapsed, peak
+
+
+class Command(BaseCommand):
+    help = 'Compare time and peak memory of the margin cropping engines'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            default='1170x2532,3024x4032,6000x8000',
+            help='Comma-separated WIDTHxHEIGHT of the synthetic screenshots',
+        )
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per engine (median time is reported)')
+
+    def handle(self, *args, **options):
+        engines = [('border scan', MarginDetector().content_bbox)]
+        if np is not None:
+            engines.append(('numpy (previous)', numpy_content_bbox))
+        else:
+            self.stdout.write(self.style.WARNING('⚠ NumPy is not installed, only the border scan is measured'))
+
+        self.stdout.write(f"{'size':<12} {'engine':<18} {'time':>9} {'peak':>10}  bbox")
+        for size in options['sizes'].split(','):
+            width, height = (int(value) for value in size.lower().split('x'))
+            img, expected = synthetic_screenshot(width, height)
+            for name, engine in engines:
+                timings, peaks = [], []
+                for _ in range(max(1, options['repeat'])):
+                    bbox, elapsed, peak = measure(engine, img)
+                    timings.append(elapsed)
+                    peaks.append(peak)
+                peak = 'n/a' if None in peaks else f'{max(peaks):.1f}MiB'
+                style = self.style.SUCCESS if bbox == expected else self.style.ERROR
+                self.stdout.write(style(
+                    f'{size:<12} {name:<18} {statistics.median(timings) * 1000:>7.1f}ms {peak:>10}  {bbox}'
+                ))
+            del img
+        self.stdout.write(self.style.SUCCESS('✨ Done'))
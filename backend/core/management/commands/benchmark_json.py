@@ -0,0 +1,128 @@
+"""
+Management command benchmarking the JSON rendering and parsing of the API
+Usage: python manage.py benchmark_json [--projects 10] [--images 20] [--gallery 100] [--repeat 20]
+
+Seeds projects with their images and derivatives, and gallery images, in a
+transaction that is rolled back. Then serializes a list of project details
+(ProjectDetailSerializer) and a gallery page (GalleryImageSerializer) once
+and times DRF's JSONRenderer/JSONParser against core.renderers (orjson, or
+the stdlib fallback when orjson is not installed) on that output.
+"""
+import io
+import statistics
+import time
+from datetime import date, timedelta
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from core.models import Service, Project, ProjectImage, GalleryImage, ImageDerivative
+from core.renderers import FastJSONParser, FastJSONRenderer, orjson
+from core.serializers import GalleryImageSerializer, ProjectDetailSerializer
+
+DERIVATIVE_WIDTHS = [320, 640, 1280, 1920]
+DESCRIPTION = (
+    "Rénovation complète d'une cuisine de 18 m² : dépose de l'existant, reprise des réseaux, "
+    "pose d'un plan de travail en quartz et de façades laquées, éclairage LED intégré. "
+)
+
+
+def median_ms(function, repeat):
+    durations = []
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        function()
+        durations.append((time.perf_counter() - start) * 1000)
+    return statistics.median(durations)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark JSON rendering and parsing of project and gallery payloads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--projects', type=int, default=10, help='Project details in the project payload')
+        parser.add_argument('--images', type=int, default=20, help='Images per project')
+        parser.add_argument('--gallery', type=int, default=100, help='Images in the gallery payload')
+        parser.add_argument('--repeat', type=int, default=20, help='Runs per measure (median is reported)')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            payloads = self.seed_payloads(options)
+            transaction.set_rollback(True)
+
+        implementations = [
+            ('DRF JSONRenderer', JSONRenderer(), JSONParser()),
+            (f"core.renderers ({'orjson' if orjson else 'stdlib'})", FastJSONRenderer(), FastJSONParser()),
+        ]
+        self.stdout.write(f"\n{'payload':<16} {'implementation':<26} {'size':>9} {'render':>10} {'parse':>10}")
+        for label, data in payloads:
+            timings = []
+            reference = implementations[0][1].render(data)
+            for name, renderer, parser in implementations:
+                content = renderer.render(data)
+                if content != reference:
+                    self.stdout.write(self.style.WARNING(f'  ⚠️  {name} output differs from DRF on {label}'))
+                render_ms = median_ms(lambda: renderer.render(data), options['repeat'])
+                parse_ms = median_ms(lambda: parser.parse(io.BytesIO(content)), options['repeat'])
+                timings.append((render_ms, parse_ms))
+                self.stdout.write(
+                    f'{label:<16} {name:<26} {len(content) / 1024:>7.0f}kB {render_ms:>8.2f}ms {parse_ms:>8.2f}ms'
+                )
+            (base_render, base_parse), (render_ms, parse_ms) = timings
+            self.stdout.write(self.style.SUCCESS(
+                f"{'':<16} {'speedup':<26} {'':>9} {base_render / render_ms:>9.1f}x {base_parse / parse_ms:>9.1f}x"
+            ))
+        self.stdout.write(self.style.SUCCESS('✨ Done (seeded rows rolled back)'))
+
+    def seed_payloads(self, options):
+        """(label, serializer output) of the benchmarked payloads"""
+        self.stdout.write('🌱 Seeding projects, images and derivatives...')
+        service = Service.objects.create(title='Aménagement Cuisine', slug='bench-json-cuisine', description=DESCRIPTION)
+        projects = Project.objects.bulk_create(
+            Project(
+                title=f'Cuisine contemporaine {i}', slug=f'bench-json-{i}', description=DESCRIPTION * 8,
+                short_description=DESCRIPTION, location='Évry-Courcouronnes', service=service,
+                featured_image=f'projects/featured/bench-{i}.jpg', before_image=f'projects/before/bench-{i}.jpg',
+                has_before_after=True, completion_date=date(2024, 1, 1) + timedelta(days=i),
+                duration='3 semaines', surface='18 m²',
+            )
+            for i in range(options['projects'])
+        )
+        images = ProjectImage.objects.bulk_create(
+            ProjectImage(project=project, image=f'projects/gallery/bench-{project.pk}-{i}.jpg',
+                         caption=f'Vue {i} de la cuisine', order=i)
+            for project in projects for i in range(options['images'])
+        )
+        gallery = GalleryImage.objects.bulk_create(
+            GalleryImage(title=f'Réalisation {i}', image=f'gallery/bench-{i}.jpg', category='showcase',
+                         caption='Plan de travail en quartz', order=i,
+                         linked_project=projects[i % len(projects)] if projects else None)
+            for i in range(options['gallery'])
+        )
+        sources = [project.featured_image.name for project in projects]
+        sources += [project.before_image.name for project in projects]
+        sources += [image.image.name for image in images] + [image.image.name for image in gallery]
+        ImageDerivative.objects.bulk_create((
+            ImageDerivative(source=source, format=fmt, width=width, height=width * 2 // 3,
+                            file=f"derivatives/{source.rsplit('.', 1)[0]}-{width}.{fmt}")
+            for source in sources for fmt in ('webp', 'jpeg') for width in DERIVATIVE_WIDTHS
+        ), batch_size=1000)
+
+        # Absolute media URLs as the public API builds them
+        base = urlsplit(settings.API_BASE_URL)
+        request = RequestFactory().get('/api/', HTTP_HOST=base.netloc, secure=base.scheme == 'https')
+        context = {'request': Request(request)}
+        project_details = ProjectDetailSerializer(
+            Project.objects.filter(slug__startswith='bench-json-').select_related('service').prefetch_related('images'),
+            many=True, context=context,
+        ).data
+        gallery_page = GalleryImageSerializer(
+            GalleryImage.objects.filter(pk__in=[image.pk for image in gallery]).select_related('linked_project'),
+            many=True, context=context,
+        ).data
+        return [('project details', project_details), ('gallery', gallery_page)]
@@ -0,0 +1,180 @@
+"""
+Management command benchmarking the SQL queries of the public API
+Usage: python manage.py benchmark_queries [--rows 100000] [--repeat 5] [--no-plans]
+
+Seeds --rows rows per content table, then prints EXPLAIN output and timings
+of every endpoint query with the indexes of core/models.py and with those
+indexes dropped. Everything runs in a transaction that is rolled back, so the
+database is left untouched. The database is the configured default one:
+select the engine with DATABASE_ENGINE (SQLite or PostgreSQL), e.g.
+    DATABASE_ENGINE=django.db.backends.postgresql DATABASE_NAME=vitrine python manage.py benchmark_queries
+"""
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from core.conditional import validators_sql
+from core.filters import GalleryImageFilter, ProjectFilter
+from core.models import CompanyInfo, Service, Project, ProjectImage, Testimonial, GalleryImage, ImageDerivative
+from core.pagination import KeysetPagination
+from core.views import ProjectViewSet, ServiceViewSet, TestimonialViewSet, GalleryImageViewSet
+
+BENCHMARK_MODELS = (Service, Project, ProjectImage, Testimonial, GalleryImage, ImageDerivative)
+CATEGORIES = [choice for choice, _ in GalleryImage.CATEGORY_CHOICES]
+
+
+def keyset_pages(queryset):
+    """First page and a page from the middle of `queryset`, as the keyset paginator queries them"""
+    paginator = KeysetPagination()
+    columns = paginator.get_columns(queryset)
+    ordered = paginator.page_queryset(queryset, columns)
+    middle = ordered[ordered.count() // 2]
+    values = [getattr(middle, column.name) for column in columns]
+    limit = paginator.page_size + 1
+    return ordered[:limit], paginator.page_queryset(queryset, columns, values)[:limit]
+
+
+def filtered(filter_class, queryset, params):
+    """First page of a list endpoint filtered by query `params`"""
+    filters = filter_class(data=params)
+    filters.is_valid(raise_exception=True)
+    queryset = filters.filter_queryset(queryset, filters.validated_data)
+    paginator = KeysetPagination()
+    return paginator.page_queryset(queryset, paginator.get_columns(queryset))[:paginator.page_size + 1]
+
+
+def endpoint_queries():
+    """(label, queryset or raw SQL) for every query issued by the public endpoints"""
+    projects = ProjectViewSet.queryset
+    project = projects.order_by('pk')[projects.count() // 2]
+    queries = [
+        ('services (list)', ServiceViewSet.queryset),
+    ]
+    for name, queryset in [
+        ('projects', projects), ('testimonials', TestimonialViewSet.queryset), ('gallery', GalleryImageViewSet.queryset),
+    ]:
+        first, deep = keyset_pages(queryset)
+        queries.append((f'{name} (first page)', first))
+        queries.append((f'{name} (middle page)', deep))
+    queries += [
+        ('projects/featured', projects.filter(is_featured=True)),
+        ('projects/<slug>', projects.filter(slug=project.slug)),
+        ('projects/<slug> images', ProjectImage.objects.filter(is_visible=True, project_id=project.pk)),
+        ('gallery/hero', GalleryImageViewSet.queryset.filter(category='hero')),
+        ('projects?service', filtered(ProjectFilter, projects, {'service': project.service.slug})),
+        ('projects?year_min&year_max', filtered(ProjectFilter, projects, {'year_min': 2018, 'year_max': 2019})),
+        ('projects?location', filtered(ProjectFilter, projects, {'location': project.location})),
+        ('gallery?project', filtered(GalleryImageFilter, GalleryImageViewSet.queryset, {'project': project.slug})),
+        ('validators (home)', validators_sql(
+            (CompanyInfo, Service, Project, GalleryImage, Testimonial, ImageDerivative)
+        )),
+    ]
+    return queries
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the public API queries with and without the composite indexes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000, help='Rows seeded per content table')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per query (median is reported)')
+        parser.add_argument('--no-plans', action='store_true', help='Only print timings')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'🗄️  {connection.vendor} ({connection.settings_dict["ENGINE"]})')
+        with transaction.atomic():
+            self.seed(options['rows'])
+            queries = endpoint_queries()
+
+            with_indexes = self.run('WITH indexes', queries, options)
+            self.drop_indexes()
+            without_indexes = self.run('WITHOUT indexes', queries, options)
+            transaction.set_rollback(True)
+
+        self.stdout.write('')
+        self.stdout.write(f"{'query':<28} {'no index':>10} {'indexed':>10} {'speedup':>8}")
+        for label, _ in queries:
+            before, after = without_indexes[label], with_indexes[label]
+            speedup = before / after if after else float('inf')
+            self.stdout.write(f'{label:<28} {before:>8.2f}ms {after:>8.2f}ms {speedup:>7.1f}x')
+        self.stdout.write(self.style.SUCCESS('✨ Done (seeded rows rolled back)'))
+
+    def seed(self, rows):
+        self.stdout.write(f'🌱 Seeding {rows} rows per table...')
+        start = time.perf_counter()
+        services = Service.objects.bulk_create(
+            Service(title=f'Service {i}', slug=f'bench-service-{i}', description='Benchmark', order=i % 10,
+                    is_active=i % 10 != 0)
+            for i in range(max(10, rows // 1000))
+        )
+        Project.objects.bulk_create((
+            Project(
+                title=f'Projet {i}', slug=f'bench-projet-{i}', description='Benchmark', location=f'Ville {i % 500}',
+                service=services[i % len(services)], is_featured=i % 20 == 0, is_active=i % 10 != 0,
+                order=i % 50, completion_date=None if i % 7 == 0 else date(2015, 1, 1) + timedelta(days=i % 3650),
+            )
+            for i in range(rows)
+        ), batch_size=1000)
+        project_ids = list(Project.objects.values_list('pk', flat=True))
+        ProjectImage.objects.bulk_create((
+            ProjectImage(project_id=project_ids[i % len(project_ids)], image=f'bench/{i}.jpg',
+                         order=i % 10, is_visible=i % 4 != 0)
+            for i in range(rows)
+        ), batch_size=1000)
+        Testimonial.objects.bulk_create((
+            Testimonial(client_name=f'Client {i}', content='Benchmark', order=i % 50, is_active=i % 10 != 0,
+                        project_id=project_ids[i % len(project_ids)])
+            for i in range(rows)
+        ), batch_size=1000)
+        GalleryImage.objects.bulk_create((
+            GalleryImage(title=f'Image {i}', image=f'bench/gallery-{i}.jpg', category=CATEGORIES[i % len(CATEGORIES)],
+                         order=i % 50, is_active=i % 10 != 0, linked_project_id=project_ids[i % len(project_ids)])
+            for i in range(rows)
+        ), batch_size=1000)
+        with connection.cursor() as cursor:
+            # Fresh statistics so the planner knows about the seeded rows
+            cursor.execute('ANALYZE')
+        self.stdout.write(f'   done in {time.perf_counter() - start:.1f}s')
+
+    def drop_indexes(self):
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            for model in BENCHMARK_MODELS:
+                for index in model._meta.indexes:
+                    cursor.execute(f'DROP INDEX {quote(index.name)}')
+            cursor.execute('ANALYZE')
+
+    def run(self, title, queries, options):
+        """Median duration in ms of every query, printing its plan"""
+        self.stdout.write(self.style.MIGRATE_HEADING(f'\n=== {title} ==='))
+        timings = {}
+        for label, query in queries:
+            if isinstance(query, str):
+                def execute(sql=query):
+                    with connection.cursor() as cursor:
+                        cursor.execute(sql)
+                        cursor.fetchall()
+            else:
+                def execute(queryset=query):
+                    list(queryset.all())
+
+            durations = []
+            for _ in range(max(1, options['repeat'])):
+                start = time.perf_counter()
+                execute()
+                durations.append((time.perf_counter() - start) * 1000)
+            timings[label] = statistics.median(durations)
+
+            if not options['no_plans']:
+                self.stdout.write(self.style.HTTP_INFO(f'{label} ({timings[label]:.2f}ms)'))
+                self.stdout.write(self.explain(query))
+        return timings
+
+    def explain(self, query):
+        if not isinstance(query, str):
+            return query.explain()
+        with connection.cursor() as cursor:
+            cursor.execute(f'{connection.ops.explain_query_prefix()} {query}')
+            return '\n'.join(' '.join(str(column) for column in row) for row in cursor.fetchall())
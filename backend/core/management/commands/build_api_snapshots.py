@@ -0,0 +1,24 @@
+"""
+Management command to regenerate every precomputed API snapshot
+Usage: python manage.py build_api_snapshots
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from core.snapshots import rebuild_snapshots, snapshots_enabled
+
+
+class Command(BaseCommand):
+    help = 'Regenerate the JSON snapshots served by the public API'
+
+    def handle(self, *args, **options):
+        if not snapshots_enabled():
+            self.stdout.write(self.style.WARNING('⚠ API_SNAPSHOTS is disabled, snapshots will not be served'))
+
+        start = time.perf_counter()
+        count = rebuild_snapshots()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {count} snapshots written to {settings.API_SNAPSHOT_ROOT} in {elapsed:.2f}s'
+        ))
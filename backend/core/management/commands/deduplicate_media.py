@@ -0,0 +1,100 @@
+"""
+Management command moving existing media files to content-addressed names
+Usage: python manage.py deduplicate_media [--dry-run]
+
+Files uploaded before ContentAddressedStorage (or copied by older imports)
+are renamed to content/<hash><ext>; identical files collapse into one and
+every row referencing them (image fields and derivative sources) is updated.
+Rows are updated with QuerySet.update(), so the command itself bumps their
+updated_at, invalidates cached responses and refreshes the affected
+snapshots. Old files are removed last, once nothing served points to them.
+"""
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from core.cache import bump_content_generation
+from core.images import IMAGE_FIELDS
+from core.models import ImageDerivative
+from core.snapshots import image_endpoints, refresh_snapshots, snapshots_enabled
+from core.storage import is_content_addressed
+
+
+class Command(BaseCommand):
+    help = 'Rename media files to their content hash and merge duplicates'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report what would be renamed and merged',
+        )
+
+    def handle(self, *args, **options):
+        storage = default_storage
+        if not hasattr(storage, 'content_name'):
+            self.stdout.write(self.style.ERROR('✗ The default storage is not content-addressed'))
+            return
+
+        # Every legacy name and the (model, field) pairs referencing it
+        references = {}
+        for model, fields in IMAGE_FIELDS.items():
+            for field in fields:
+                names = model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+                for name in names.values_list(field, flat=True).distinct():
+                    if not is_content_addressed(name):
+                        references.setdefault(name, []).append((model, field))
+        for name in ImageDerivative.objects.values_list('file', flat=True):
+            if not is_content_addressed(name):
+                references.setdefault(name, []).append((ImageDerivative, 'file'))
+
+        self.stdout.write(f'🗂️  {len(references)} files to rename...')
+        renamed = merged = reclaimed = 0
+        now = timezone.now()
+        # Names whose serialized URLs changed, and files to remove at the end
+        changed, obsolete = set(), []
+        for name, fields in sorted(references.items()):
+            if not storage.exists(name):
+                self.stdout.write(self.style.WARNING(f'  ⚠ {name}: missing file, skipped'))
+                continue
+            with storage.open(name) as fh:
+                new_name = storage.content_name(name, fh)
+                duplicate = storage.exists(new_name)
+                if not options['dry_run']:
+                    storage.save(name, fh)
+            size = storage.size(name)
+            renamed += 1
+            if duplicate:
+                merged += 1
+                reclaimed += size
+            self.stdout.write(f'  {"=" if duplicate else "→"} {name} → {new_name}')
+            if options['dry_run']:
+                continue
+
+            for model, field in fields:
+                rows = model.objects.filter(**{field: name})
+                if model is ImageDerivative:
+                    changed.update(rows.values_list('source', flat=True))
+                    rows.update(**{field: new_name})
+                else:
+                    # update() skips auto_now: bump it for Last-Modified and ETags
+                    rows.update(**{field: new_name, 'updated_at': now})
+            # Derivatives follow their source; a duplicate source already has its own
+            derivatives = ImageDerivative.objects.filter(source=name)
+            if ImageDerivative.objects.filter(source=new_name).exists():
+                obsolete += derivatives.values_list('file', flat=True)
+                derivatives.delete()
+            else:
+                derivatives.update(source=new_name)
+            changed.add(new_name)
+            obsolete.append(name)
+
+        if renamed and not options['dry_run']:
+            bump_content_generation()
+            if snapshots_enabled():
+                refresh_snapshots(image_endpoints(changed))
+            for name in obsolete:
+                storage.delete(name)
+        prefix = 'Would rename' if options['dry_run'] else 'Renamed'
+        self.stdout.write(self.style.SUCCESS(
+            f'\n✨ {prefix} {renamed} files, {merged} duplicates merged ({reclaimed / 1024:.0f} KiB reclaimed)'
+        ))
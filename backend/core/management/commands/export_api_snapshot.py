@@ -0,0 +1,229 @@
+"""
+Management command to export the public API as static JSON files
+Usage: python manage.py export_api_snapshot [--output DIR] [--full]
+
+Every public endpoint is rendered to <output>/api/<endpoint>/index.json
+(further pages of a paginated list to cursor-<token>.json or page-N.json) with precompressed .gz and,
+when the `brotli` package is installed, .br variants. <output>/api/.htaccess
+maps the original URLs onto these files, so copying <output>/api into the
+API document root lets Apache answer GET requests without starting Django;
+anything not exported (e.g. POST /api/contact/) still reaches Passenger.
+
+<output>/manifest.json records the exported files and, per content object,
+the endpoints it affects. Later runs only re-render the endpoints of objects
+created, changed or deleted since the previous export, or whose image
+derivatives (generated asynchronously by process_jobs, without touching the
+object) changed; --full re-renders all.
+"""
+import gzip
+import hashlib
+import json
+import time
+from pathlib import Path
+from urllib.parse import parse_qsl
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from core.images import image_names
+from core.models import Service, ProjectImage, ImageDerivative
+from core.signals import CONTENT_MODELS
+from core.snapshots import affected_endpoints, all_endpoints, render_endpoint
+
+try:
+    import brotli
+except ImportError:  # Optional: only gzip variants are produced
+    brotli = None
+
+
+MANIFEST_VERSION = 2
+
+HTACCESS = """# Generated by `manage.py export_api_snapshot` - do not edit
+Options -Indexes
+AddType application/json .json
+RewriteEngine On
+
+# /api/projects/?cursor=abc -> projects/cursor-abc.json (same for ?page=N)
+RewriteCond %{{REQUEST_METHOD}} ^(GET|HEAD)$
+RewriteCond %{{QUERY_STRING}} ^(page|cursor)=([0-9A-Za-z_-]+)$
+RewriteCond %{{REQUEST_FILENAME}}%1-%2.json -f
+RewriteRule ^(.*/)?$ $1%1-%2.json [QSD]
+
+# /api/projects/ -> projects/index.json
+RewriteCond %{{REQUEST_METHOD}} ^(GET|HEAD)$
+RewriteCond %{{QUERY_STRING}} ^$
+RewriteCond %{{REQUEST_FILENAME}}index.json -f
+RewriteRule ^(.*/)?$ $1index.json
+
+# Precompressed variants
+{brotli_rules}RewriteCond %{{HTTP:Accept-Encoding}} \\bgzip\\b
+RewriteRule ^(.+\\.json)$ $1.gz [L]
+
+<FilesMatch "\\.json\\.gz$">
+    ForceType application/json
+    Header set Content-Encoding gzip
+</FilesMatch>
+<FilesMatch "\\.json\\.br$">
+    ForceType application/json
+    Header set Content-Encoding br
+</FilesMatch>
+<FilesMatch "\\.json(\\.gz|\\.br)?$">
+    Header append Vary Accept-Encoding
+    Header set Cache-Control "no-cache"
+</FilesMatch>
+"""
+
+BROTLI_RULES = """RewriteCond %{HTTP:Accept-Encoding} \\bbr\\b
+RewriteRule ^(.+\\.json)$ $1.br [L]
+"""
+
+
+def export_path(key):
+    """Relative file path of an exported endpoint key"""
+    path, _, query = key.partition('?')
+    directory = path.strip('/')
+    if not query:
+        return f'{directory}/index.json'
+    # Single pagination parameter: page=2 -> page-2.json, cursor=abc -> cursor-abc.json
+    name, value = parse_qsl(query)[0]
+    return f'{directory}/{name}-{value}.json'
+
+
+class Command(BaseCommand):
+    help = 'Export every public API endpoint to static, precompressed JSON files'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            default=getattr(settings, 'API_EXPORT_ROOT', None),
+            help='Export directory (default: API_EXPORT_ROOT)',
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Re-render every endpoint instead of only those affected by changes',
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        output = Path(options['output'])
+        output.mkdir(parents=True, exist_ok=True)
+        manifest_path = output / 'manifest.json'
+
+        manifest = None
+        if manifest_path.exists() and not options['full']:
+            manifest = json.loads(manifest_path.read_text())
+            if manifest.get('version') != MANIFEST_VERSION or manifest.get('base_url') != settings.API_BASE_URL:
+                self.stdout.write(self.style.WARNING('⚠ Manifest is outdated, running a full export'))
+                manifest = None
+
+        exported_at = timezone.now()
+        objects = self.collect_objects()
+
+        if manifest is None:
+            files = {}
+            paths = set(all_endpoints())
+        else:
+            files = manifest['files']
+            paths = self.changed_endpoints(manifest, objects)
+
+        self.stdout.write(f'📦 Rendering {len(paths)} endpoints...')
+        written = unchanged = removed = 0
+        for path in sorted(paths):
+            rendered = render_endpoint(path)
+            for key, content in rendered.items():
+                digest = hashlib.sha256(content).hexdigest()
+                if files.get(key, {}).get('sha256') == digest and (output / files[key]['path']).exists():
+                    unchanged += 1
+                    continue
+                files[key] = self.write_files(output, key, content, digest)
+                written += 1
+
+            # Drop pages that disappeared and endpoints that now 404
+            prefix = f'{path}?'
+            for key in [key for key in files if (key == path or key.startswith(prefix)) and key not in rendered]:
+                self.remove_files(output, files.pop(key)['path'])
+                removed += 1
+
+        (output / 'api').mkdir(parents=True, exist_ok=True)
+        (output / 'api' / '.htaccess').write_text(
+            HTACCESS.format(brotli_rules=BROTLI_RULES if brotli else '')
+        )
+        manifest_path.write_text(json.dumps({
+            'version': MANIFEST_VERSION,
+            'base_url': settings.API_BASE_URL,
+            'exported_at': exported_at.isoformat(),
+            'objects': objects,
+            'files': files,
+        }, indent=2, sort_keys=True))
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {written} written, {unchanged} unchanged, {removed} removed in {elapsed:.2f}s → {output}'
+        ))
+        if not brotli:
+            self.stdout.write(self.style.WARNING('💡 Install `brotli` to also produce .br variants'))
+
+    def derivative_states(self):
+        """{source image name: ids of its derivatives}; new ids mean regenerated derivatives"""
+        states = {}
+        for source, pk in ImageDerivative.objects.order_by('source', 'pk').values_list('source', 'pk'):
+            states.setdefault(source, []).append(pk)
+        return states
+
+    def collect_objects(self):
+        """Current state of every content object: last update, derivatives and affected endpoints"""
+        derivatives = self.derivative_states()
+        objects = {}
+        for model in CONTENT_MODELS:
+            queryset = model.objects.all()
+            if model is Service:
+                queryset = queryset.prefetch_related('projects')
+            elif model is ProjectImage:
+                queryset = queryset.select_related('project')
+            objects[model._meta.label_lower] = {
+                str(obj.pk): {
+                    'updated_at': obj.updated_at.isoformat(),
+                    'derivatives': {name: derivatives.get(name, []) for name in image_names(obj)},
+                    'endpoints': sorted(affected_endpoints(obj)),
+                }
+                for obj in queryset
+            }
+        return objects
+
+    def changed_endpoints(self, manifest, objects):
+        """Endpoints affected by objects created, updated or deleted since the last export"""
+        since = parse_datetime(manifest['exported_at'])
+        previous_objects = manifest['objects']
+        paths = set()
+        for label, entries in objects.items():
+            previous_entries = previous_objects.get(label, {})
+            for pk, entry in entries.items():
+                previous = previous_entries.get(pk)
+                if (
+                    previous is None
+                    or parse_datetime(entry['updated_at']) >= since
+                    or entry['derivatives'] != previous['derivatives']
+                ):
+                    # Old endpoints too, e.g. the detail of a renamed slug
+                    paths.update(entry['endpoints'])
+                    paths.update(previous['endpoints'] if previous else [])
+            for pk in previous_entries.keys() - entries.keys():
+                paths.update(previous_entries[pk]['endpoints'])
+        return paths
+
+    def write_files(self, output, key, content, digest):
+        relative = export_path(key)
+        target = output / relative
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(content)
+        # mtime=0 keeps .gz output deterministic across runs
+        Path(f'{target}.gz').write_bytes(gzip.compress(content, compresslevel=9, mtime=0))
+        if brotli:
+            Path(f'{target}.br').write_bytes(brotli.compress(content))
+        return {'path': relative, 'sha256': digest, 'size': len(content)}
+
+    def remove_files(self, output, relative):
+        for suffix in ('', '.gz', '.br'):
+            Path(f'{output / relative}{suffix}').unlink(missing_ok=True)
@@ -0,0 +1,57 @@
+"""
+Management command to generate responsive derivatives of every stored image
+Usage: python manage.py generate_image_derivatives [--force] [--prune]
+"""
+from django.core.management.base import BaseCommand
+from core.cache import bump_content_generation
+from core.images import IMAGE_FIELDS, delete_derivatives, generate_derivatives, image_names, missing_derivatives
+from core.models import ImageDerivative
+from core.snapshots import image_endpoints, refresh_snapshots, snapshots_enabled
+
+
+class Command(BaseCommand):
+    help = 'Generate WebP/JPEG derivatives for project and gallery images'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Regenerate derivatives that already exist',
+        )
+        parser.add_argument(
+            '--prune',
+            action='store_true',
+            help='Delete derivatives of images that are no longer used',
+        )
+
+    def handle(self, *args, **options):
+        names = set()
+        for model in IMAGE_FIELDS:
+            for instance in model.objects.only(*IMAGE_FIELDS[model]):
+                names.update(image_names(instance))
+
+        todo = sorted(names) if options['force'] else missing_derivatives(sorted(names))
+        self.stdout.write(f'🖼️  {len(todo)} of {len(names)} images to process...')
+
+        generated = []
+        for name in todo:
+            try:
+                derivatives = generate_derivatives(name)
+                generated.append(name)
+                self.stdout.write(self.style.SUCCESS(f'  ✓ {name} ({len(derivatives)} derivatives)'))
+            except (OSError, ValueError) as e:
+                self.stdout.write(self.style.ERROR(f'  ✗ {name}: {e}'))
+
+        if options['prune']:
+            unused = set(ImageDerivative.objects.values_list('source', flat=True).distinct()) - names
+            delete_derivatives(unused)
+            self.stdout.write(self.style.WARNING(f'  Pruned derivatives of {len(unused)} unused images'))
+
+        if generated or options['prune']:
+            bump_content_generation()
+        # Pruned images are unused: only the regenerated ones change served srcsets
+        if generated and snapshots_enabled():
+            endpoints = image_endpoints(generated)
+            refresh_snapshots(endpoints)
+            self.stdout.write(f'  Refreshed {len(endpoints)} snapshot endpoints')
+        self.stdout.write(self.style.SUCCESS(f'\n✨ {len(generated)} images processed'))
@@ -1,27 +1,169 @@
 """
 Management command to import project images from media_to_import folder
-Usage: python manage.py import_project_images
+Usage: python manage.py import_project_images [--manifest FILE] [--dry-run] [--workers N] [--incremental]
+       [--max-dimension PX] [--batch-size N]
+
+Services, projects and hero picks come from a JSON/YAML manifest (see
+core/import_plan.py, defaults to core/import_projects.json). --dry-run
+prints the plan (files to process, rows to write) and an estimated
+processing time without touching media or the database.
+
+Rows are staged in memory and committed in atomic batches of projects,
+each project (with its images) all-or-nothing: an interrupted or failed
+import never leaves a half-imported project visible.
 """
 import os
 import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from io import BytesIO
 from pathlib import Path
-from django.core.management.base import BaseCommand
+import django
+from django.core.management.base import BaseCommand, CommandError
 from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
 from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Count
+from core.cache import bump_content_generation
+from core import cropping
+from core.imaging import open_image
+from core.import_manifest import ImportManifest
+from core.import_plan import (
+    DEFAULT_MANIFEST, ImportPlan, gallery_image_name, hero_image_name, load_manifest, project_image_name,
+)
+from core.jobs import enqueue_image_derivatives
 from core.models import Project, ProjectImage, Service, GalleryImage
 from PIL import Image
-import numpy as np
+
+JPEG_QUALITY = 90
+MANIFEST_NAME = '.import-manifest.json'
+
+# Everything that changes the stored files: a change reprocesses every image
+PROCESSING_PARAMS = {
+    'crop': {
+        'colors': cropping.MARGIN_COLORS,
+        'tolerance': cropping.MARGIN_TOLERANCE,
+        'padding': cropping.CROP_PADDING,
+    },
+    'encoder': {'quality': JPEG_QUALITY, 'optimize': True},
+}
+
+
+def encode_image(img, img_path):
+    """Encoded bytes of a processed image, in the format of its source"""
+    buffer = BytesIO()
+    image_format = Image.registered_extensions().get(img_path.suffix.lower(), 'JPEG')
+    img.save(buffer, image_format, quality=JPEG_QUALITY, optimize=True)
+    return buffer.getvalue()
+
+
+def store_image(img, img_path, name):
+    """Save a cropped image through the media storage and return its stored name"""
+    # Content-addressed storage: the same photo imported twice is stored once
+    return default_storage.save(name, ContentFile(encode_image(img, img_path)))
+
+
+def processing_params(max_dimension=None):
+    return dict(PROCESSING_PARAMS, decode={'exif_orientation': True, 'max_dimension': max_dimension})
+
+
+def process_image(img_path, name, max_dimension=None):
+    """
+    Decode, crop, encode and store one image. Runs in worker processes, so
+    nothing touches the database. Returns (stored name, warning, error).
+
+    The file is decoded once, upright, and with `max_dimension` at the
+    smallest JPEG draft scale still covering it before the final resize.
+    """
+    try:
+        img, warning = prepare_image(img_path, max_dimension)
+    except Exception as e:
+        return None, None, str(e)
+    try:
+        return store_image(img, img_path, name), warning, None
+    except Exception as e:
+        return None, warning, str(e)
+
+
+def prepare_image(img_path, max_dimension=None):
+    """Decoded, cropped and resized image with its crop warning; raises if the file cannot be decoded"""
+    min_size = (max_dimension, max_dimension) if max_dimension else None
+    img = open_image(img_path, min_size=min_size)
+    warning = None
+    try:
+        img = cropping.crop_margins(img)
+    except Exception as e:
+        warning = f'Could not crop image {img_path.name}: {e}'
+    if max_dimension:
+        img.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+    return img, warning
+
+
+def _init_process():
+    # Spawned processes (non-fork platforms) start without Django configured
+    django.setup()
 
 
 class Command(BaseCommand):
     help = 'Import project images from media_to_import folder'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--manifest',
+            default=DEFAULT_MANIFEST,
+            help='JSON or YAML file describing the services, projects and hero images to import',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Print the import plan and its estimated processing time without writing anything',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Processes used to crop and encode images (database writes stay in the main process)',
+        )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Update projects and images in place, only reprocessing changed source images',
+        )
+        parser.add_argument(
+            '--max-dimension',
+            type=int,
+            default=None,
+            help='Downscale imported images to fit in PX x PX (decoding JPEG files at a reduced scale)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10,
+            help='Projects committed per transaction',
+        )
+
     def handle(self, *args, **options):
         # Base paths
         base_dir = settings.BASE_DIR.parent
         import_dir = base_dir / 'media_to_import'
         media_dir = settings.MEDIA_ROOT
         
+        # Services, projects and hero picks
+        try:
+            definitions = load_manifest(options['manifest'])
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Invalid manifest {options["manifest"]}: {e}')
+        plan = ImportPlan(definitions, import_dir, workers=options['workers'])
+        planned = plan.images()
+        self.max_dimension = options['max_dimension']
+        manifest = ImportManifest(import_dir / MANIFEST_NAME, processing_params(self.max_dimension))
+        if options['dry_run']:
+            self.print_plan(plan, planned, manifest, options)
+            return
+        
         # Ensure media directories exist
         Path(media_dir).mkdir(parents=True, exist_ok=True)
         Path(media_dir, 'projects', 'featured').mkdir(parents=True, exist_ok=True)
@@ -32,373 +174,394 @@ class Command(BaseCommand):
         self.stdout.write(self.style.SUCCESS('📁 Creating media directories...'))
         
         # Create or get services
-        services = self.create_services()
+        self.services = self.create_services(definitions['services'])
+        projects_data = definitions['projects']
         
-        # Project definitions
-        projects_data = [
-            {
-                'number': 1,
-                'title': 'Rénovation Cuisine Moderne',
-                'service': services['cuisine'],
-                'location': 'Lattes',
-                'short_desc': 'Transformation complète d\'une cuisine avec îlot central et électroménagers haut de gamme.',
-                'description': 'Projet de rénovation complète d\'une cuisine familiale. Création d\'un espace moderne et fonctionnel avec îlot central, plan de travail en quartz, et intégration d\'électroménagers p. Les finitions soignées et l\'optimisation de l\'espace offrent un résultat élégant et pratique.',
-                'duration': '3 semaines',
-                'surface': '25 m²',
-                'has_before_after': True,
-            },
-            {
-                'number': 2,
-                'title': 'Salle de Bain Contemporaine',
-                'service': services['salle_bain'],
-                'location': 'Montpellier',
-                'short_desc': 'Rénovation d\'une salle de bain avec douche à l\'italienne et carrelage grand format.',
-                'description': 'Rénovation complète d\'une salle de bain en style contemporain. Installation d\'une douche à l\'italienne, carrelage grand format effet béton, meuble vasque suspendu et robinetterie design. L\'éclairage LED intégré crée une ambiance chaleureuse et moderne.',
-                'duration': '2 semaines',
-                'surface': '8 m²',
-                'has_before_after': True,
-            },
-            {
-                'number': 3,
-                'title': 'Aménagement Rangement Sur-Mesure',
-                'service': services['rangement'],
-                'location': 'Pérols',
-                'short_desc': 'Création de rangements sur-mesure optimisant chaque espace disponible.',
-                'description': 'Conception et installation de rangements sur-mesure adaptés aux besoins du client. Bibliothèque murale, placards intégrés et espaces de rangement intelligents maximisant l\'utilisation de l\'espace tout en conservant une esthétique épurée.',
-                'duration': '1 semaine',
-                'surface': '15 m²',
-                'has_before_after': True,
-            },
-            {
-                'number': 4,
-                'title': 'Cuisine Ouverte avec Verrière',
-                'service': services['cuisine'],
-                'location': 'Castelnau-le-Lez',
-                'short_desc': 'Ouverture cuisine avec verrière d\'atelier et aménagement moderne.',
-                'description': 'Transformation d\'une cuisine fermée en espace ouvert avec verrière d\'atelier. Installation d\'une cuisine équipée moderne, création d\'un bar américain et optimisation de l\'espace de vie. Le projet inclut également la réfection des sols et peintures.',
-                'duration': '4 semaines',
-                'surface': '30 m²',
-                'has_before_after': True,
-            },
-            {
-                'number': 5,
-                'title': 'Salle de Bain Luxe',
-                'service': services['salle_bain'],
-                'location': 'Palavas-les-Flots',
-                'short_desc': 'Salle de bain haut de gamme avec baignoire îlot et matériaux nobles.',
-                'description': 'Création d\'une salle de bain luxueuse avec baignoire îlot, double vasque, douche à l\'italienne et carrelage en marbre. Robinetterie dorée, miroirs avec éclairage LED et chauffage au sol pour un confort optimal. Un projet d\'exception alliant élégance et fonctionnalité.',
-                'duration': '3 semaines',
-                'surface': '12 m²',
-                'has_before_after': True,
-            },
-            {
-                'number': 6,
-                'title': 'Rénovation Multi-Pièces',
-                'service': services['autre'],
-                'location': 'Lattes',
-                'short_desc': 'Rénovation complète d\'un appartement incluant cuisine, salle de bain et séjour.',
-                'description': 'Rénovation globale d\'un appartement avec réfection complète de la cuisine, salle de bain, sols, peintures et menuiseries. Un projet d\'envergure coordonné avec plusieurs corps de métier pour un résultat harmonieux et contemporain.',
-                'duration': '6 semaines',
-                'surface': '65 m²',
-                'has_before_after': False,
-            },
-            {
-                'number': 7,
-                'title': 'Aménagement Combles',
-                'service': services['autre'],
-                'location': 'Montpellier',
-                'short_desc': 'Transformation de combles en espace de vie moderne et lumineux.',
-                'description': 'Aménagement complet de combles perdus en suite parentale avec salle de bain attenante. Isolation thermique, création de fenêtres de toit, parquet massif et décoration contemporaine. Un nouvel espace de vie optimisé sous les toits.',
-                'duration': '5 semaines',
-                'surface': '35 m²',
-                'has_before_after': False,
-            },
-            {
-                'number': 8,
-                'title': 'Cuisine Moderne Épurée',
-                'service': services['cuisine'],
-                'location': 'Villeneuve-lès-Maguelone',
-                'short_desc': 'Cuisine design aux lignes épurées avec rangements intégrés.',
-                'description': 'Installation d\'une cuisine moderne aux finitions impeccables. Façades laquées sans poignées, plan de travail en Silestone, électroménagers encastrés et système de rangement optimisé. Un design minimaliste pour une cuisine élégante et fonctionnelle.',
-                'duration': '2 semaines',
-                'surface': '20 m²',
-                'has_before_after': False,
-            },
-        ]
+        self.processed = {}
+        self.gallery_rows = {}
+        self.project_image_rows = {}
+        if options['incremental']:
+            self.run_incremental(projects_data, plan, planned, manifest, options['workers'])
+            return
+        
+        # Crop and encode every image up front, possibly in parallel
+        for img_path, name in planned:
+            manifest.fingerprint(name, img_path)
+        self.process_images(planned, options['workers'])
         
         self.stdout.write(self.style.SUCCESS('\n🏗️  Creating projects and importing images...\n'))
         
         # Import projects
-        for project_data in projects_data:
-            project = self.create_project(project_data, import_dir, media_dir)
-            if project:
-                self.stdout.write(self.style.SUCCESS(f'✓ Project {project_data["number"]}: {project.title}'))
+        self.written_rows = 0
+        self.write_started = time.perf_counter()
+        staged = [(project_data, *self.stage_project(project_data, plan)) for project_data in projects_data]
+        self.write_projects(staged, max(1, options['batch_size']))
         
         # Create some gallery showcase images
-        self.create_gallery_images(import_dir, media_dir)
+        self.create_gallery_images(plan)
+        self.save_manifest(manifest)
+        
+        elapsed = time.perf_counter() - self.write_started
+        self.stdout.write(self.style.SUCCESS(
+            f'\n📊 {self.written_rows} rows written in {elapsed:.2f}s ({self.written_rows / elapsed:.0f} rows/s)'
+        ))
         
         self.stdout.write(self.style.SUCCESS('\n✨ Import completed successfully!'))
         self.stdout.write(self.style.WARNING('\n💡 Tip: You can now edit images in Django admin and swap/remove any you don\'t like.'))
 
-    def create_services(self):
-        """Create or get existing services"""
+    def create_services(self, services_data):
+        """Create or get existing services, by manifest key"""
         services = {}
+        for key, service_data in services_data.items():
+            fields = dict(service_data)
+            services[key], _ = Service.objects.get_or_create(
+                slug=fields.pop('slug'),
+                defaults={**fields, 'is_active': True},
+            )
+        return services
+
+    def process_images(self, planned, workers):
+        """Crop, encode and store the planned images, keeping results in plan order"""
+        self.stdout.write(self.style.SUCCESS(f'🖼️  Processing {len(planned)} images ({max(1, workers)} worker(s))...'))
+        paths = [img_path for img_path, _ in planned]
+        names = [name for _, name in planned]
+        process = partial(process_image, max_dimension=self.max_dimension)
+        if workers > 1:
+            # Forked children must not share the parent's database connections
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_process) as executor:
+                results = list(executor.map(process, paths, names))
+        else:
+            results = list(map(process, paths, names))
+        self.processed.update(zip(names, results))
+
+    def stored_image(self, name):
+        """Stored name of a processed image, reporting its crop warning; raises on failure"""
+        stored, warning, error = self.processed[name]
+        if warning:
+            self.stdout.write(self.style.WARNING(f'  ⚠ {warning}'))
+        if error:
+            raise RuntimeError(error)
+        return stored
+
+    def project_fields(self, project_data):
+        """Project field values defined by the import"""
+        return {
+            'title': project_data['title'],
+            'service': self.services.get(project_data['service']),
+            'location': project_data['location'],
+            'short_description': project_data['short_description'],
+            'description': project_data['description'],
+            'duration': project_data['duration'],
+            'surface': project_data['surface'],
+            'has_before_after': project_data['has_before_after'],
+            'is_featured': project_data['has_before_after'],
+            'is_active': True,
+            'order': project_data['number'],
+        }
+
+    def stage_project(self, project_data, plan):
+        """Unsaved project and gallery rows of one imported project"""
+        slug = project_data['slug']
+        project = Project(slug=slug, **self.project_fields(project_data))
+        images = []
+        after, before = plan.project_images(project_data)
         
-        services['cuisine'], _ = Service.objects.get_or_create(
-            slug='cuisine',
-            defaults={
-                'title': 'Aménagement Cuisine',
-                'short_description': 'Cuisine sur-mesure et aménagement complet',
-                'description': 'Conception et installation de cuisines modernes et fonctionnelles adaptées à vos besoins.',
-                'icon': 'Kitchen',
-                'order': 1,
-                'is_active': True,
-            }
-        )
-        
-        services['salle_bain'], _ = Service.objects.get_or_create(
-            slug='salle-de-bain',
-            defaults={
-                'title': 'Salle de Bain',
-                'short_description': 'Rénovation et création de salles de bain',
-                'description': 'Transformation de votre salle de bain en un espace moderne, confortable et fonctionnel.',
-                'icon': 'Bathroom',
-                'order': 2,
-                'is_active': True,
-            }
-        )
-        
-        services['rangement'], _ = Service.objects.get_or_create(
-            slug='rangement',
-            defaults={
-                'title': 'Rangement Sur-Mesure',
-                'short_description': 'Solutions de rangement personnalisées',
-                'description': 'Création de rangements sur-mesure pour optimiser votre espace de vie.',
-                'icon': 'Storage',
-                'order': 3,
-                'is_active': True,
-            }
-        )
+        # Import main "after" image
+        if after:
+            # Use first image as featured (cropped and saved by process_images)
+            project.featured_image = self.imported_image(
+                project_image_name(after[0], slug, 'featured'), 'Error copying image',
+            ) or ''
+            
+            # Import remaining as gallery
+            for order, img_path in enumerate(after[1:], start=1):
+                stored = self.imported_image(gallery_image_name(img_path, slug, order), 'Error copying gallery image')
+                if stored is not None:
+                    images.append(ProjectImage(project=project, image=stored, order=order, is_visible=True))
         
-        services['autre'], _ = Service.objects.get_or_create(
-            slug='renovation-generale',
-            defaults={
-                'title': 'Rénovation Générale',
-                'short_description': 'Tous travaux de rénovation',
-                'description': 'Rénovation complète de votre habitat avec coordination de tous les corps de métier.',
-                'icon': 'HomeRepairService',
-                'order': 4,
-                'is_active': True,
-            }
-        )
+        # Import "before" image if exists
+        if before:
+            project.before_image = self.imported_image(
+                project_image_name(before[0], slug, 'before'), 'Error copying image',
+            ) or ''
         
-        return services
+        return project, images
 
-    def create_project(self, project_data, import_dir, media_dir):
-        """Create a project and import its images"""
-        project_num = project_data['number']
-        
-        # Check if project already exists
-        slug = f"projet-{project_num}"
-        existing_project = Project.objects.filter(slug=slug).first()
+    def write_projects(self, staged, batch_size):
+        """Commit staged projects in atomic batches, each project all-or-nothing"""
+        for start in range(0, len(staged), batch_size):
+            with transaction.atomic():
+                for project_data, project, images in staged[start:start + batch_size]:
+                    try:
+                        with transaction.atomic():
+                            rows = self.save_project(project, images)
+                    except Exception as e:
+                        self.stdout.write(self.style.ERROR(f'  ✗ Project {project_data["number"]} not imported: {e}'))
+                        continue
+                    self.written_rows += rows
+                    self.stdout.write(self.style.SUCCESS(f'✓ Project {project_data["number"]}: {project.title}'))
+                transaction.on_commit(bump_content_generation)
+            elapsed = time.perf_counter() - self.write_started
+            self.stdout.write(f'  ⏱ {self.written_rows} rows committed ({self.written_rows / elapsed:.0f} rows/s)')
+
+    def save_project(self, project, images):
+        """Replace the project of the same slug; returns the number of rows written"""
+        existing_project = Project.objects.filter(slug=project.slug).first()
         if existing_project:
             existing_project.delete()
-            self.stdout.write(self.style.WARNING(f'  ⚠ Project {project_num} already exists, deleting and recreating...'))
-        
-        project = Project.objects.create(
-            slug=slug,
-            title=project_data['title'],
-            service=project_data['service'],
-            location=project_data['location'],
-            short_description=project_data['short_desc'],
-            description=project_data['description'],
-            duration=project_data['duration'],
-            surface=project_data['surface'],
-            has_before_after=project_data['has_before_after'],
-            is_featured=project_data['has_before_after'],
-            is_active=True,
-            order=project_num,
-        )
+            self.stdout.write(self.style.WARNING(f'  ⚠ Project {project.order} already exists, deleting and recreating...'))
+        project.save()
+        ProjectImage.objects.bulk_create(images)
+        # bulk_create sends no post_save signal: queue the derivatives it would have
+        for image in images:
+            enqueue_image_derivatives(image)
+        self.project_image_rows[project.slug] = [image.pk for image in images]
+        return 1 + len(images)
+
+    def create_gallery_images(self, plan):
+        """Create some showcase gallery images for homepage"""
+        self.stdout.write(self.style.SUCCESS('\n📸 Creating gallery showcase images...'))
         
-        # Import featured image (from "a" folder = after)
-        if project_data['has_before_after']:
-            after_folder = import_dir / f"{project_num}a"
-            before_folder = import_dir / f"{project_num}b"
-        else:
-            after_folder = import_dir / str(project_num)
-            before_folder = None
+        # Hero images picked from various projects
+        heroes = list(plan.hero_images())
+        projects = Project.objects.in_bulk([hero['project'] for hero, _ in heroes if hero['project']], field_name='slug')
         
-        # Import main "after" image
-        if after_folder.exists():
-            images = sorted([f for f in after_folder.iterdir() if f.suffix.lower() in ['.jpg', '.jpeg', '.png']])
-            if images:
-                # Use first image as featured
-                self.copy_image_to_project(images[0], project, 'featured')
-                
-                # Import remaining as gallery
-                for i, img_path in enumerate(images[1:], start=1):
-                    self.copy_image_to_gallery(img_path, project, i)
+        gallery_images = []
+        for hero, img_path in heroes:
+            # Cropped and saved by process_images (shared with the project image of the same photo)
+            relative_path = self.imported_image(hero_image_name(img_path, hero['folder']), 'Error creating gallery image')
+            if relative_path is not None:
+                gallery_images.append(GalleryImage(
+                    title=hero['title'],
+                    image=relative_path,
+                    category='hero',
+                    linked_project=projects.get(hero['project']),
+                    is_active=True,
+                    order=hero['order'],
+                ))
         
-        # Import "before" image if exists
-        if before_folder and before_folder.exists():
-            images = sorted([f for f in before_folder.iterdir() if f.suffix.lower() in ['.jpg', '.jpeg', '.png']])
-            if images:
-                # Use first image as before_image
-                self.copy_image_to_project(images[0], project, 'before')
+        # Existing gallery images are replaced in the same transaction
+        self.stdout.write(self.style.WARNING('  Clearing existing gallery images...'))
+        with transaction.atomic():
+            GalleryImage.objects.all().delete()
+            GalleryImage.objects.bulk_create(gallery_images)
+            for gallery_image in gallery_images:
+                enqueue_image_derivatives(gallery_image)
+            transaction.on_commit(bump_content_generation)
+        self.written_rows += len(gallery_images)
         
-        return project
+        for gallery_image in gallery_images:
+            self.gallery_rows[gallery_image.title] = gallery_image.pk
+            project = gallery_image.linked_project
+            self.stdout.write(self.style.SUCCESS(
+                f'  ✓ Added hero image: {gallery_image.title} (linked to {project.slug if project else None})'
+            ))
 
-    def crop_margins(self, img_path):
-        """Crop black margins and iPhone notch areas from image"""
-        try:
-            img = Image.open(img_path)
-            img_array = np.array(img)
-            
-            # Define margin colors to remove with RGB values
-            margin_colors = [
-                [0, 0, 0],         # #000000 - Pure black (sides)
-                [36, 37, 39],      # #242527 - Dark gray (top/bottom)
-                [104, 105, 107],   # #68696b - iPhone notch area
-            ]
-            
-            # Convert to RGB if needed
-            if len(img_array.shape) == 2:
-                # Grayscale to RGB
-                img_array = np.stack([img_array] * 3, axis=-1)
-            elif img_array.shape[2] == 4:
-                # RGBA to RGB
-                img_array = img_array[:, :, :3]
-            
-            # Create a mask for non-margin pixels
-            # Allow tolerance for compression artifacts and slight color variations
-            tolerance = 15
-            
-            # Start with all pixels as potential margins
-            is_margin = np.ones(img_array.shape[:2], dtype=bool)
-            
-            # For each margin color, mark pixels that DON'T match as content
-            for color in margin_colors:
-                color_diff = np.abs(img_array - np.array(color))
-                color_distance = np.sqrt(np.sum(color_diff ** 2, axis=2))
-                # Pixels significantly different from this margin color are content
-                is_margin &= (color_distance <= tolerance)
-            
-            # Invert to get content mask
-            content_mask = ~is_margin
-            
-            # Find bounding box of content
-            rows = np.any(content_mask, axis=1)
-            cols = np.any(content_mask, axis=0)
-            
-            if rows.any() and cols.any():
-                rmin, rmax = np.where(rows)[0][[0, -1]]
-                cmin, cmax = np.where(cols)[0][[0, -1]]
-                
-                # Add small padding to avoid cutting content (2 pixels)
-                height, width = img_array.shape[:2]
-                rmin = max(0, rmin - 2)
-                rmax = min(height - 1, rmax + 2)
-                cmin = max(0, cmin - 2)
-                cmax = min(width - 1, cmax + 2)
-                
-                # Crop image
-                cropped = img.crop((cmin, rmin, cmax + 1, rmax + 1))
-                return cropped
-            
-            return img
-        except Exception as e:
-            self.stdout.write(self.style.WARNING(f'  ⚠ Could not crop image {img_path.name}: {e}'))
-            return Image.open(img_path)
+    def print_plan(self, plan, planned, manifest, options):
+        """Describe the files and rows the import would touch, without writing any"""
+        definitions = plan.manifest
+        incremental = options['incremental']
+        self.stdout.write(self.style.SUCCESS('🧭 Import plan (dry run, nothing is written)\n'))
+        created = deleted = 0
 
-    def copy_image_to_project(self, img_path, project, image_type='featured'):
-        """Copy and crop an image file to project"""
-        try:
-            dest_folder = 'featured' if image_type == 'featured' else 'before'
-            dest_path = Path(settings.MEDIA_ROOT) / 'projects' / dest_folder / f"{project.slug}_{img_path.name}"
-            
-            # Crop margins and save
-            cropped_img = self.crop_margins(img_path)
-            cropped_img.save(dest_path, quality=90, optimize=True)
-            
-            # Update project
-            relative_path = f'projects/{dest_folder}/{dest_path.name}'
-            if image_type == 'featured':
-                project.featured_image = relative_path
+        slugs = [service['slug'] for service in definitions['services'].values()]
+        existing_services = set(Service.objects.filter(slug__in=slugs).values_list('slug', flat=True))
+        for slug in slugs:
+            if slug not in existing_services:
+                created += 1
+                self.stdout.write(self.style.SUCCESS(f'  + service {slug}'))
+
+        existing = Project.objects.filter(slug__in=[project['slug'] for project in definitions['projects']])
+        existing = {project.slug: project for project in existing.annotate(image_count=Count('images'))}
+        for project in definitions['projects']:
+            after, before = plan.project_images(project)
+            current = existing.get(project['slug'])
+            action = ('update' if incremental else 'replace') if current else 'create'
+            style = self.style.WARNING if current else self.style.SUCCESS
+            self.stdout.write(style(
+                f'  {"~" if current else "+"} {project["slug"]} {project["title"]}: {action}, '
+                f'{min(len(after), 1)} featured, {min(len(before), 1)} before, {max(len(after) - 1, 0)} gallery images'
+            ))
+            for folder in plan.missing_folders(project):
+                self.stdout.write(self.style.WARNING(f'    ⚠ Folder {folder} not found'))
+            if not incremental:
+                created += 1 + max(len(after) - 1, 0)
+                deleted += 1 + current.image_count if current else 0
+
+        heroes = list(plan.hero_images())
+        for hero, img_path in heroes:
+            self.stdout.write(self.style.SUCCESS(f'  + hero image {hero["title"]} ({hero["folder"]}/{img_path.name})'))
+        for hero in definitions['heroes']:
+            if hero not in [picked for picked, _ in heroes]:
+                self.stdout.write(self.style.WARNING(f'    ⚠ Hero image {hero["title"]}: no image #{hero["index"]} in {hero["folder"]}'))
+        if not incremental:
+            # The gallery is replaced by the hero images
+            created += len(heroes)
+            deleted += GalleryImage.objects.count()
+
+        todo = [(img_path, name) for img_path, name in planned if not (incremental and manifest.unchanged(name, img_path))]
+        pixels = plan.pixels([img_path for img_path, _ in todo], options['workers'])
+        unreadable = sorted(str(path.relative_to(plan.import_dir)) for path, count in pixels.items() if count is None)
+        megapixels = sum(count for count in pixels.values() if count) / 1e6
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\n📋 {len(todo)} images to process ({megapixels:.1f} MP), {len(planned) - len(todo)} unchanged images skipped'
+        ))
+        if incremental:
+            self.stdout.write(self.style.SUCCESS('🗄️  Rows updated in place, only where fields change'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'🗄️  {created} rows to create, {deleted} rows to delete'))
+        if unreadable:
+            self.stdout.write(self.style.WARNING(f'⚠ {len(unreadable)} files are not readable images: {", ".join(unreadable)}'))
+
+        readable = sorted((count, str(path)) for path, count in pixels.items() if count)
+        if readable:
+            # Processing time grows with the pixel count: time a median image, in memory only
+            count, sample = readable[len(readable) // 2]
+            started = time.perf_counter()
+            img, _ = prepare_image(Path(sample), self.max_dimension)
+            encode_image(img, Path(sample))
+            seconds_per_megapixel = (time.perf_counter() - started) / (count / 1e6)
+            workers = max(1, options['workers'])
+            self.stdout.write(self.style.SUCCESS(
+                f'⏱  Estimated processing time: {megapixels * seconds_per_megapixel / workers:.1f}s with {workers} worker(s) '
+                f'({seconds_per_megapixel:.3f}s/MP measured on {Path(sample).name})'
+            ))
+
+    def save_manifest(self, manifest):
+        """Record the stored file of every processed image and the imported rows"""
+        for name, (stored, _, _) in self.processed.items():
+            if stored:
+                manifest.record(name, stored)
+        manifest.gallery = self.gallery_rows
+        # Projects left out of this import keep their record
+        manifest.project_images = {**manifest.project_images, **self.project_image_rows}
+        manifest.save()
+
+    def run_incremental(self, projects_data, plan, planned, manifest, workers):
+        """Update projects and images in place, only processing changed source images"""
+        todo = []
+        for img_path, name in planned:
+            stored = manifest.unchanged(name, img_path)
+            if stored:
+                self.processed[name] = (stored, None, None)
             else:
-                project.before_image = relative_path
-            project.save()
-            
-            return True
-        except Exception as e:
-            self.stdout.write(self.style.ERROR(f'  ✗ Error copying image: {e}'))
-            return False
+                todo.append((img_path, name))
+        self.stdout.write(self.style.SUCCESS(f'🔍 {len(planned) - len(todo)} unchanged images skipped'))
+        if todo:
+            self.process_images(todo, workers)
+
+        self.diff = []
+        self.unchanged_rows = 0
+        self.stdout.write(self.style.SUCCESS('\n🔄 Synchronizing projects and images...\n'))
+        for project_data in projects_data:
+            # A project and its images change together
+            with transaction.atomic():
+                self.sync_project(project_data, plan, manifest)
+        with transaction.atomic():
+            self.sync_gallery_images(plan, manifest)
+        self.save_manifest(manifest)
 
-    def copy_image_to_gallery(self, img_path, project, order):
-        """Copy and crop an image to project gallery"""
+        self.stdout.write(self.style.SUCCESS(
+            f'\n📋 {len(todo)} images processed, {len(self.diff)} changes, {self.unchanged_rows} rows unchanged'
+        ))
+        styles = {'+': self.style.SUCCESS, '~': self.style.WARNING, '-': self.style.ERROR}
+        for symbol, text in self.diff:
+            self.stdout.write(styles[symbol](f'  {symbol} {text}'))
+        self.stdout.write(self.style.SUCCESS('\n✨ Incremental import completed!'))
+
+    def imported_image(self, name, error_message):
+        """Stored name of a planned image, or None (error reported) if it could not be processed"""
         try:
-            dest_path = Path(settings.MEDIA_ROOT) / 'projects' / 'gallery' / f"{project.slug}_{order}_{img_path.name}"
-            
-            # Crop margins and save
-            cropped_img = self.crop_margins(img_path)
-            cropped_img.save(dest_path, quality=90, optimize=True)
-            
-            # Create ProjectImage
-            relative_path = f'projects/gallery/{dest_path.name}'
-            ProjectImage.objects.create(
-                project=project,
-                image=relative_path,
-                order=order,
-                is_visible=True,
-            )
-            
-            return True
+            return self.stored_image(name)
         except Exception as e:
-            self.stdout.write(self.style.ERROR(f'  ✗ Error copying gallery image: {e}'))
-            return False
+            self.stdout.write(self.style.ERROR(f'  ✗ {error_message}: {e}'))
+            return None
 
-    def create_gallery_images(self, import_dir, media_dir):
-        """Create some showcase gallery images for homepage"""
-        self.stdout.write(self.style.SUCCESS('\n📸 Creating gallery showcase images...'))
-        
-        # Clear existing gallery images
-        GalleryImage.objects.all().delete()
-        self.stdout.write(self.style.WARNING('  Clearing existing gallery images...'))
-        
-        # Select some hero images from various projects  
-        hero_selections = [
-            ('6', 0, 'Rénovation Moderne', 'projet-6'),
-            ('7', 5, 'Aménagement Élégant', 'projet-7'),
-            ('1a', 2, 'Cuisine Design', 'projet-1'),
-            ('2a', 3, 'Salle de Bain Contemporaine', 'projet-2'),
-            ('4a', 1, 'Cuisine avec Verrière', 'projet-4'),
-            ('5a', 2, 'Salle de Bain Luxe', 'projet-5'),
-        ]
-        
-        for folder_name, img_index, title, project_slug in hero_selections:
-            folder = import_dir / folder_name
-            if folder.exists():
-                images = sorted([f for f in folder.iterdir() if f.suffix.lower() in ['.jpg', '.jpeg', '.png']])
-                if len(images) > img_index:
-                    try:
-                        # Get the project by slug
-                        project = Project.objects.filter(slug=project_slug).first()
-                        
-                        img_path = images[img_index]
-                        dest_path = Path(media_dir) / 'gallery' / f"hero_{folder_name}_{img_path.name}"
-                        
-                        # Crop margins and save
-                        cropped_img = self.crop_margins(img_path)
-                        cropped_img.save(dest_path, quality=90, optimize=True)
-                        
-                        relative_path = f'gallery/{dest_path.name}'
-                        GalleryImage.objects.create(
-                            title=title,
-                            image=relative_path,
-                            category='hero',
-                            linked_project=project,
-                            is_active=True,
-                            order=len(hero_selections) - hero_selections.index((folder_name, img_index, title, project_slug)),
-                        )
-                        self.stdout.write(self.style.SUCCESS(f'  ✓ Added hero image: {title} (linked to {project_slug})'))
-                    except Exception as e:
-                        self.stdout.write(self.style.ERROR(f'  ✗ Error creating gallery image: {e}'))
+    def sync_fields(self, instance, fields, label):
+        """Create `instance` or save only the fields that differ from `fields`"""
+        if instance.pk is None:
+            for field, value in fields.items():
+                setattr(instance, field, value)
+            instance.save()
+            self.diff.append(('+', label))
+            return
+        changed = [field for field, value in fields.items() if getattr(instance, field) != value]
+        if not changed:
+            self.unchanged_rows += 1
+            return
+        for field in changed:
+            setattr(instance, field, fields[field])
+        instance.save(update_fields=changed + ['updated_at'])
+        self.diff.append(('~', f'{label}: {", ".join(changed)}'))
+
+    def sync_project(self, project_data, plan, manifest):
+        """Create or update one project and its gallery without recreating unchanged rows
+
+        Only the images a previous import created are updated or deleted: the
+        ones added by hand in the admin are left alone.
+        """
+        slug = project_data['slug']
+        after, before = plan.project_images(project_data)
+
+        fields = self.project_fields(project_data)
+        for field, sources, image_type in [('featured_image', after, 'featured'), ('before_image', before, 'before')]:
+            if not sources:
+                # Vanished image
+                fields[field] = ''
+                continue
+            stored = self.imported_image(project_image_name(sources[0], slug, image_type), 'Error copying image')
+            if stored is not None:
+                # A failed image keeps the current file
+                fields[field] = stored
+        project = Project.objects.filter(slug=slug).first() or Project(slug=slug)
+        self.sync_fields(project, fields, slug)
+
+        imported = manifest.project_images.get(slug)
+        images = project.images.all()
+        if imported is not None:
+            images = [image for image in images if image.pk in imported]
+        existing = {image.order: image for image in images}
+        rows = []
+        for order, img_path in enumerate(after[1:], start=1):
+            image = existing.pop(order, None) or ProjectImage(project=project, order=order, is_visible=True)
+            stored = self.imported_image(gallery_image_name(img_path, slug, order), 'Error copying gallery image')
+            if stored is not None:
+                self.sync_fields(image, {'image': stored}, f'{slug} image {order}')
+            if image.pk:
+                rows.append(image.pk)
+        self.project_image_rows[slug] = rows
+        if imported is None:
+            # No record (manifest from an older import): nothing is known to be ours to delete
+            return
+        for image in existing.values():
+            image.delete()
+            self.diff.append(('-', f'{slug} image {image.order}'))
+
+    def sync_gallery_images(self, plan, manifest):
+        """Create or update the imported hero images, deleting the ones no longer selected"""
+        for hero, img_path in plan.hero_images():
+            title = hero['title']
+            pk = manifest.gallery.get(title)
+            gallery_image = (
+                GalleryImage.objects.filter(pk=pk).first() if pk
+                else GalleryImage.objects.filter(title=title, category='hero').first()
+            ) or GalleryImage()
+            stored = self.imported_image(hero_image_name(img_path, hero['folder']), 'Error creating gallery image')
+            if stored is not None:
+                self.sync_fields(gallery_image, {
+                    'title': title,
+                    'image': stored,
+                    'category': 'hero',
+                    'linked_project': Project.objects.filter(slug=hero['project']).first() if hero['project'] else None,
+                    'is_active': True,
+                    'order': hero['order'],
+                }, f'hero image {title}')
+            if gallery_image.pk:
+                self.gallery_rows[title] = gallery_image.pk
+
+        stale = [pk for title, pk in manifest.gallery.items() if title not in self.gallery_rows]
+        for gallery_image in GalleryImage.objects.filter(pk__in=stale):
+            gallery_image.delete()
+            self.diff.append(('-', f'hero image {gallery_image.title}'))
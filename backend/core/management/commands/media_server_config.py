@@ -0,0 +1,72 @@
+"""
+Management command writing the web server configuration of media sendfile
+Usage: python manage.py media_server_config [--server apache|nginx] [--htaccess PATH]
+
+Prints the block letting the front server stream files under MEDIA_ROOT for
+core.media.serve_media (MEDIA_SENDFILE): mod_xsendfile directives for
+Apache, an internal location aliased to MEDIA_ROOT for nginx. With
+--htaccess, the Apache block of that file (between the BEGIN/END markers)
+is replaced instead, which the deployment does for backend/.htaccess.
+"""
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+BEGIN_MARKER = '# BEGIN media sendfile (generated by `manage.py media_server_config`)'
+END_MARKER = '# END media sendfile'
+
+
+def apache_block():
+    media_root = os.path.abspath(settings.MEDIA_ROOT)
+    return '\n'.join([
+        BEGIN_MARKER,
+        '<IfModule mod_xsendfile.c>',
+        '    XSendFile On',
+        f'    XSendFilePath "{media_root}"',
+        '</IfModule>',
+        END_MARKER,
+    ])
+
+
+def nginx_block():
+    media_root = os.path.join(os.path.abspath(settings.MEDIA_ROOT), '')
+    return '\n'.join([
+        f'location {settings.MEDIA_ACCEL_PREFIX} {{',
+        '    internal;',
+        f'    alias {media_root};',
+        '}',
+    ])
+
+
+def replace_block(text, block):
+    """`text` with its marked block replaced by `block`"""
+    start = text.find(BEGIN_MARKER)
+    end = text.find(END_MARKER, start)
+    if start == -1 or end == -1:
+        raise CommandError(f'Marqueurs introuvables : ajoutez "{BEGIN_MARKER}" et "{END_MARKER}" au fichier.')
+    return text[:start] + block + text[end + len(END_MARKER):]
+
+
+class Command(BaseCommand):
+    help = 'Print or write the web server configuration serving media files through sendfile'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--server',
+            choices=['apache', 'nginx'],
+            help='Web server (default: from MEDIA_SENDFILE, apache when unset)',
+        )
+        parser.add_argument('--htaccess', help='.htaccess file whose media sendfile block is rewritten')
+
+    def handle(self, *args, **options):
+        server = options['server'] or ('nginx' if settings.MEDIA_SENDFILE == 'x-accel-redirect' else 'apache')
+        if options['htaccess']:
+            if server != 'apache':
+                raise CommandError('--htaccess ne concerne que Apache.')
+            path = Path(options['htaccess'])
+            path.write_text(replace_block(path.read_text(), apache_block()))
+            self.stdout.write(self.style.SUCCESS(f'✨ XSendFilePath set to {os.path.abspath(settings.MEDIA_ROOT)} in {path}'))
+            return
+        self.stdout.write(apache_block() if server == 'apache' else nginx_block())
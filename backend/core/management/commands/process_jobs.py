@@ -0,0 +1,93 @@
+"""
+Management command running the background job worker
+Usage: python manage.py process_jobs [--workers N] [--pool thread|process] [--once]
+"""
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+from core.jobs import claim_jobs, run_job
+
+
+def _init_process():
+    # Spawned processes (non-fork platforms) start without Django configured
+    django.setup()
+
+
+def run_job_in_worker(pk):
+    """run_job() for pool workers, which hold their own connection like a request thread"""
+    close_old_connections()
+    try:
+        return run_job(pk)
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = 'Process queued background jobs (image derivatives, ...)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.JOB_WORKERS,
+            help='Number of jobs processed concurrently (1 runs them in the main thread)',
+        )
+        parser.add_argument(
+            '--pool',
+            choices=['thread', 'process'],
+            default='thread',
+            help='Run jobs in a thread pool or a process pool',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit once no job is due instead of polling',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=5,
+            help='Seconds to wait between polls when the queue is empty',
+        )
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        executor = None
+        if workers > 1:
+            if options['pool'] == 'process':
+                # Forked children must not share the parent's database connections
+                connections.close_all()
+                executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_process)
+            else:
+                executor = ThreadPoolExecutor(max_workers=workers)
+
+        self.stdout.write(self.style.SUCCESS(f'⚙️  Job worker started ({workers} {options["pool"]} worker(s))'))
+        processed = 0
+        try:
+            while True:
+                job_ids = claim_jobs(limit=workers * 2)
+                if not job_ids:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                if executor:
+                    statuses = list(executor.map(run_job_in_worker, job_ids))
+                else:
+                    statuses = [run_job(pk) for pk in job_ids]
+                processed += len(job_ids)
+                for pk, status in zip(job_ids, statuses):
+                    style = self.style.SUCCESS if status == 'done' else self.style.WARNING
+                    self.stdout.write(style(f'  job {pk}: {status}'))
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('\nStopping...'))
+        finally:
+            if executor:
+                executor.shutdown(wait=True)
+
+        self.stdout.write(self.style.SUCCESS(f'✨ {processed} jobs processed'))
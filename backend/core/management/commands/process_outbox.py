@@ -0,0 +1,56 @@
+"""
+Management command sending the queued contact notification emails
+Usage: python manage.py process_outbox [--batch-size N] [--once]
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from core.outbox import claim_emails, send_emails
+
+
+class Command(BaseCommand):
+    help = 'Send queued notification emails, retrying failures'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.OUTBOX_BATCH_SIZE,
+            help='Emails sent over one SMTP connection',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit once no email is due instead of polling',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=5,
+            help='Seconds to wait between polls when the outbox is empty',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'📮 Outbox worker started (batches of {batch_size})'))
+        totals = {}
+        try:
+            while True:
+                email_ids = claim_emails(limit=batch_size)
+                if not email_ids:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                counts = send_emails(email_ids)
+                for status, count in counts.items():
+                    totals[status] = totals.get(status, 0) + count
+                style = self.style.SUCCESS if set(counts) == {'sent'} else self.style.WARNING
+                self.stdout.write(style('  ' + ', '.join(f'{count} {status}' for status, count in sorted(counts.items()))))
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('\nStopping...'))
+
+        summary = ', '.join(f'{count} {status}' for status, count in sorted(totals.items())) or 'nothing to send'
+        self.stdout.write(self.style.SUCCESS(f'✨ {summary}'))
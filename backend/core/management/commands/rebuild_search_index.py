@@ -0,0 +1,23 @@
+"""
+Management command to rebuild the project search index
+Usage: python manage.py rebuild_search_index
+
+Signals keep the index in sync; rebuild it after changes that bypass them
+(QuerySet.update(), loaddata, raw SQL).
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from core.models import Project
+from core.search import rebuild_index, search_vendor
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index of projects'
+
+    def handle(self, *args, **options):
+        if not search_vendor():
+            self.stdout.write(self.style.WARNING('⚠️  This database has no search index, searches scan the projects table'))
+            return
+        with transaction.atomic():
+            indexed = rebuild_index(Project.objects.select_related('service'))
+        self.stdout.write(self.style.SUCCESS(f'✨ {indexed} projects indexed'))
@@ -0,0 +1,34 @@
+"""
+Management command to inspect the API response cache
+Usage: python manage.py response_cache_stats [--reset] [--invalidate]
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from core.cache import response_cache_stats, reset_response_cache_stats, bump_content_generation
+
+
+class Command(BaseCommand):
+    help = 'Show API response cache hit/miss counters'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset hit/miss counters')
+        parser.add_argument('--invalidate', action='store_true', help='Invalidate every cached response')
+
+    def handle(self, *args, **options):
+        if options['invalidate']:
+            bump_content_generation()
+            self.stdout.write(self.style.WARNING('Cached responses invalidated'))
+
+        if not settings.RESPONSE_CACHE_STATS:
+            self.stdout.write(self.style.WARNING('Hit/miss counters are disabled (set RESPONSE_CACHE_STATS=True)'))
+        stats = response_cache_stats()
+        total = stats['hits'] + stats['misses']
+        ratio = (stats['hits'] / total * 100) if total else 0
+        self.stdout.write(f"Generation: {stats['generation']}")
+        self.stdout.write(f"Hits:       {stats['hits']}")
+        self.stdout.write(f"Misses:     {stats['misses']}")
+        self.stdout.write(self.style.SUCCESS(f"Hit ratio:  {ratio:.1f}%"))
+
+        if options['reset']:
+            reset_response_cache_stats()
+            self.stdout.write(self.style.WARNING('Counters reset'))
@@ -0,0 +1,152 @@
+"""
+Media file serving.
+
+Uploaded files are served by `serve_media`, which replaces
+django.views.static.serve:
+
+- with MEDIA_SENDFILE set to 'x-sendfile' (Apache mod_xsendfile) or
+  'x-accel-redirect' (nginx), Django only checks the path and returns an
+  empty response carrying the header; the front server streams the file;
+- otherwise the file is streamed through wsgi.file_wrapper (sendfile(2) on
+  servers that support it), with single byte-range requests (206/416) and
+  If-Range support.
+
+Both modes answer If-None-Match / If-Modified-Since with 304. Files whose
+name is derived from their content, i.e. stored by ContentAddressedStorage
+(`content/`) or named by generate_derivatives(), are cached as immutable;
+other files, legacy uploads included, for MEDIA_CACHE_MAX_AGE seconds.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+from .images import DERIVATIVE_NAME_RE
+from .storage import is_content_addressed
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+IMMUTABLE_MAX_AGE = 31536000
+CHUNK_SIZE = 64 * 1024
+
+
+def is_content_hashed(name):
+    return is_content_addressed(name) or bool(DERIVATIVE_NAME_RE.match(name))
+
+
+def parse_range(header, size):
+    """
+    (start, end) inclusive byte positions of a single-range `Range` header,
+    None to serve the whole file (absent, malformed or multi-range), or
+    False when the range cannot be satisfied.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match or match.group(1) == match.group(2) == '':
+        return None
+    first, last = match.groups()
+    if first == '':
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, end
+
+
+def if_range_matches(request, etag, last_modified):
+    """Whether the If-Range precondition (if any) allows a partial response"""
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith('"'):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def iter_range(path, start, length):
+    with open(path, 'rb') as fh:
+        fh.seek(start)
+        while length > 0:
+            chunk = fh.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def set_media_headers(response, name, etag, last_modified, content_type):
+    response['Content-Type'] = content_type
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Accept-Ranges'] = 'bytes'
+    if is_content_hashed(name):
+        patch_cache_control(response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    else:
+        patch_cache_control(response, public=True, max_age=settings.MEDIA_CACHE_MAX_AGE)
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, path)
+        stat = os.stat(fullpath)
+    except (SuspiciousFileOperation, OSError, ValueError):
+        raise Http404('Fichier introuvable.')
+    if not os.path.isfile(fullpath):
+        raise Http404('Fichier introuvable.')
+
+    size = stat.st_size
+    last_modified = int(stat.st_mtime)
+    etag = f'"{stat.st_mtime_ns:x}-{size:x}"'
+    content_type, encoding = mimetypes.guess_type(fullpath)
+    content_type = content_type or 'application/octet-stream'
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        return set_media_headers(response, path, etag, last_modified, content_type)
+
+    mode = settings.MEDIA_SENDFILE
+    if mode:
+        # The front server handles the body, ranges included
+        response = HttpResponse()
+        if mode == 'x-accel-redirect':
+            response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX + quote(path)
+        else:
+            response['X-Sendfile'] = fullpath
+        return set_media_headers(response, path, etag, last_modified, content_type)
+
+    byte_range = None
+    if if_range_matches(request, etag, last_modified):
+        byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    if request.method == 'HEAD':
+        response = HttpResponse()
+        response['Content-Length'] = str(size)
+    elif byte_range:
+        start, end = byte_range
+        response = StreamingHttpResponse(iter_range(fullpath, start, end - start + 1), status=206)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(end - start + 1)
+    else:
+        # FileResponse hands the file object to wsgi.file_wrapper (zero-copy)
+        response = FileResponse(open(fullpath, 'rb'))
+        response['Content-Length'] = str(size)
+    if encoding:
+        response['Content-Encoding'] = encoding
+    return set_media_headers(response, path, etag, last_modified, content_type)
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.7 on 2026-10-18 18:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0007_projectimage_updated_at_galleryimage_updated_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImageDerivative",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "source",
+                    models.CharField(
+                        db_index=True, max_length=255, verbose_name="Image source"
+                    ),
+                ),
+                (
+                    "format",
+                    models.CharField(
+                        choices=[("webp", "WebP"), ("jpeg", "JPEG")],
+                        max_length=10,
+                        verbose_name="Format",
+                    ),
+                ),
+                ("width", models.PositiveIntegerField(verbose_name="Largeur")),
+                ("height", models.PositiveIntegerField(verbose_name="Hauteur")),
+                (
+                    "file",
+                    models.ImageField(upload_to="derivatives/", verbose_name="Fichier"),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "verbose_name": "Déclinaison d'image",
+                "verbose_name_plural": "Déclinaisons d'images",
+                "ordering": ["source", "format", "width"],
+                "unique_together": {("source", "format", "width")},
+            },
+        ),
+    ]
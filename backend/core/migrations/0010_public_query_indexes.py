@@ -0,0 +1,83 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0009_job"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="galleryimage",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["order", "-created_at"],
+                name="core_gallery_active_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="galleryimage",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["category", "order", "-created_at"],
+                name="core_gallery_category_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="galleryimage",
+            index=models.Index(fields=["updated_at"], name="core_gallery_updated_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="imagederivative",
+            index=models.Index(
+                fields=["created_at"], name="core_derivative_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="project",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["-is_featured", "order", "-completion_date"],
+                name="core_project_active_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="project",
+            index=models.Index(fields=["updated_at"], name="core_project_updated_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="projectimage",
+            index=models.Index(
+                fields=["updated_at"], name="core_projectimg_updated_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="service",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["order", "title"],
+                name="core_service_active_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="service",
+            index=models.Index(fields=["updated_at"], name="core_service_updated_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="testimonial",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["order", "-created_at"],
+                name="core_testimonial_active_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="testimonial",
+            index=models.Index(
+                fields=["updated_at"], name="core_testimonial_updated_idx"
+            ),
+        ),
+    ]
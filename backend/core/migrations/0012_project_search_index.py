@@ -0,0 +1,68 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:00
+
+from django.db import migrations
+
+# Frozen copy of the core.search index as of this migration
+INDEX_TABLE = "core_project_search"
+FIELDS = ("title", "short_description", "location", "service_title", "description")
+POSTGRES_WEIGHTS = ("A", "B", "C", "C", "D")
+
+
+def build_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor not in ("sqlite", "postgresql"):
+        return
+
+    Project = apps.get_model("core", "Project")
+    rows = [
+        (pk, title, short_description or "", location or "", service_title or "", description or "")
+        for pk, title, short_description, location, service_title, description in (
+            Project.objects.filter(is_active=True).values_list(
+                "pk", "title", "short_description", "location", "service__title", "description"
+            )
+        )
+    ]
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {INDEX_TABLE} USING fts5("
+                f"{', '.join(FIELDS)}, tokenize = 'unicode61 remove_diacritics 2')"
+            )
+            cursor.executemany(
+                f"INSERT INTO {INDEX_TABLE} (rowid, {', '.join(FIELDS)}) VALUES (%s{', %s' * len(FIELDS)})",
+                rows,
+            )
+        else:
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {INDEX_TABLE} ("
+                "project_id bigint PRIMARY KEY REFERENCES core_project (id) ON DELETE CASCADE, "
+                "document tsvector NOT NULL)"
+            )
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {INDEX_TABLE}_idx ON {INDEX_TABLE} USING gin (document)")
+            vector = " || ".join(
+                f"setweight(to_tsvector('french', unaccent(%s)), '{weight}')" for weight in POSTGRES_WEIGHTS
+            )
+            cursor.executemany(
+                f"INSERT INTO {INDEX_TABLE} (project_id, document) VALUES (%s, {vector}) "
+                "ON CONFLICT (project_id) DO UPDATE SET document = EXCLUDED.document",
+                rows,
+            )
+
+
+def remove_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor in ("sqlite", "postgresql"):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {INDEX_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0011_contact_outbox"),
+    ]
+
+    operations = [
+        migrations.RunPython(build_index, remove_index),
+    ]
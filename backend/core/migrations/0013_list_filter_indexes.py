@@ -0,0 +1,45 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0012_project_search_index"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="galleryimage",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["linked_project", "order", "-created_at"],
+                name="core_gallery_project_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="project",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["service", "-is_featured", "order", "-completion_date"],
+                name="core_project_service_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="project",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["completion_date"],
+                name="core_project_completion_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="project",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["location"],
+                name="core_project_location_idx",
+            ),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.utils.text import slugify
 
 
@@ -53,6 +54,11 @@ class Service(models.Model):
         verbose_name = "Service"
         verbose_name_plural = "Services"
         ordering = ['order', 'title']
+        indexes = [
+            # Public list (is_active, Meta.ordering) and ETag validators (MAX(updated_at))
+            models.Index(fields=['order', 'title'], condition=models.Q(is_active=True), name='core_service_active_idx'),
+            models.Index(fields=['updated_at'], name='core_service_updated_idx'),
+        ]
     
     def __str__(self):
         return self.title
@@ -90,6 +96,27 @@ class Project(models.Model):
         verbose_name = "Projet"
         verbose_name_plural = "Projets"
         ordering = ['-is_featured', 'order', '-completion_date']
+        indexes = [
+            # Serves both the list and the featured action (is_featured prefix)
+            models.Index(
+                fields=['-is_featured', 'order', '-completion_date'],
+                condition=models.Q(is_active=True), name='core_project_active_idx',
+            ),
+            # Filters of the list endpoint (core/filters.py), in list order
+            models.Index(
+                fields=['service', '-is_featured', 'order', '-completion_date'],
+                condition=models.Q(is_active=True), name='core_project_service_idx',
+            ),
+            models.Index(
+                fields=['completion_date'],
+                condition=models.Q(is_active=True), name='core_project_completion_idx',
+            ),
+            models.Index(
+                fields=['location'],
+                condition=models.Q(is_active=True), name='core_project_location_idx',
+            ),
+            models.Index(fields=['updated_at'], name='core_project_updated_idx'),
+        ]
     
     def __str__(self):
         return self.title
@@ -112,11 +139,16 @@ class ProjectImage(models.Model):
     is_visible = models.BooleanField(default=True, verbose_name="Visible")
     order = models.IntegerField(default=0, verbose_name="Ordre")
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         verbose_name = "Image de projet"
         verbose_name_plural = "Images de projet"
         ordering = ['order', 'created_at']
+        indexes = [
+            # Per-project image lookups already use the project_id index
+            models.Index(fields=['updated_at'], name='core_projectimg_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.project.title} - Image {self.order}"
@@ -140,6 +172,13 @@ class Testimonial(models.Model):
         verbose_name = "Témoignage"
         verbose_name_plural = "Témoignages"
         ordering = ['order', '-created_at']
+        indexes = [
+            models.Index(
+                fields=['order', '-created_at'],
+                condition=models.Q(is_active=True), name='core_testimonial_active_idx',
+            ),
+            models.Index(fields=['updated_at'], name='core_testimonial_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.client_name} - {self.rating}/5"
@@ -163,11 +202,28 @@ class GalleryImage(models.Model):
     is_active = models.BooleanField(default=True, verbose_name="Actif")
     order = models.IntegerField(default=0, verbose_name="Ordre d'affichage")
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         verbose_name = "Image de galerie"
         verbose_name_plural = "Images de galerie"
         ordering = ['order', '-created_at']
+        indexes = [
+            models.Index(
+                fields=['order', '-created_at'],
+                condition=models.Q(is_active=True), name='core_gallery_active_idx',
+            ),
+            # Hero images (category filter) on the gallery and home endpoints
+            models.Index(
+                fields=['category', 'order', '-created_at'],
+                condition=models.Q(is_active=True), name='core_gallery_category_idx',
+            ),
+            models.Index(
+                fields=['linked_project', 'order', '-created_at'],
+                condition=models.Q(is_active=True), name='core_gallery_project_idx',
+            ),
+            models.Index(fields=['updated_at'], name='core_gallery_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} ({self.get_category_display()})"
@@ -200,3 +256,99 @@ class ContactMessage(models.Model):
     def __str__(self):
         return f"{self.name} - {self.created_at.strftime('%d/%m/%Y')}"
 
+
+class OutboxEmail(models.Model):
+    """Notification email queued with its contact message, sent by the `process_outbox` worker"""
+    STATUS_CHOICES = [
+        ('pending', 'En attente'),
+        ('sending', "En cours d'envoi"),
+        ('sent', 'Envoyé'),
+        ('dead', 'Échec définitif'),
+    ]
+    
+    message = models.ForeignKey(ContactMessage, on_delete=models.CASCADE, related_name='notifications',
+                                verbose_name="Message de contact")
+    recipient = models.EmailField(verbose_name="Destinataire")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', verbose_name="Statut")
+    attempts = models.PositiveIntegerField(default=0, verbose_name="Tentatives")
+    max_attempts = models.PositiveIntegerField(default=6, verbose_name="Tentatives max")
+    run_after = models.DateTimeField(default=timezone.now, verbose_name="Envoyer après")
+    locked_by = models.CharField(max_length=100, blank=True, verbose_name="Worker")
+    locked_at = models.DateTimeField(null=True, blank=True, verbose_name="Pris en charge le")
+    last_error = models.TextField(blank=True, verbose_name="Dernière erreur")
+    sent_at = models.DateTimeField(null=True, blank=True, verbose_name="Envoyé le")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Email de notification"
+        verbose_name_plural = "Emails de notification"
+        ordering = ['-created_at']
+        indexes = [
+            # Due emails claimed by the worker
+            models.Index(fields=['status', 'run_after'], name='core_outbox_due_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.recipient} - {self.message} ({self.get_status_display()})"
+
+
+class ImageDerivative(models.Model):
+    """Resized copy of an uploaded image, used to build responsive srcsets"""
+    FORMAT_CHOICES = [
+        ('webp', 'WebP'),
+        ('jpeg', 'JPEG'),
+    ]
+    
+    source = models.CharField(max_length=255, db_index=True, verbose_name="Image source")
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES, verbose_name="Format")
+    width = models.PositiveIntegerField(verbose_name="Largeur")
+    height = models.PositiveIntegerField(verbose_name="Hauteur")
+    file = models.ImageField(upload_to='derivatives/', verbose_name="Fichier")
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = "Déclinaison d'image"
+        verbose_name_plural = "Déclinaisons d'images"
+        ordering = ['source', 'format', 'width']
+        unique_together = ['source', 'format', 'width']
+        indexes = [
+            models.Index(fields=['created_at'], name='core_derivative_created_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.source} ({self.format}, {self.width}px)"
+
+
+class Job(models.Model):
+    """Background task processed by the `process_jobs` worker command"""
+    STATUS_CHOICES = [
+        ('pending', 'En attente'),
+        ('running', 'En cours'),
+        ('done', 'Terminé'),
+        ('failed', 'Échec'),
+    ]
+    KIND_CHOICES = [
+        ('image_derivatives', "Déclinaisons d'image"),
+    ]
+    
+    key = models.CharField(max_length=300, unique=True, verbose_name="Clé")
+    kind = models.CharField(max_length=50, choices=KIND_CHOICES, verbose_name="Type")
+    payload = models.JSONField(default=dict, blank=True, verbose_name="Données")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', verbose_name="Statut")
+    attempts = models.PositiveIntegerField(default=0, verbose_name="Tentatives")
+    max_attempts = models.PositiveIntegerField(default=5, verbose_name="Tentatives max")
+    run_after = models.DateTimeField(default=timezone.now, verbose_name="Exécuter après")
+    locked_by = models.CharField(max_length=100, blank=True, verbose_name="Worker")
+    locked_at = models.DateTimeField(null=True, blank=True, verbose_name="Pris en charge le")
+    last_error = models.TextField(blank=True, verbose_name="Dernière erreur")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Tâche de fond"
+        verbose_name_plural = "Tâches de fond"
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} - {self.key} ({self.get_status_display()})"
@@ -0,0 +1,133 @@
+"""
+Outbox of contact notification emails.
+
+Creating a contact message inserts an OutboxEmail row in the same
+transaction, so the form submission never waits for the mail server. The
+`process_outbox` command claims due emails in batches (conditional UPDATE,
+like the job queue), sends each batch over one SMTP connection and retries
+failures with exponential backoff. After `max_attempts` an email is `dead`
+and shown as such in the contact messages admin, where it can be requeued.
+"""
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+from .jobs import worker_id
+from .models import OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+
+def notification_recipient():
+    """The configured SITE_OWNER_EMAIL or CONTACT_EMAIL, '' when neither is set"""
+    return getattr(settings, 'SITE_OWNER_EMAIL', None) or settings.CONTACT_EMAIL
+
+
+def queue_contact_notification(message):
+    """Queue the notification of a new contact message (call inside its transaction)"""
+    recipient = notification_recipient()
+    if not recipient:
+        logger.warning('No SITE_OWNER_EMAIL or CONTACT_EMAIL configured: contact message %s not notified', message.pk)
+        return None
+    return OutboxEmail.objects.create(message=message, recipient=recipient)
+
+
+def requeue(queryset):
+    """Send the selected emails again, with a fresh retry budget. Returns the number requeued."""
+    return queryset.exclude(status__in=('sending', 'sent')).update(
+        status='pending', attempts=0, run_after=timezone.now(), last_error='', updated_at=timezone.now(),
+    )
+
+
+def claim_emails(limit, worker=None):
+    """Atomically mark up to `limit` due emails as sending and return their ids"""
+    now = timezone.now()
+    # Emails left sending by a crashed worker become available again
+    OutboxEmail.objects.filter(
+        status='sending', locked_at__lt=now - timedelta(seconds=settings.OUTBOX_LOCK_TIMEOUT),
+    ).update(status='pending', locked_by='', locked_at=None)
+
+    candidates = OutboxEmail.objects.filter(status='pending', run_after__lte=now).order_by('run_after', 'pk')
+    claimed = []
+    for pk in candidates.values_list('pk', flat=True)[:limit]:
+        if OutboxEmail.objects.filter(pk=pk, status='pending').update(
+            status='sending', locked_by=worker or worker_id(), locked_at=now, updated_at=now,
+        ):
+            claimed.append(pk)
+    return claimed
+
+
+def build_message(email, connection=None):
+    """The notification of `email.message`, rendered at send time"""
+    message = email.message
+    subject = f"Nouveau message de contact: {message.subject or 'Sans sujet'}"
+    # Render a simple HTML email (fallback to plain text)
+    html_message = render_to_string('emails/new_contact.html', {'data': message})
+    plain_message = strip_tags(html_message) if html_message else message.message
+    mail = EmailMultiAlternatives(
+        subject=subject,
+        body=plain_message,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[email.recipient],
+        connection=connection,
+    )
+    if html_message:
+        mail.attach_alternative(html_message, 'text/html')
+    return mail
+
+
+def record_failure(email):
+    email.attempts += 1
+    email.last_error = traceback.format_exc()
+    if email.attempts >= email.max_attempts:
+        email.status = 'dead'
+    else:
+        email.status = 'pending'
+        delay = settings.OUTBOX_RETRY_DELAY * 2 ** (email.attempts - 1)
+        email.run_after = timezone.now() + timedelta(seconds=delay)
+
+
+def reopen(connection):
+    try:
+        connection.open()
+    except Exception:
+        logger.exception('Could not connect to the mail server')
+
+
+def send_emails(ids, connection=None):
+    """Send claimed emails over one connection and record each outcome. Returns {status: count}."""
+    connection = connection or get_connection()
+    counts = {}
+    # One session for the whole batch; if it cannot be opened, each send retries and records its failure
+    reopen(connection)
+    try:
+        for email in OutboxEmail.objects.filter(pk__in=ids).select_related('message').order_by('pk'):
+            try:
+                if not connection.send_messages([build_message(email, connection)]):
+                    raise RuntimeError('The email backend did not send the message')
+            except Exception:
+                logger.exception('Notification %s failed (attempt %s/%s)', email.pk, email.attempts + 1, email.max_attempts)
+                record_failure(email)
+                # The session may be unusable after an error
+                connection.close()
+                reopen(connection)
+            else:
+                email.attempts += 1
+                email.status = 'sent'
+                email.sent_at = timezone.now()
+                email.last_error = ''
+            email.locked_by = ''
+            email.locked_at = None
+            email.save(update_fields=[
+                'status', 'attempts', 'last_error', 'run_after', 'sent_at', 'locked_by', 'locked_at', 'updated_at',
+            ])
+            counts[email.status] = counts.get(email.status, 0) + 1
+    finally:
+        connection.close()
+    return counts
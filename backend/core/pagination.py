@@ -0,0 +1,245 @@
+"""
+Keyset (cursor) pagination.
+
+Pages are selected with a WHERE clause on the ordering columns of the last
+row seen instead of an OFFSET, and no COUNT(*) is issued. The ordering
+follows the queryset (or the model's Meta.ordering) with the primary key
+appended as a unique tiebreaker.
+
+The "after the cursor" condition is an OR over the ordering columns, which
+SQLite cannot turn into an index range. A redundant bound on the leading
+column lets it seek to the cursor's group, so a deep page only scans the
+rows sharing the cursor's leading value instead of every row before it.
+When nothing sorts after the cursor's value on a column (False on a
+descending boolean such as -is_featured), the next column is bounded too.
+Cursors keep datetimes to the microsecond: rows created in the same
+millisecond would otherwise be skipped.
+"""
+import base64
+import binascii
+import datetime
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import BooleanField, F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetColumn:
+    """One ordering column, with its direction and NULL placement (NULLs last)"""
+
+    def __init__(self, name, field, descending):
+        self.name = name
+        self.field = field
+        self.descending = descending
+        self.nulls_last = True
+
+    def reversed(self):
+        column = KeysetColumn(self.name, self.field, not self.descending)
+        column.nulls_last = not self.nulls_last
+        return column
+
+    def order_by(self):
+        expression = F(self.name)
+        if not self.field.null:
+            return expression.desc() if self.descending else expression.asc()
+        # Explicit NULL placement: SQLite and PostgreSQL disagree by default
+        nulls = {'nulls_last': True} if self.nulls_last else {'nulls_first': True}
+        return expression.desc(**nulls) if self.descending else expression.asc(**nulls)
+
+    def equal(self, value):
+        if value is None:
+            return Q(**{f'{self.name}__isnull': True})
+        return Q(**{self.name: value})
+
+    def from_value(self, value):
+        """Rows that sort at or after `value` on this column"""
+        if value is None:
+            return Q(**{f'{self.name}__isnull': True}) if self.nulls_last else Q()
+        condition = Q(**{f'{self.name}__lte' if self.descending else f'{self.name}__gte': value})
+        if self.field.null and self.nulls_last:
+            condition |= Q(**{f'{self.name}__isnull': True})
+        return condition
+
+    def is_last(self, value):
+        """Whether no row sorts strictly after `value` on this column"""
+        if value is None:
+            return self.nulls_last
+        if self.field.null and self.nulls_last:
+            return False
+        return isinstance(self.field, BooleanField) and value is (not self.descending)
+
+    def beyond(self, value):
+        """Rows that sort strictly after `value` on this column"""
+        if value is None:
+            # NULLs are either the tail (nothing after) or the head (all non-NULLs after)
+            return Q(pk__in=[]) if self.nulls_last else Q(**{f'{self.name}__isnull': False})
+        condition = Q(**{f'{self.name}__lt' if self.descending else f'{self.name}__gt': value})
+        if self.field.null and self.nulls_last:
+            condition |= Q(**{f'{self.name}__isnull': True})
+        return condition
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """DjangoJSONEncoder keeping microseconds, which break ordering ties"""
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+class KeysetPagination(BasePagination):
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    invalid_cursor_message = 'Curseur invalide.'
+    display_page_controls = False
+
+    def get_columns(self, queryset):
+        model = queryset.model
+        ordering = list(queryset.query.order_by or model._meta.ordering)
+        columns = []
+        for name in ordering:
+            field_name = name.lstrip('-')
+            field = model._meta.pk if field_name == 'pk' else model._meta.get_field(field_name)
+            columns.append(KeysetColumn(field.attname, field, name.startswith('-')))
+        if not any(column.field.primary_key for column in columns):
+            columns.append(KeysetColumn(model._meta.pk.attname, model._meta.pk, False))
+        return columns
+
+    def encode_cursor(self, values, reverse=False):
+        raw = json.dumps({'v': values, 'r': int(reverse)}, cls=CursorEncoder)
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, request, columns):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            padded = token + '=' * (-len(token) % 4)
+            data = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            values, reverse = data['v'], bool(data['r'])
+            if len(values) != len(columns):
+                raise ValueError
+            values = [
+                None if value is None and column.field.null else column.field.to_python(value)
+                for column, value in zip(columns, values)
+            ]
+        except (TypeError, ValueError, KeyError, binascii.Error, ValidationError, FieldDoesNotExist):
+            raise NotFound(self.invalid_cursor_message)
+        return values, reverse
+
+    def page_queryset(self, queryset, columns, values=None):
+        """`queryset` in keyset order, restricted to the rows after `values`"""
+        queryset = queryset.order_by(*[column.order_by() for column in columns])
+        if values is None:
+            return queryset
+        condition = Q(pk__in=[])
+        for i, column in enumerate(columns):
+            step = column.beyond(values[i])
+            for previous, value in zip(columns[:i], values):
+                step &= previous.equal(value)
+            condition |= step
+        # Redundant with `condition`, but usable as an index range
+        bounds = []
+        for column, value in zip(columns, values):
+            if not column.is_last(value):
+                bounds.append(column.from_value(value))
+                break
+            # Every following row has this value: an equality keeps the index seek going
+            bounds.append(column.equal(value))
+        return queryset.filter(*bounds, condition)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        columns = self.get_columns(queryset)
+        values, reverse = self.decode_cursor(request, columns)
+        if reverse:
+            columns = [column.reversed() for column in columns]
+
+        queryset = self.page_queryset(queryset, columns, values)
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            columns = [column.reversed() for column in columns]
+
+        self.columns = columns
+        self.has_next = has_more if not reverse else True
+        self.has_previous = values is not None if not reverse else has_more
+        self.first_row = rows[0] if rows else None
+        self.last_row = rows[-1] if rows else None
+        return rows
+
+    def row_values(self, row):
+        return [getattr(row, column.name) for column in self.columns]
+
+    def get_link(self, row, reverse):
+        url = remove_query_param(self.request.build_absolute_uri(), 'page')
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.row_values(row), reverse))
+
+    def get_next_link(self):
+        if not (self.has_next and self.last_row):
+            return None
+        return self.get_link(self.last_row, reverse=False)
+
+    def get_previous_link(self):
+        if not (self.has_previous and self.first_row):
+            return None
+        return self.get_link(self.first_row, reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class KeysetOrPageNumberPagination(BasePagination):
+    """
+    Keyset pagination by default. Requests with `?page=N` keep the original
+    page-number pagination (with count) for backward compatibility.
+    """
+
+    def __init__(self):
+        self.keyset = KeysetPagination()
+        self.page_number = PageNumberPagination()
+        self.delegate = self.keyset
+
+    @property
+    def display_page_controls(self):
+        return getattr(self.delegate, 'display_page_controls', False)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.page_number.page_query_param in request.query_params:
+            self.delegate = self.page_number
+        else:
+            self.delegate = self.keyset
+        return self.delegate.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.delegate.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return self.keyset.get_paginated_response_schema(schema)
+
+    def to_html(self):
+        return self.delegate.to_html()
@@ -0,0 +1,63 @@
+"""
+JSON renderer and parser of the API, backed by orjson (requirements.txt).
+
+orjson serializes plain dicts, lists, strings and numbers in C. Everything
+else (datetimes, Decimal, lazy translation strings, UUIDs, querysets...) is
+handed to DRF's JSONEncoder, so responses match those of DRF's
+JSONRenderer: same datetime and Decimal formats (COERCE_DECIMAL_TO_STRING),
+compact separators, unescaped unicode and escaped U+2028/U+2029. Only the
+notation of some floats differs (1e16 instead of 1e+16).
+
+When the client asks for indented output (browsable API,
+`Accept: application/json; indent=4`), both classes fall back to DRF's
+stdlib implementation. So does everything on platforms where orjson
+cannot be installed (no wheel, no Rust toolchain): same output, only
+slower.
+"""
+from django.conf import settings
+from rest_framework import renderers
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.utils import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    # Map keys are converted to strings like json.dumps() does; datetimes go
+    # through DRF's encoder, which writes UTC as "Z" where orjson writes "+00:00"
+    ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """JSONRenderer rendering with orjson when possible"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        ret = orjson.dumps(data, default=self.encoder_class().default, option=ORJSON_OPTIONS)
+        # Strict javascript subset, as DRF does
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser reading the whole body at once, with orjson when possible"""
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        try:
+            body = stream.read()
+            if orjson is not None and self.strict and encoding.lower().replace('-', '') == 'utf8':
+                # orjson rejects NaN and Infinity, like the strict stdlib parser
+                return orjson.loads(body)
+            parse_constant = json.strict_constant if self.strict else None
+            return json.loads(body.decode(encoding), parse_constant=parse_constant)
+        except ValueError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
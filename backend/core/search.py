@@ -0,0 +1,161 @@
+"""
+Full-text search of projects.
+
+Active projects are indexed in a side table kept in sync by signals (see
+core/signals.py): on SQLite an FTS5 virtual table whose unicode61 tokenizer
+folds case and accents ("renovation" finds "Rénovation"), on PostgreSQL a
+table of tsvectors built with the french configuration over unaccent()ed
+text, behind a GIN index. Both rank matches by weight of the matching
+field: title, then short description, location, service title and
+description. Every word of a query must match, as a prefix.
+
+Other databases fall back to a LIKE scan.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+INDEX_TABLE = 'core_project_search'
+# Indexed text, by decreasing weight
+FIELDS = ('title', 'short_description', 'location', 'service_title', 'description')
+# bm25() column weights on SQLite, setweight() classes on PostgreSQL
+SQLITE_WEIGHTS = (10.0, 5.0, 3.0, 2.0, 1.0)
+POSTGRES_WEIGHTS = ('A', 'B', 'C', 'C', 'D')
+# Words of a query taken into account
+MAX_TERMS = 10
+
+
+def search_vendor(conn=connection):
+    """Index implementation used for a connection: 'sqlite', 'postgresql' or None (LIKE scan)"""
+    return conn.vendor if conn.vendor in ('sqlite', 'postgresql') else None
+
+
+def create_index(conn=connection):
+    vendor = search_vendor(conn)
+    with conn.cursor() as cursor:
+        if vendor == 'sqlite':
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {INDEX_TABLE} USING fts5("
+                f"{', '.join(FIELDS)}, tokenize = 'unicode61 remove_diacritics 2')"
+            )
+        elif vendor == 'postgresql':
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS unaccent')
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS {INDEX_TABLE} ('
+                'project_id bigint PRIMARY KEY REFERENCES core_project (id) ON DELETE CASCADE, '
+                'document tsvector NOT NULL)'
+            )
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS {INDEX_TABLE}_idx ON {INDEX_TABLE} USING gin (document)')
+
+
+def drop_index(conn=connection):
+    if search_vendor(conn):
+        with conn.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {INDEX_TABLE}')
+
+
+def document(project):
+    """Indexed values of a project, in FIELDS order"""
+    service_title = project.service.title if project.service_id else ''
+    return (
+        project.title, project.short_description or '', project.location or '',
+        service_title, project.description or '',
+    )
+
+
+def index_projects(projects, conn=connection):
+    """Add or refresh the index rows of `projects` (with their service); inactive ones are removed"""
+    vendor = search_vendor(conn)
+    if not vendor:
+        return
+    projects = list(projects)
+    remove_projects([project.pk for project in projects if not project.is_active], conn)
+    rows = [(project.pk, *document(project)) for project in projects if project.is_active]
+    if not rows:
+        return
+    with conn.cursor() as cursor:
+        if vendor == 'sqlite':
+            cursor.executemany(f'DELETE FROM {INDEX_TABLE} WHERE rowid = %s', [row[:1] for row in rows])
+            cursor.executemany(
+                f"INSERT INTO {INDEX_TABLE} (rowid, {', '.join(FIELDS)}) VALUES (%s{', %s' * len(FIELDS)})",
+                rows,
+            )
+        else:
+            vector = ' || '.join(
+                f"setweight(to_tsvector('french', unaccent(%s)), '{weight}')" for weight in POSTGRES_WEIGHTS
+            )
+            cursor.executemany(
+                f'INSERT INTO {INDEX_TABLE} (project_id, document) VALUES (%s, {vector}) '
+                'ON CONFLICT (project_id) DO UPDATE SET document = EXCLUDED.document',
+                rows,
+            )
+
+
+def remove_projects(pks, conn=connection):
+    pks = list(pks)
+    if not search_vendor(conn) or not pks:
+        return
+    column = 'rowid' if conn.vendor == 'sqlite' else 'project_id'
+    with conn.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {INDEX_TABLE} WHERE {column} = %s', [(pk,) for pk in pks])
+
+
+def rebuild_index(projects, conn=connection):
+    """Replace the whole index with `projects`. Returns the number of projects indexed."""
+    projects = list(projects)
+    if search_vendor(conn):
+        with conn.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {INDEX_TABLE}')
+        index_projects(projects, conn)
+    return sum(1 for project in projects if project.is_active)
+
+
+def query_terms(query):
+    """Words of a search query; punctuation and FTS operators are dropped"""
+    return re.findall(r'\w+', query)[:MAX_TERMS]
+
+
+def search_project_ids(query, limit=None, conn=connection):
+    """Ids of the projects matching every word of `query`, best matches first"""
+    terms = query_terms(query)
+    if not terms:
+        return []
+    vendor = search_vendor(conn)
+    if vendor is None:
+        return like_search(terms, limit)
+
+    with conn.cursor() as cursor:
+        if vendor == 'sqlite':
+            # Quoted terms are matched literally, * makes them prefixes
+            match = ' '.join(f'"{term}"*' for term in terms)
+            weights = ', '.join(str(weight) for weight in SQLITE_WEIGHTS)
+            sql = (
+                f'SELECT rowid FROM {INDEX_TABLE} WHERE {INDEX_TABLE} MATCH %s '
+                f'ORDER BY bm25({INDEX_TABLE}, {weights}), rowid'
+            )
+        else:
+            match = ' & '.join(f'{term}:*' for term in terms)
+            sql = (
+                f"SELECT project_id FROM {INDEX_TABLE}, to_tsquery('french', unaccent(%s)) query "
+                'WHERE document @@ query ORDER BY ts_rank(document, query) DESC, project_id'
+            )
+        params = [match]
+        if limit is not None:
+            sql += ' LIMIT %s'
+            params.append(limit)
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def like_search(terms, limit=None):
+    from .models import Project
+
+    queryset = Project.objects.filter(is_active=True)
+    for term in terms:
+        queryset = queryset.filter(
+            Q(title__icontains=term) | Q(short_description__icontains=term) | Q(description__icontains=term)
+            | Q(location__icontains=term) | Q(service__title__icontains=term)
+        )
+    ids = queryset.order_by('order', '-created_at').values_list('pk', flat=True)
+    return list(ids[:limit] if limit is not None else ids)
@@ -1,25 +1,83 @@
 from rest_framework import serializers
+from .fieldsets import SparseFieldsetSerializerMixin
+from .images import load_derivatives
 from .models import CompanyInfo, Service, Project, ProjectImage, Testimonial, ContactMessage, GalleryImage
 
 
-class CompanyInfoSerializer(serializers.ModelSerializer):
+class SrcsetField(serializers.Field):
+    """
+    Responsive variants of an image field, as srcset strings per format:
+    {"webp": "<url> 320w, <url> 640w", "jpeg": "..."}, or None without derivatives.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        variants = load_derivatives(self.context, [value.name])[value.name]
+        if not variants:
+            return None
+        request = self.context.get('request')
+        return {
+            fmt: ', '.join(
+                f"{request.build_absolute_uri(url) if request else url} {width}w"
+                for width, url in sorted(entries)
+            )
+            for fmt, entries in variants.items()
+        }
+
+
+class SrcsetSerializerMixin:
+    """Load the derivatives of every SrcsetField of an instance in one query"""
+
+    def srcset_image_names(self, instance):
+        return [
+            getattr(instance, field.source).name
+            for field in self.fields.values()
+            if isinstance(field, SrcsetField) and getattr(instance, field.source)
+        ]
+
+    def to_representation(self, instance):
+        load_derivatives(self.context, self.srcset_image_names(instance))
+        return super().to_representation(instance)
+
+
+class SrcsetListSerializer(serializers.ListSerializer):
+    """Load the derivatives of a whole list in one query before serializing it"""
+
+    def to_representation(self, data):
+        items = list(data.all() if hasattr(data, 'all') else data)
+        names = []
+        for item in items:
+            names += self.child.srcset_image_names(item)
+        load_derivatives(self.context, names)
+        return super().to_representation(items)
+
+
+class CompanyInfoSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = CompanyInfo
         fields = '__all__'
 
 
-class ServiceSerializer(serializers.ModelSerializer):
+class ServiceSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Service
         fields = '__all__'
 
 
-class ProjectImageSerializer(serializers.ModelSerializer):
+class ProjectImageSerializer(SparseFieldsetSerializerMixin, SrcsetSerializerMixin, serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
+    image_srcset = SrcsetField(source='image')
     
     class Meta:
         model = ProjectImage
-        fields = ['id', 'image', 'image_url', 'caption', 'is_visible', 'order']
+        fields = ['id', 'image', 'image_url', 'image_srcset', 'caption', 'is_visible', 'order']
+        column_sources = {'image_url': ['image']}
+        list_serializer_class = SrcsetListSerializer
     
     def get_image_url(self, obj):
         if obj.image:
@@ -29,16 +87,19 @@ class ProjectImageSerializer(serializers.ModelSerializer):
         return None
 
 
-class ProjectListSerializer(serializers.ModelSerializer):
+class ProjectListSerializer(SparseFieldsetSerializerMixin, SrcsetSerializerMixin, serializers.ModelSerializer):
     """Lighter serializer for project lists"""
     service_name = serializers.CharField(source='service.title', read_only=True)
     featured_image_url = serializers.SerializerMethodField()
+    featured_image_srcset = SrcsetField(source='featured_image')
     
     class Meta:
         model = Project
         fields = ['id', 'title', 'slug', 'short_description', 'location', 
-                 'featured_image', 'featured_image_url', 'is_featured', 
+                 'featured_image', 'featured_image_url', 'featured_image_srcset', 'is_featured', 
                  'has_before_after', 'service_name', 'completion_date']
+        column_sources = {'featured_image_url': ['featured_image']}
+        list_serializer_class = SrcsetListSerializer
     
     def get_featured_image_url(self, obj):
         if obj.featured_image:
@@ -48,16 +109,25 @@ class ProjectListSerializer(serializers.ModelSerializer):
         return None
 
 
-class ProjectDetailSerializer(serializers.ModelSerializer):
+class ProjectDetailSerializer(SparseFieldsetSerializerMixin, SrcsetSerializerMixin, serializers.ModelSerializer):
     """Detailed serializer with all project information"""
     images = ProjectImageSerializer(many=True, read_only=True)
     service_name = serializers.CharField(source='service.title', read_only=True)
     featured_image_url = serializers.SerializerMethodField()
+    featured_image_srcset = SrcsetField(source='featured_image')
     before_image_url = serializers.SerializerMethodField()
+    before_image_srcset = SrcsetField(source='before_image')
     
     class Meta:
         model = Project
         fields = '__all__'
+        column_sources = {'featured_image_url': ['featured_image'], 'before_image_url': ['before_image']}
+        list_serializer_class = SrcsetListSerializer
+    
+    def srcset_image_names(self, instance):
+        # Include the nested images so everything is fetched in one query
+        names = super().srcset_image_names(instance)
+        return names + [image.image.name for image in instance.images.all() if image.image]
     
     def get_featured_image_url(self, obj):
         if obj.featured_image:
@@ -74,7 +144,7 @@ class ProjectDetailSerializer(serializers.ModelSerializer):
         return None
 
 
-class TestimonialSerializer(serializers.ModelSerializer):
+class TestimonialSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     project_title = serializers.CharField(source='project.title', read_only=True)
     
     class Meta:
@@ -82,13 +152,16 @@ class TestimonialSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class GalleryImageSerializer(serializers.ModelSerializer):
+class GalleryImageSerializer(SparseFieldsetSerializerMixin, SrcsetSerializerMixin, serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
+    image_srcset = SrcsetField(source='image')
     project_slug = serializers.CharField(source='linked_project.slug', read_only=True, allow_null=True)
     
     class Meta:
         model = GalleryImage
-        fields = ['id', 'title', 'image', 'image_url', 'category', 'caption', 'project_slug', 'order']
+        fields = ['id', 'title', 'image', 'image_url', 'image_srcset', 'category', 'caption', 'project_slug', 'order']
+        column_sources = {'image_url': ['image']}
+        list_serializer_class = SrcsetListSerializer
     
     def get_image_url(self, obj):
         if obj.image:
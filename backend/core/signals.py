@@ -0,0 +1,56 @@
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+
+from .cache import bump_content_generation
+from .images import IMAGE_FIELDS
+from .jobs import enqueue_image_derivatives
+from .models import CompanyInfo, Service, Project, ProjectImage, Testimonial, GalleryImage
+from .search import index_projects, remove_projects
+
+# Models whose content is exposed by the public API
+CONTENT_MODELS = (CompanyInfo, Service, Project, ProjectImage, Testimonial, GalleryImage)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_response_cache(sender, **kwargs):
+    """Any change to public content invalidates every cached API response"""
+    if sender in CONTENT_MODELS:
+        bump_content_generation()
+
+
+@receiver(post_save)
+def queue_image_derivatives(sender, instance, raw=False, **kwargs):
+    """Newly uploaded images are processed by the `process_jobs` worker"""
+    if sender in IMAGE_FIELDS and not raw:
+        enqueue_image_derivatives(instance)
+
+
+@receiver(post_save, sender=Project)
+def index_project(sender, instance, raw=False, **kwargs):
+    """Keep the search index of a project in sync with its text"""
+    if not raw:
+        index_projects([instance])
+
+
+@receiver(post_delete, sender=Project)
+def unindex_project(sender, instance, **kwargs):
+    remove_projects([instance.pk])
+
+
+@receiver(post_save, sender=Service)
+def index_service_projects(sender, instance, raw=False, **kwargs):
+    """Projects are found by the title of their service too"""
+    if not raw:
+        index_projects(instance.projects.select_related('service'))
+
+
+@receiver(pre_delete, sender=Service)
+def collect_service_projects(sender, instance, **kwargs):
+    instance.search_project_ids = list(instance.projects.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Service)
+def unindex_service(sender, instance, **kwargs):
+    """The projects of a deleted service lose its title (SET_NULL sends no signal)"""
+    index_projects(Project.objects.filter(pk__in=getattr(instance, 'search_project_ids', [])).select_related('service'))
@@ -0,0 +1,283 @@
+"""
+Precomputed JSON snapshots of the public API.
+
+Content only changes through the admin, so the admin regenerates the
+serialized output of the affected endpoints after every save (see
+SnapshotAdminMixin in core/admin.py) and the viewsets serve these
+pre-encoded bytes without any ORM work.
+
+Snapshots are written to API_SNAPSHOT_ROOT, one file per endpoint page
+(page number or cursor),
+and kept in an in-memory dict per process. A VERSION file is rewritten
+after every regeneration so that other Passenger workers drop their
+in-memory copy. Requests without a snapshot fall back to the live viewset.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from urllib.parse import parse_qsl, quote, unquote, urlencode, urlsplit
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.urls import resolve
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from .images import IMAGE_FIELDS
+from .models import CompanyInfo, Service, Project, ProjectImage, Testimonial, GalleryImage
+
+API_ROOT = '/api/'
+
+# Endpoints that exist regardless of content
+FIXED_ENDPOINTS = [
+    'company-info/',
+    'services/',
+    'projects/',
+    'projects/featured/',
+    'testimonials/',
+    'gallery/',
+    'gallery/hero/',
+    'home/',
+]
+
+VERSION_FILE = 'VERSION'
+
+# Query parameters selecting a page of a paginated list
+PAGINATION_PARAMS = ('page', 'cursor')
+
+
+def snapshots_enabled():
+    return getattr(settings, 'API_SNAPSHOTS', False)
+
+
+def _endpoint(path):
+    return f'{API_ROOT}{path}'
+
+
+def snapshot_key(path, params=None):
+    """Key of one snapshot: the request path plus its pagination parameter, if any"""
+    params = {
+        name: value for name, value in (params or {}).items()
+        if name in PAGINATION_PARAMS and not (name == 'page' and str(value) == '1')
+    }
+    if params:
+        return f'{path}?{urlencode(sorted(params.items()))}'
+    return path
+
+
+class Snapshot:
+    __slots__ = ('content', 'etag', 'last_modified')
+
+    def __init__(self, content, last_modified):
+        self.content = content
+        self.etag = '"%s"' % hashlib.md5(content).hexdigest()
+        self.last_modified = last_modified
+
+
+class SnapshotStore:
+    """On-disk snapshot files fronted by a per-process dict"""
+
+    def __init__(self, root=None):
+        self._root = root
+        self._memory = {}
+        self._version = None
+        self._lock = threading.Lock()
+
+    @property
+    def root(self):
+        return Path(self._root or settings.API_SNAPSHOT_ROOT)
+
+    def _path(self, key):
+        return self.root / f"{quote(key, safe='')}.json"
+
+    def _check_version(self):
+        """Drop the in-memory copy when another process regenerated snapshots"""
+        try:
+            version = os.stat(self.root / VERSION_FILE).st_mtime_ns
+        except FileNotFoundError:
+            version = None
+        if version != self._version:
+            with self._lock:
+                self._memory = {}
+                self._version = version
+
+    def get(self, key):
+        self._check_version()
+        snapshot = self._memory.get(key)
+        if snapshot is None:
+            path = self._path(key)
+            try:
+                content = path.read_bytes()
+                last_modified = int(path.stat().st_mtime)
+            except FileNotFoundError:
+                return None
+            snapshot = self._memory[key] = Snapshot(content, last_modified)
+        return snapshot
+
+    def keys(self):
+        return [unquote(path.name[:-len('.json')]) for path in self.root.glob('*.json')]
+
+    def write(self, key, content):
+        self.root.mkdir(parents=True, exist_ok=True)
+        # Atomic replace so concurrent readers never see a partial file
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as fh:
+            fh.write(content)
+        os.replace(tmp, self._path(key))
+
+    def delete(self, key):
+        try:
+            self._path(key).unlink()
+        except FileNotFoundError:
+            pass
+
+    def touch_version(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        (self.root / VERSION_FILE).write_text(str(os.getpid()))
+
+
+snapshot_store = SnapshotStore()
+
+
+def render_endpoint(path):
+    """
+    Render an endpoint through its viewset, following pagination.
+    Returns a dict {key: bytes}; empty if the endpoint does not answer 200.
+    """
+    base = urlsplit(settings.API_BASE_URL)
+    factory = RequestFactory()
+    rendered = {}
+    params = {}
+    while True:
+        request = factory.get(
+            path, params, HTTP_HOST=base.netloc, HTTP_ACCEPT='application/json',
+            secure=base.scheme == 'https',
+        )
+        request.building_snapshot = True
+        match = resolve(path)
+        response = match.func(request, *match.args, **match.kwargs)
+        if response.status_code != 200:
+            break
+        # Responses served from the response cache are already rendered
+        if hasattr(response, 'render'):
+            response.render()
+        rendered[snapshot_key(path, params)] = response.content
+
+        # Follow the `next` link of paginated lists (page number or cursor)
+        payload = json.loads(response.content)
+        if not (isinstance(payload, dict) and {'next', 'results'} <= payload.keys() and payload['next']):
+            break
+        params = dict(parse_qsl(urlsplit(payload['next']).query))
+    return rendered
+
+
+def refresh_snapshots(paths, store=snapshot_store):
+    """Regenerate the snapshots of the given endpoints, dropping obsolete pages"""
+    for path in paths:
+        rendered = render_endpoint(path)
+        for key, content in rendered.items():
+            store.write(key, content)
+        prefix = f'{path}?'
+        for key in store.keys():
+            if (key == path or key.startswith(prefix)) and key not in rendered:
+                store.delete(key)
+    store.touch_version()
+
+
+def all_endpoints():
+    """Every public endpoint path, including one detail path per active service and project"""
+    paths = [_endpoint(path) for path in FIXED_ENDPOINTS]
+    paths += [_endpoint(f'services/{slug}/') for slug in Service.objects.filter(is_active=True).values_list('slug', flat=True)]
+    paths += [_endpoint(f'projects/{slug}/') for slug in Project.objects.filter(is_active=True).values_list('slug', flat=True)]
+    return paths
+
+
+def rebuild_snapshots(store=snapshot_store):
+    """Regenerate every snapshot and remove those that no longer exist"""
+    rendered = {}
+    for path in all_endpoints():
+        rendered.update(render_endpoint(path))
+    for key, content in rendered.items():
+        store.write(key, content)
+    for key in store.keys():
+        if key not in rendered:
+            store.delete(key)
+    store.touch_version()
+    return len(rendered)
+
+
+def affected_endpoints(obj):
+    """Endpoints whose output depends on `obj`"""
+    if isinstance(obj, CompanyInfo):
+        return {_endpoint('company-info/'), _endpoint('home/')}
+    if isinstance(obj, Service):
+        paths = {
+            _endpoint('services/'), _endpoint(f'services/{obj.slug}/'),
+            _endpoint('projects/'), _endpoint('projects/featured/'), _endpoint('home/'),
+        }
+        if obj.pk:
+            # Uses prefetched projects when available
+            paths |= {_endpoint(f'projects/{project.slug}/') for project in obj.projects.all()}
+        return paths
+    if isinstance(obj, Project):
+        return {
+            _endpoint('projects/'), _endpoint('projects/featured/'), _endpoint(f'projects/{obj.slug}/'),
+            _endpoint('testimonials/'), _endpoint('gallery/'), _endpoint('gallery/hero/'), _endpoint('home/'),
+        }
+    if isinstance(obj, ProjectImage):
+        return {_endpoint(f'projects/{obj.project.slug}/')}
+    if isinstance(obj, Testimonial):
+        return {_endpoint('testimonials/'), _endpoint('home/')}
+    if isinstance(obj, GalleryImage):
+        return {_endpoint('gallery/'), _endpoint('gallery/hero/'), _endpoint('home/')}
+    return set()
+
+
+def image_endpoints(names):
+    """Endpoints serializing one of the stored images `names` (srcsets included)"""
+    endpoints = set()
+    for model, fields in IMAGE_FIELDS.items():
+        for field in fields:
+            rows = model.objects.filter(**{f'{field}__in': names})
+            if model is ProjectImage:
+                rows = rows.select_related('project')
+            for instance in rows:
+                endpoints |= affected_endpoints(instance)
+    return endpoints
+
+
+def snapshot_lookup(request):
+    """Return the snapshot answering `request`, or None to use the live viewset"""
+    if not snapshots_enabled() or getattr(request, 'building_snapshot', False):
+        return None
+    if request.method not in ('GET', 'HEAD') or 'text/html' in request.META.get('HTTP_ACCEPT', ''):
+        return None
+    if set(request.GET) - set(PAGINATION_PARAMS):
+        return None
+    # Snapshots embed absolute media URLs built for API_BASE_URL
+    if request.build_absolute_uri('/') != settings.API_BASE_URL.rstrip('/') + '/':
+        return None
+    return snapshot_store.get(snapshot_key(request.path, request.GET.dict()))
+
+
+class SnapshotMixin:
+    """Serve GET requests of a read-only viewset from the snapshot store"""
+
+    def dispatch(self, request, *args, **kwargs):
+        snapshot = snapshot_lookup(request)
+        if snapshot is None:
+            return super().dispatch(request, *args, **kwargs)
+
+        response = HttpResponse(snapshot.content, content_type='application/json')
+        response['ETag'] = snapshot.etag
+        response['Last-Modified'] = http_date(snapshot.last_modified)
+        response['Vary'] = 'Accept'
+        response['X-Snapshot'] = 'HIT'
+        patch_cache_control(response, no_cache=True)
+        return get_conditional_response(
+            request, etag=snapshot.etag, last_modified=snapshot.last_modified, response=response,
+        )
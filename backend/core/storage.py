@@ -0,0 +1,86 @@
+"""
+Content-addressed media storage.
+
+Files are stored under `content/<2 hex>/<sha256><ext>`, whatever name or
+upload_to directory they were saved with, so identical bytes uploaded to a
+Project, a ProjectImage and a GalleryImage share a single file and URL.
+A name only ever designates one content, which makes every media URL
+cacheable as immutable (see core/media.py).
+
+Because files are shared, delete() keeps a file that is still referenced
+by a model row.
+"""
+import hashlib
+import os
+import tempfile
+from pathlib import PurePosixPath
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+CONTENT_DIR = 'content'
+
+
+def is_content_addressed(name):
+    return name.startswith(f'{CONTENT_DIR}/')
+
+
+class ContentAddressedStorage(FileSystemStorage):
+
+    def content_name(self, name, content):
+        """Storage name of `content`: its SHA-256 plus the extension of `name`"""
+        digest = hashlib.sha256()
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        digest = digest.hexdigest()
+        extension = PurePosixPath(name or '').suffix.lower()
+        return f'{CONTENT_DIR}/{digest[:2]}/{digest}{extension}'
+
+    def save(self, name, content, max_length=None):
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        # The name is derived from the content: no collision renaming needed
+        return self._save(self.content_name(name, content), content)
+
+    def _save(self, name, content):
+        full_path = self.path(name)
+        if os.path.exists(full_path):
+            # Same name, same bytes: deduplicated
+            return name
+
+        directory = os.path.dirname(full_path)
+        if self.directory_permissions_mode is not None:
+            old_umask = os.umask(0o777 & ~self.directory_permissions_mode)
+            try:
+                os.makedirs(directory, self.directory_permissions_mode, exist_ok=True)
+            finally:
+                os.umask(old_umask)
+        else:
+            os.makedirs(directory, exist_ok=True)
+
+        # Write to a temporary file and rename it, so concurrent saves of the
+        # same content never expose a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as fh:
+                for chunk in content.chunks():
+                    fh.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(tmp_path, self.file_permissions_mode)
+            os.replace(tmp_path, full_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return name
+
+    def delete(self, name):
+        from .images import file_in_use
+
+        if name and file_in_use(name):
+            return
+        super().delete(name)
@@ -1,3 +1,1442 @@
-from django.test import TestCase
+import json
+import re
+import shutil
+import tempfile
+import uuid
+from datetime import date, datetime, timedelta, timezone as datetime_timezone
+from decimal import Decimal
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock, skipIf
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache, caches
+from django.core.mail.backends import locmem
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from PIL import ExifTags, Image
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from .cache import (
+    GENERATION_KEY, bump_content_generation, get_content_generation, reset_response_cache_stats, response_cache_stats,
+)
+from .cropping import STRIP_PIXELS, MarginDetector, crop_margins
+from .images import generate_derivatives
+from .imaging import open_image
+from .jobs import claim_jobs
+from .pagination import KeysetPagination
+from .renderers import FastJSONParser, FastJSONRenderer, orjson
+from .search import search_project_ids
+from .management.commands.benchmark_crop import synthetic_screenshot
+from .management.commands.process_jobs import run_job_in_worker
+from .throttling import CacheTokenBuckets, memory_buckets
+from .snapshots import (
+    affected_endpoints, rebuild_snapshots, refresh_snapshots, snapshot_lookup, snapshot_store,
+)
+from .models import (
+    CompanyInfo, Service, Project, ProjectImage, Testimonial, ContactMessage, GalleryImage, ImageDerivative, Job,
+    OutboxEmail,
+)
+
+
+def make_image(name='photo.jpg', size=(2000, 1000), color=(200, 120, 40), orientation=None):
+    buffer = BytesIO()
+    image = Image.new('RGB', size, color)
+    exif = image.getexif()
+    if orientation:
+        exif[ExifTags.Base.Orientation] = orientation
+    image.save(buffer, 'JPEG', exif=exif)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+class MediaRootMixin:
+    """Run a test case against a throwaway MEDIA_ROOT"""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Pin the number of SQL queries issued by each public endpoint.
+    The budget must not grow with the number of rows: a serializer that
+    reintroduces an N+1 lookup makes these tests fail.
+    Each budget includes the ETag/Last-Modified aggregate query, and one
+    image derivative query for payloads with srcsets. Cursor-paginated lists
+    issue no COUNT query.
+    """
+    ROW_COUNTS = [10, 100, 1000]
+
+    @classmethod
+    def setUpTestData(cls):
+        CompanyInfo.objects.create(
+            company_name="Entreprise", description="Description", phone="0400000000",
+            email="contact@example.com", address="Lattes",
+        )
+        cls.service = Service.objects.create(title="Service principal", description="Description")
+        cls.project = Project.objects.create(
+            title="Projet principal", description="Description", service=cls.service,
+            featured_image='projects/featured/main.jpg', is_featured=True,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def seed(self, rows):
+        """Top up every content table to `rows` rows"""
+        for model, build in [
+            (Service, lambda i: Service(title=f"Service {i}", slug=f"service-{i}", description="Description")),
+            (Project, lambda i: Project(
+                title=f"Projet {i}", slug=f"projet-{i}", description="Description",
+                service=self.service, featured_image=f'projects/featured/{i}.jpg', is_featured=True,
+            )),
+            (ProjectImage, lambda i: ProjectImage(
+                project=self.project, image=f'projects/gallery/{i}.jpg', order=i, is_visible=i % 2 == 0,
+            )),
+            (Testimonial, lambda i: Testimonial(client_name=f"Client {i}", content="Parfait", project=self.project)),
+            (GalleryImage, lambda i: GalleryImage(
+                title=f"Image {i}", image=f'gallery/{i}.jpg', category='hero', linked_project=self.project,
+            )),
+        ]:
+            existing = model.objects.count()
+            model.objects.bulk_create(build(i) for i in range(existing, rows))
+        # bulk_create does not send post_save
+        bump_content_generation()
+
+    def assertEndpointBudget(self, url, budget):
+        for rows in self.ROW_COUNTS:
+            self.seed(rows)
+            with self.subTest(rows=rows), self.assertNumQueries(budget):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+    def test_company_info(self):
+        self.assertEndpointBudget('/api/company-info/', 2)
+
+    def test_service_list(self):
+        self.assertEndpointBudget('/api/services/', 3)
+
+    def test_service_detail(self):
+        self.assertEndpointBudget(f'/api/services/{self.service.slug}/', 2)
+
+    def test_project_list(self):
+        self.assertEndpointBudget('/api/projects/', 3)
+
+    def test_project_featured(self):
+        self.assertEndpointBudget('/api/projects/featured/', 3)
+
+    def test_project_detail(self):
+        self.assertEndpointBudget(f'/api/projects/{self.project.slug}/', 4)
+
+    def test_testimonial_list(self):
+        self.assertEndpointBudget('/api/testimonials/', 2)
+
+    def test_gallery_list(self):
+        self.assertEndpointBudget('/api/gallery/', 3)
+
+    def test_gallery_hero(self):
+        self.assertEndpointBudget('/api/gallery/hero/', 3)
+
+    def test_home(self):
+        self.assertEndpointBudget('/api/home/', 8)
+
+    def test_project_detail_only_exposes_visible_images(self):
+        self.seed(10)
+        response = self.client.get(f'/api/projects/{self.project.slug}/')
+        self.assertEqual(len(response.json()['images']), 5)
+
+    def test_deep_cursor_pages_cost_the_same(self):
+        self.seed(100)
+        url = '/api/projects/'
+        for _ in range(9):
+            url = self.client.get(url).json()['next']
+        cache.clear()
+        with self.assertNumQueries(3), CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        if connection.vendor == 'sqlite':
+            page = next(query['sql'] for query in queries if 'LIMIT' in query['sql'])
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN QUERY PLAN {page}')
+                plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+            # A seek to the cursor in the list index, not a scan from the first row
+            self.assertIn('SEARCH core_project USING INDEX core_project_active_idx (', plan)
+
+
+class ResponseCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.service = Service.objects.create(title="Cuisine", description="Description")
+
+    def setUp(self):
+        cache.clear()
+        reset_response_cache_stats()
+
+    @override_settings(RESPONSE_CACHE_STATS=True)
+    def test_second_request_is_served_from_cache(self):
+        response = self.client.get('/api/services/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            cached = self.client.get('/api/services/')
+        self.assertEqual(cached['X-Cache'], 'HIT')
+        self.assertEqual(cached.content, response.content)
+        self.assertEqual(cached['Content-Type'], response['Content-Type'])
+        stats = response_cache_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    def test_save_invalidates_cached_responses(self):
+        self.client.get('/api/services/')
+        self.service.title = "Cuisine moderne"
+        self.service.save()
+        response = self.client.get('/api/services/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['results'][0]['title'], "Cuisine moderne")
+
+    def test_delete_invalidates_cached_responses(self):
+        self.client.get('/api/services/')
+        self.service.delete()
+        self.assertEqual(self.client.get('/api/services/').json()['count'], 0)
+
+    def test_errors_are_not_cached(self):
+        self.client.get('/api/services/inconnu/')
+        self.assertEqual(self.client.get('/api/services/inconnu/')['X-Cache'], 'MISS')
+
+    def test_lost_generation_never_revives_older_entries(self):
+        self.client.get('/api/services/')
+        generation = get_content_generation()
+        # The counter is evicted while responses of its generation survive
+        caches['cache-state'].delete(GENERATION_KEY)
+        self.assertGreater(get_content_generation(), generation)
+        self.assertEqual(self.client.get('/api/services/')['X-Cache'], 'MISS')
+
+    def test_counters_are_opt_in(self):
+        self.client.get('/api/services/')
+        self.client.get('/api/services/')
+        stats = response_cache_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (0, 0))
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.service = Service.objects.create(title="Cuisine", description="Description")
+
+    def setUp(self):
+        cache.clear()
+
+    def test_validators_are_emitted(self):
+        response = self.client.get('/api/services/')
+        self.assertTrue(response['ETag'].startswith('"'))
+        self.assertIn('Last-Modified', response)
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_matching_etag_returns_304_without_serializing(self):
+        etag = self.client.get('/api/services/')['ETag']
+        cache.clear()
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/services/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_cached_response_honours_if_none_match(self):
+        etag = self.client.get('/api/services/')['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/services/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_if_modified_since(self):
+        last_modified = self.client.get('/api/services/')['Last-Modified']
+        cache.clear()
+        response = self.client.get('/api/services/', HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_related_change_changes_etag(self):
+        Project.objects.create(title="Projet", description="Description", service=self.service)
+        etag = self.client.get('/api/projects/')['ETag']
+        self.service.title = "Cuisine moderne"
+        self.service.save()
+        response = self.client.get('/api/projects/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['results'][0]['service_name'], "Cuisine moderne")
+
+    def test_deactivation_changes_etag(self):
+        etag = self.client.get('/api/services/')['ETag']
+        self.service.is_active = False
+        self.service.save()
+        self.assertNotEqual(self.client.get('/api/services/')['ETag'], etag)
+
+
+class SnapshotTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.service = Service.objects.create(title="Cuisine", description="Description")
+        cls.project = Project.objects.create(title="Projet", description="Description", service=cls.service)
+
+    def setUp(self):
+        cache.clear()
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        settings_override = override_settings(
+            API_SNAPSHOTS=True, API_SNAPSHOT_ROOT=root, API_BASE_URL='http://testserver',
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_snapshot_is_served_without_queries(self):
+        live = self.client.get('/api/projects/')
+        rebuild_snapshots()
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/projects/')
+        self.assertEqual(response['X-Snapshot'], 'HIT')
+        self.assertEqual(response.content, live.content)
+
+    def test_snapshot_answers_if_none_match(self):
+        rebuild_snapshots()
+        etag = self.client.get('/api/home/')['ETag']
+        response = self.client.get('/api/home/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_paginated_lists_are_snapshotted_per_page(self):
+        Service.objects.bulk_create(
+            Service(title=f"Service {i}", slug=f"service-{i}", description="Description") for i in range(15)
+        )
+        rebuild_snapshots()
+        self.assertIn('/api/services/?page=2', snapshot_store.keys())
+        response = self.client.get('/api/services/', {'page': 2})
+        self.assertEqual(response['X-Snapshot'], 'HIT')
+        self.assertEqual(len(response.json()['results']), 6)
+
+    def test_cursor_pages_are_snapshotted(self):
+        Project.objects.bulk_create(
+            Project(title=f"Projet {i}", slug=f"projet-{i}", description="Description", service=self.service)
+            for i in range(15)
+        )
+        rebuild_snapshots()
+        next_url = self.client.get('/api/projects/').json()['next']
+        response = self.client.get(next_url)
+        self.assertEqual(response['X-Snapshot'], 'HIT')
+        self.assertEqual(len(response.json()['results']), 6)
+
+    def test_unsupported_requests_fall_back_to_viewset(self):
+        rebuild_snapshots()
+        self.assertNotIn('X-Snapshot', self.client.get('/api/projects/', {'ordering': 'title'}))
+        browsable = RequestFactory().get('/api/projects/', HTTP_ACCEPT='text/html')
+        self.assertIsNone(snapshot_lookup(browsable))
+
+    def test_refresh_only_affected_endpoints(self):
+        rebuild_snapshots()
+        self.project.title = "Projet renommé"
+        self.project.slug = "projet-renomme"
+        previous = affected_endpoints(Project.objects.get(pk=self.project.pk))
+        self.project.save()
+        refresh_snapshots(previous | affected_endpoints(self.project))
+        keys = snapshot_store.keys()
+        self.assertIn('/api/projects/projet-renomme/', keys)
+        self.assertNotIn('/api/projects/projet/', keys)
+        self.assertEqual(self.client.get('/api/projects/').json()['results'][0]['title'], "Projet renommé")
+
+    def test_admin_save_regenerates_snapshots(self):
+        rebuild_snapshots()
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        response = self.client.post(f'/admin/core/service/{self.service.pk}/change/', {
+            'title': "Cuisine moderne", 'slug': self.service.slug, 'description': "Description",
+            'short_description': "", 'icon': "Kitchen", 'order': 0, 'is_active': 'on',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.client.logout()
+        response = self.client.get(f'/api/services/{self.service.slug}/')
+        self.assertEqual(response['X-Snapshot'], 'HIT')
+        self.assertEqual(response.json()['title'], "Cuisine moderne")
+        self.assertEqual(
+            self.client.get(f'/api/projects/{self.project.slug}/').json()['service_name'], "Cuisine moderne"
+        )
+
+
+class ExportApiSnapshotTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.service = Service.objects.create(title="Cuisine", description="Description")
+        cls.project = Project.objects.create(title="Projet", description="Description", service=cls.service)
+
+    def setUp(self):
+        cache.clear()
+        self.output = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.output)
+
+    def export(self, *args):
+        out = StringIO()
+        with self.settings(API_BASE_URL='http://testserver'):
+            call_command('export_api_snapshot', '--output', str(self.output), *args, stdout=out)
+        return out.getvalue()
+
+    def test_full_export_mirrors_endpoints(self):
+        self.export()
+        exported = (self.output / 'api' / 'projects' / 'projet' / 'index.json').read_bytes()
+        self.assertEqual(exported, self.client.get('/api/projects/projet/').content)
+        self.assertTrue((self.output / 'api' / 'projects' / 'index.json.gz').exists())
+        self.assertTrue((self.output / 'api' / '.htaccess').exists())
+        manifest = json.loads((self.output / 'manifest.json').read_text())
+        self.assertIn('/api/home/', manifest['files'])
+
+    def test_incremental_export_only_renders_changed_objects(self):
+        self.export()
+        self.assertIn('Rendering 0 endpoints', self.export())
+
+        Testimonial.objects.create(client_name="Client", content="Parfait")
+        output = self.export()
+        self.assertIn('Rendering 2 endpoints', output)
+        self.assertIn('2 written', output)
+
+    def test_incremental_export_follows_derivatives(self):
+        self.project.featured_image = 'projects/featured/photo.jpg'
+        self.project.save()
+        self.export()
+        # The job queue adds derivatives without saving the project
+        ImageDerivative.objects.create(
+            source='projects/featured/photo.jpg', format='webp', width=320, height=160, file='derivatives/photo-320.webp',
+        )
+        bump_content_generation()
+        output = self.export()
+        self.assertNotIn('Rendering 0 endpoints', output)
+        exported = json.loads((self.output / 'api' / 'projects' / 'projet' / 'index.json').read_bytes())
+        self.assertIn('320w', exported['featured_image_srcset']['webp'])
+        self.assertIn('Rendering 0 endpoints', self.export())
+
+    def test_incremental_export_removes_deleted_objects(self):
+        self.export()
+        self.project.delete()
+        self.export()
+        self.assertFalse((self.output / 'api' / 'projects' / 'projet' / 'index.json').exists())
+        manifest = json.loads((self.output / 'manifest.json').read_text())
+        self.assertNotIn('/api/projects/projet/', manifest['files'])
+
+
+def process_jobs():
+    call_command('process_jobs', '--once', '--workers', '1', stdout=StringIO())
+
+
+class ImageDerivativeTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def test_upload_generates_every_width_and_format(self):
+        project = Project.objects.create(title="Projet", description="Description", featured_image=make_image())
+        process_jobs()
+        derivatives = ImageDerivative.objects.filter(source=project.featured_image.name)
+        self.assertEqual(
+            sorted(derivatives.values_list('format', 'width', 'height')),
+            sorted((fmt, width, width // 2) for fmt in ('jpeg', 'webp') for width in (320, 640, 1280, 1920)),
+        )
+
+    def test_exif_orientation_is_applied(self):
+        project = Project.objects.create(
+            title="Projet", description="Description", featured_image=make_image(size=(1500, 3000), orientation=8),
+        )
+        process_jobs()
+        self.assertEqual(
+            sorted(ImageDerivative.objects.filter(source=project.featured_image.name, format='jpeg')
+                   .values_list('width', 'height')),
+            [(320, 160), (640, 320), (1280, 640), (1920, 960)],
+        )
+
+    def test_small_images_are_not_upscaled(self):
+        image = GalleryImage.objects.create(title="Image", image=make_image(size=(200, 100)))
+        process_jobs()
+        self.assertEqual(
+            set(ImageDerivative.objects.filter(source=image.image.name).values_list('width', flat=True)), {200},
+        )
+
+    def test_serializers_expose_srcsets(self):
+        project = Project.objects.create(title="Projet", description="Description", featured_image=make_image())
+        ProjectImage.objects.create(project=project, image=make_image('detail.jpg', size=(800, 600)))
+        process_jobs()
+
+        listed = self.client.get('/api/projects/').json()['results'][0]
+        srcset = listed['featured_image_srcset']
+        self.assertEqual(set(srcset), {'jpeg', 'webp'})
+        self.assertRegex(srcset['webp'], r'^http://testserver/media/content/[0-9a-f]{2}/[0-9a-f]{64}\.webp 320w, ')
+        self.assertTrue(srcset['jpeg'].endswith(' 1920w'))
+
+        detail = self.client.get(f'/api/projects/{project.slug}/').json()
+        self.assertIsNone(detail['before_image_srcset'])
+        self.assertRegex(detail['images'][0]['image_srcset']['jpeg'], r'/[0-9a-f]{64}\.jpg 640w$')
+
+    def test_command_refreshes_snapshots(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        with override_settings(API_SNAPSHOTS=True, API_SNAPSHOT_ROOT=root, API_BASE_URL='http://testserver'):
+            project = Project.objects.create(title="Projet", description="Description", featured_image=make_image())
+            rebuild_snapshots()
+            call_command('generate_image_derivatives', stdout=StringIO())
+            response = self.client.get(f'/api/projects/{project.slug}/')
+        self.assertEqual(response['X-Snapshot'], 'HIT')
+        self.assertIn('1920w', response.json()['featured_image_srcset']['webp'])
+
+    def test_missing_file_has_no_srcset(self):
+        project = Project.objects.create(
+            title="Projet", description="Description", featured_image='projects/featured/absent.jpg',
+        )
+        process_jobs()
+        self.assertFalse(ImageDerivative.objects.filter(source=project.featured_image.name).exists())
+        self.assertIsNone(self.client.get('/api/projects/').json()['results'][0]['featured_image_srcset'])
+
+
+@override_settings(JOB_RETRY_DELAY=60)
+class JobQueueTests(MediaRootMixin, TestCase):
+    def test_repeated_saves_queue_a_single_job(self):
+        project = Project.objects.create(title="Projet", description="Description", featured_image=make_image())
+        project.save()
+        project.save()
+        self.assertEqual(Job.objects.filter(kind='image_derivatives').count(), 1)
+
+    def test_processed_images_are_not_queued_again(self):
+        project = Project.objects.create(title="Projet", description="Description", featured_image=make_image())
+        process_jobs()
+        project.save()
+        self.assertEqual(Job.objects.get().status, 'done')
+
+    def test_failures_are_retried_then_marked_failed(self):
+        Project.objects.create(title="Projet", description="Description", featured_image='projects/absent.jpg')
+        job = Job.objects.get()
+        process_jobs()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('pending', 1))
+        self.assertIn('absent.jpg', job.last_error)
+
+        Job.objects.update(max_attempts=2, run_after=timezone.now())
+        process_jobs()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+
+    def test_backoff_delays_retries(self):
+        Project.objects.create(title="Projet", description="Description", featured_image='projects/absent.jpg')
+        process_jobs()
+        job = Job.objects.get()
+        self.assertGreater(job.run_after, job.updated_at)
+        self.assertEqual(claim_jobs(limit=10), [])
+
+    def test_admin_retry_resets_failed_jobs(self):
+        Project.objects.create(title="Projet", description="Description", featured_image='projects/absent.jpg')
+        Job.objects.update(status='failed', attempts=3, updated_at=timezone.now() - timedelta(days=1))
+        job = Job.objects.get()
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        self.client.post('/admin/core/job/', {'action': 'retry_jobs', '_selected_action': [job.pk]})
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('pending', 0))
+        self.assertGreater(job.updated_at, timezone.now() - timedelta(minutes=1))
+
+    def test_stale_running_jobs_are_reclaimed(self):
+        Project.objects.create(title="Projet", description="Description", featured_image=make_image())
+        Job.objects.update(status='running', locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(len(claim_jobs(limit=10)), 1)
+
+    def test_pool_workers_release_their_connections(self):
+        calls = []
+        target = 'core.management.commands.process_jobs.%s'
+        with mock.patch(target % 'close_old_connections', side_effect=lambda: calls.append('close')), \
+                mock.patch(target % 'run_job', side_effect=lambda pk: calls.append(pk) or 'done'):
+            self.assertEqual(run_job_in_worker(7), 'done')
+        self.assertEqual(calls, ['close', 7, 'close'])
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        service = Service.objects.create(title="Cuisine", description="Description")
+        # Ties on every ordering column and NULL completion dates
+        for i in range(25):
+            Project.objects.create(
+                title=f"Projet {i}", description="Description", service=service,
+                is_featured=i % 3 == 0, order=i % 2,
+                completion_date=None if i % 4 == 0 else date(2024, 1, 1) + timedelta(days=i % 5),
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def walk(self, url, link='next'):
+        slugs = []
+        while url:
+            payload = self.client.get(url).json()
+            slugs.extend(project['slug'] for project in payload['results'])
+            url = payload[link]
+        return slugs
+
+    def test_cursor_pages_follow_model_ordering(self):
+        expected = list(Project.objects.values_list('slug', flat=True))
+        first = self.client.get('/api/projects/').json()
+        self.assertNotIn('count', first)
+        self.assertIsNone(first['previous'])
+        self.assertEqual(self.walk('/api/projects/'), expected)
+
+    def test_previous_links_walk_back(self):
+        payload = self.client.get('/api/projects/').json()
+        second = self.client.get(payload['next']).json()
+        third = self.client.get(second['next']).json()
+        self.assertIsNone(third['next'])
+        back = self.client.get(third['previous']).json()
+        self.assertEqual(back['results'], second['results'])
+        self.assertEqual(self.client.get(back['previous']).json()['results'], payload['results'])
+
+    def test_rows_created_in_the_same_millisecond(self):
+        created_at = timezone.now()
+        testimonials = Testimonial.objects.bulk_create(
+            Testimonial(client_name=f"Client {i}", content="Parfait", order=0) for i in range(30)
+        )
+        for i, testimonial in enumerate(testimonials):
+            # Sub-millisecond differences only
+            Testimonial.objects.filter(pk=testimonial.pk).update(created_at=created_at + timedelta(microseconds=i * 10))
+        expected = list(Testimonial.objects.values_list('pk', flat=True))
+
+        with mock.patch.object(KeysetPagination, 'page_size', 4):
+            ids, url = [], '/api/testimonials/'
+            while url:
+                payload = self.client.get(url).json()
+                ids.extend(testimonial['id'] for testimonial in payload['results'])
+                url = payload['next']
+            self.assertEqual(ids, expected)
+            previous = self.client.get(payload['previous']).json()
+            self.assertEqual([testimonial['id'] for testimonial in previous['results']], expected[-6:-2])
+
+    def test_invalid_cursor_is_not_found(self):
+        self.assertEqual(self.client.get('/api/projects/', {'cursor': 'garbage'}).status_code, 404)
+
+    def test_page_numbers_remain_available(self):
+        payload = self.client.get('/api/projects/', {'page': 2}).json()
+        self.assertEqual(payload['count'], 25)
+        self.assertEqual(len(payload['results']), 10)
+
+
+class BenchmarkQueriesTests(TestCase):
+    def test_benchmark_uses_indexes_and_rolls_back(self):
+        out = StringIO()
+        call_command('benchmark_queries', '--rows', '200', '--repeat', '1', stdout=out)
+        output = out.getvalue()
+        self.assertIn('core_project_active_idx', output)
+        self.assertIn('validators (home)', output)
+        self.assertEqual(Project.objects.count(), 0)
+
+
+class MediaServingTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.body = bytes(range(256)) * 40
+        media = Path(settings.MEDIA_ROOT)
+        (media / 'gallery').mkdir()
+        (media / 'gallery' / 'photo.jpg').write_bytes(self.body)
+        (media / 'derivatives').mkdir()
+        (media / 'derivatives' / 'photo_640w.3fa9c1d2e4b5.webp').write_bytes(self.body)
+        # Uploaded before content addressing, under a name that merely looks hashed
+        (media / 'gallery' / 'photo-3fa9c1d2e4b5.jpg').write_bytes(self.body)
+
+    def get(self, url, **headers):
+        response = self.client.get(url, **headers)
+        content = b''.join(response.streaming_content) if response.streaming else response.content
+        response.close()
+        return response, content
+
+    def test_full_file(self):
+        response, content = self.get('/media/gallery/photo.jpg')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(content, self.body)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=86400')
+
+    def test_derivative_names_are_immutable(self):
+        response, _ = self.get('/media/derivatives/photo_640w.3fa9c1d2e4b5.webp')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('max-age=31536000', response['Cache-Control'])
+
+    def test_legacy_names_are_not_immutable(self):
+        response, _ = self.get('/media/gallery/photo-3fa9c1d2e4b5.jpg')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=86400')
+
+    def test_byte_ranges(self):
+        response, content = self.get('/media/gallery/photo.jpg', HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(content, self.body[100:200])
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(self.body)}')
+
+        response, content = self.get('/media/gallery/photo.jpg', HTTP_RANGE='bytes=-10')
+        self.assertEqual(content, self.body[-10:])
+
+        response, _ = self.get('/media/gallery/photo.jpg', HTTP_RANGE=f'bytes={len(self.body)}-')
+        self.assertEqual(response.status_code, 416)
+
+    def test_stale_if_range_returns_full_file(self):
+        response, content = self.get(
+            '/media/gallery/photo.jpg', HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(content, self.body)
+
+    def test_conditional_requests(self):
+        response, _ = self.get('/media/gallery/photo.jpg')
+        response, content = self.get('/media/gallery/photo.jpg', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(content, b'')
+
+    @override_settings(MEDIA_SENDFILE='x-accel-redirect')
+    def test_front_server_handoff(self):
+        response, content = self.get('/media/gallery/photo.jpg')
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/gallery/photo.jpg')
+        self.assertEqual(content, b'')
+        with self.settings(MEDIA_SENDFILE='x-sendfile'):
+            response, _ = self.get('/media/gallery/photo.jpg')
+            self.assertTrue(response['X-Sendfile'].endswith('gallery/photo.jpg'))
+
+    def test_missing_and_outside_files_are_not_found(self):
+        self.assertEqual(self.client.get('/media/gallery/absent.jpg').status_code, 404)
+        self.assertEqual(self.client.get('/media/%2e%2e/backend/settings.py').status_code, 404)
+        self.assertEqual(self.client.get('/media/gallery/').status_code, 404)
+
+    def test_sendfile_path_follows_media_root(self):
+        htaccess = Path(settings.MEDIA_ROOT) / '.htaccess'
+        htaccess.write_text(
+            'PassengerEnabled on\n'
+            '# BEGIN media sendfile (generated by `manage.py media_server_config`)\n# END media sendfile\n'
+        )
+        for _ in range(2):
+            call_command('media_server_config', '--htaccess', str(htaccess), stdout=StringIO())
+        text = htaccess.read_text()
+        self.assertEqual(text.count(f'XSendFilePath "{settings.MEDIA_ROOT}"'), 1)
+        self.assertTrue(text.startswith('PassengerEnabled on\n'))
+
+        out = StringIO()
+        call_command('media_server_config', '--server', 'nginx', stdout=out)
+        self.assertIn(f'alias {settings.MEDIA_ROOT}/;', out.getvalue())
+
+
+class ContentAddressedStorageTests(MediaRootMixin, TestCase):
+    def test_identical_uploads_share_one_file(self):
+        project = Project.objects.create(title="Projet", description="Description", featured_image=make_image('a.jpg'))
+        image = ProjectImage.objects.create(project=project, image=make_image('b.jpg'))
+        hero = GalleryImage.objects.create(title="Hero", image=make_image('hero.JPG'), category='hero')
+        other = GalleryImage.objects.create(title="Autre", image=make_image('c.jpg', color=(0, 0, 0)))
+
+        self.assertRegex(project.featured_image.name, r'^content/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$')
+        self.assertEqual(project.featured_image.name, image.image.name)
+        self.assertEqual(project.featured_image.name, hero.image.name)
+        self.assertNotEqual(project.featured_image.name, other.image.name)
+        stored = [path for path in Path(settings.MEDIA_ROOT, 'content').rglob('*') if path.is_file()]
+        self.assertEqual(len(stored), 2)
+
+        response = self.client.get(project.featured_image.url)
+        self.assertIn('immutable', response['Cache-Control'])
+        response.close()
+
+    def test_shared_files_are_kept_while_referenced(self):
+        image = GalleryImage.objects.create(title="Hero", image=make_image())
+        other = GalleryImage.objects.create(title="Copie", image=make_image())
+        name, storage = other.image.name, other.image.storage
+        image.image.delete(save=False)
+        self.assertTrue(storage.exists(name))
+
+        GalleryImage.objects.all().delete()
+        other.image.delete(save=False)
+        self.assertFalse(storage.exists(name))
+
+    def test_regenerated_derivatives_keep_their_files(self):
+        project = Project.objects.create(title="Projet", description="Description", featured_image=make_image())
+        process_jobs()
+        generate_derivatives(project.featured_image.name)
+        derivatives = ImageDerivative.objects.filter(source=project.featured_image.name)
+        self.assertEqual(derivatives.count(), 8)
+        for derivative in derivatives:
+            self.assertTrue(derivative.file.storage.exists(derivative.file.name), derivative.file.name)
+
+    def test_deduplicate_media_renames_legacy_files(self):
+        media = Path(settings.MEDIA_ROOT)
+        for name in ['gallery/hero_1a.jpg', 'projects/gallery/projet-1_2.jpg']:
+            (media / name).parent.mkdir(parents=True, exist_ok=True)
+            (media / name).write_bytes(make_image().read())
+        project = Project.objects.create(title="Projet", description="Description")
+        ProjectImage.objects.bulk_create([ProjectImage(project=project, image='projects/gallery/projet-1_2.jpg')])
+        GalleryImage.objects.bulk_create([GalleryImage(title="Hero", image='gallery/hero_1a.jpg')])
+
+        out = StringIO()
+        call_command('deduplicate_media', stdout=out)
+        self.assertIn('Renamed 2 files, 1 duplicates merged', out.getvalue())
+        name = ProjectImage.objects.get().image.name
+        self.assertTrue(name.startswith('content/'))
+        self.assertEqual(GalleryImage.objects.get().image.name, name)
+        self.assertFalse((media / 'gallery' / 'hero_1a.jpg').exists())
+        self.assertTrue((media / name).exists())
+
+    def test_deduplicate_media_refreshes_responses_before_removing_files(self):
+        legacy = Path(settings.MEDIA_ROOT) / 'gallery' / 'hero_1a.jpg'
+        legacy.parent.mkdir(parents=True)
+        legacy.write_bytes(make_image().read())
+        GalleryImage.objects.bulk_create([GalleryImage(title="Hero", image='gallery/hero_1a.jpg')])
+        GalleryImage.objects.update(updated_at=timezone.now() - timedelta(days=1))
+        generation = get_content_generation()
+
+        refreshed = []
+        with override_settings(API_SNAPSHOTS=True), mock.patch(
+            'core.management.commands.deduplicate_media.refresh_snapshots',
+            side_effect=lambda endpoints: refreshed.append((endpoints, legacy.exists())),
+        ):
+            call_command('deduplicate_media', stdout=StringIO())
+        image = GalleryImage.objects.get()
+        self.assertGreater(image.updated_at, timezone.now() - timedelta(minutes=1))
+        self.assertNotEqual(get_content_generation(), generation)
+        # Snapshots were refreshed while the old file could still be served
+        self.assertEqual(refreshed, [({'/api/gallery/', '/api/gallery/hero/', '/api/home/'}, True)])
+        self.assertFalse(legacy.exists())
+
+
+class ImportProjectImagesTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, root)
+        for folder, count in [('1a', 3), ('1b', 1), ('6', 2)]:
+            (root / 'media_to_import' / folder).mkdir(parents=True)
+            for i in range(count):
+                # Photo framed by black margins, cropped away on import
+                image = Image.new('RGB', (120, 80), (0, 0, 0))
+                image.paste(Image.new('RGB', (60, 40), (200, 40 * i, 90)), (30, 20))
+                image.save(root / 'media_to_import' / folder / f'IMG_{i}.jpg', quality=95)
+        (root / 'media_to_import' / '6' / 'broken.jpg').write_bytes(b'not an image')
+        self.import_dir = root / 'media_to_import'
+        settings_override = override_settings(BASE_DIR=root / 'backend')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def run_import(self, workers, *args):
+        out = StringIO()
+        call_command('import_project_images', '--workers', str(workers), *args, stdout=out)
+        rows = [
+            (project.slug, project.featured_image.name, project.before_image.name)
+            for project in Project.objects.order_by('slug')
+        ]
+        rows += list(ProjectImage.objects.order_by('project__slug', 'order').values_list('image', 'order'))
+        rows += list(GalleryImage.objects.order_by('order').values_list('image', 'title'))
+        # Timings differ between runs
+        return re.sub(r'[0-9.]+(s| rows/s)\b', r'N\1', out.getvalue()), rows
+
+    def test_parallel_import_matches_serial_import(self):
+        serial_output, serial_rows = self.run_import(1)
+        Project.objects.all().delete()
+        parallel_output, parallel_rows = self.run_import(2)
+        self.assertEqual(parallel_rows, serial_rows)
+        self.assertEqual(parallel_output.replace('2 worker(s)', '1 worker(s)'), serial_output)
+
+        project = Project.objects.get(slug='projet-1')
+        self.assertTrue(project.before_image)
+        # Black margins cropped away
+        self.assertLess(Image.open(project.featured_image.path).width, 80)
+        self.assertEqual(
+            GalleryImage.objects.get(title='Cuisine Design').image.name,
+            ProjectImage.objects.get(project__slug='projet-1', order=2).image.name,
+        )
+        self.assertIn('✗ Error copying gallery image', serial_output)
+
+    def test_max_dimension_downscales_imports(self):
+        self.run_import(1, '--max-dimension', '30')
+        self.assertLessEqual(max(Image.open(Project.objects.get(slug='projet-1').featured_image.path).size), 30)
+
+    def test_rows_are_written_in_bulk_with_their_side_effects(self):
+        output, _ = self.run_import(1)
+        self.assertRegex(output, r'📊 \d+ rows written in Ns \(N rows/s\)')
+        # Bulk-created rows still get their derivatives queued
+        names = list(ProjectImage.objects.values_list('image', flat=True))
+        names += GalleryImage.objects.values_list('image', flat=True)
+        queued = set(Job.objects.values_list('key', flat=True))
+        self.assertTrue(names)
+        self.assertTrue(all(f'image_derivatives:{name}' in queued for name in names))
+
+    def test_failed_project_is_rolled_back_entirely(self):
+        bulk_create = ProjectImage.objects.bulk_create
+
+        def fail_for_project_1(images, **kwargs):
+            if images and images[0].project.slug == 'projet-1':
+                raise RuntimeError('disk full')
+            return bulk_create(images, **kwargs)
+
+        with mock.patch.object(ProjectImage.objects, 'bulk_create', fail_for_project_1):
+            output, _ = self.run_import(1)
+        self.assertIn('✗ Project 1 not imported: disk full', output)
+        self.assertFalse(Project.objects.filter(slug='projet-1').exists())
+        self.assertTrue(ProjectImage.objects.filter(project__slug='projet-6').exists())
+
+    def test_dry_run_prints_the_plan_without_writing(self):
+        out = StringIO()
+        call_command('import_project_images', '--dry-run', '--workers', '2', stdout=out)
+        output = out.getvalue()
+        self.assertIn('+ projet-1 Rénovation Cuisine Moderne: create, 1 featured, 1 before, 2 gallery images', output)
+        self.assertIn('⚠ Folder 2a not found', output)
+        self.assertIn('9 images to process', output)
+        self.assertIn('18 rows to create, 0 rows to delete', output)
+        self.assertIn('not readable images: 6/broken.jpg', output)
+        self.assertIn('Estimated processing time', output)
+        self.assertFalse(Project.objects.exists())
+        self.assertFalse(Service.objects.exists())
+        self.assertFalse(Path(settings.MEDIA_ROOT, 'content').exists())
+
+    def test_manifest_describes_services_projects_and_heroes(self):
+        manifest = self.import_dir / 'projects.json'
+        manifest.write_text(json.dumps({
+            'services': {'cuisine': {'slug': 'cuisine', 'title': 'Cuisine'}},
+            'projects': [{'number': 12, 'title': 'Cuisine', 'service': 'cuisine', 'folders': {'after': '1a'}}],
+            'heroes': [{'folder': '1a', 'index': 1, 'title': 'Îlot', 'project': 'projet-12'}],
+        }))
+        call_command('import_project_images', '--manifest', str(manifest), stdout=StringIO())
+        project = Project.objects.get()
+        self.assertEqual((project.slug, project.service.slug), ('projet-12', 'cuisine'))
+        self.assertEqual(project.images.count(), 2)
+        self.assertEqual(GalleryImage.objects.get().linked_project, project)
+
+        manifest.write_text(json.dumps({'projects': [{'number': 1, 'title': 'Cuisine', 'service': 'cuisine'}]}))
+        with self.assertRaisesMessage(CommandError, 'unknown service "cuisine"'):
+            call_command('import_project_images', '--manifest', str(manifest), stdout=StringIO())
+
+    def test_incremental_import_skips_unchanged_images(self):
+        _, rows = self.run_import(1)
+        ids = sorted(Project.objects.values_list('pk', flat=True))
+        output, incremental_rows = self.run_import(1, '--incremental')
+        self.assertEqual(incremental_rows, rows)
+        self.assertEqual(sorted(Project.objects.values_list('pk', flat=True)), ids)
+        # Only the broken file, never recorded, is processed again
+        self.assertIn('8 unchanged images skipped', output)
+        self.assertIn('1 images processed, 0 changes', output)
+
+    def test_incremental_import_applies_only_the_diff(self):
+        self.run_import(1)
+        kept = ProjectImage.objects.get(project__slug='projet-1', order=1)
+        Image.new('RGB', (50, 50), (10, 200, 10)).save(self.import_dir / '1a' / 'IMG_1.jpg')
+        (self.import_dir / '1a' / 'IMG_2.jpg').unlink()
+
+        output, _ = self.run_import(1, '--incremental')
+        self.assertIn('2 images processed', output)
+        self.assertIn('~ projet-1 image 1: image', output)
+        self.assertIn('- projet-1 image 2', output)
+        self.assertIn('- hero image Cuisine Design', output)
+        updated = ProjectImage.objects.get(project__slug='projet-1', order=1)
+        self.assertEqual(updated.pk, kept.pk)
+        self.assertNotEqual(updated.image.name, kept.image.name)
+        self.assertFalse(GalleryImage.objects.filter(title='Cuisine Design').exists())
+        self.assertTrue(GalleryImage.objects.filter(title='Rénovation Moderne').exists())
+
+    def test_incremental_import_keeps_hand_added_images(self):
+        self.run_import(1)
+        project = Project.objects.get(slug='projet-1')
+        added = ProjectImage.objects.create(project=project, image='projects/gallery/ajout.jpg', order=5)
+        (self.import_dir / '1a' / 'IMG_2.jpg').unlink()
+
+        output, _ = self.run_import(1, '--incremental')
+        self.assertIn('- projet-1 image 2', output)
+        self.assertNotIn('image 5', output)
+        self.assertTrue(ProjectImage.objects.filter(pk=added.pk).exists())
+        self.assertEqual(list(project.images.values_list('order', flat=True)), [1, 5])
+
+
+class CropMarginsTests(TestCase):
+    def test_border_scan_finds_content_box(self):
+        img, expected = synthetic_screenshot(300, 600)
+        for strip_pixels in (64, 5000, STRIP_PIXELS):
+            with self.subTest(strip_pixels=strip_pixels):
+                self.assertEqual(MarginDetector(strip_pixels=strip_pixels).content_bbox(img), expected)
+
+    def test_crop_keeps_padding(self):
+        img, (left, top, right, bottom) = synthetic_screenshot(300, 600)
+        self.assertEqual(crop_margins(img).size, (right - left + 4, bottom - top + 4))
+
+    def test_other_modes_and_blank_images(self):
+        img = Image.new('L', (50, 40), 0)
+        img.paste(255, (10, 5, 20, 30))
+        self.assertEqual(MarginDetector().content_bbox(img), (10, 5, 20, 30))
+        rgba = Image.new('RGBA', (50, 40), (36, 37, 39, 0))
+        self.assertIsNone(MarginDetector().content_bbox(rgba))
+        self.assertIs(crop_margins(rgba), rgba)
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command('benchmark_crop', '--sizes', '120x240', '--repeat', '1', stdout=out)
+        self.assertIn('border scan', out.getvalue())
+        self.assertIn('(6, 15, 114, 225)', out.getvalue())
+
+
+class ImagingTests(TestCase):
+    def test_reduced_decoding_covers_the_requested_size(self):
+        for fmt in ('JPEG', 'PNG'):
+            buffer = BytesIO()
+            Image.new('RGB', (4000, 3000), (90, 160, 30)).save(buffer, fmt)
+            image = open_image(buffer, min_size=(900, 0))
+            self.assertGreaterEqual(image.width, 900, fmt)
+            self.assertLess(image.width, 2000, fmt)
+            self.assertEqual(image.width * 3, image.height * 4, fmt)
+
+    def test_exif_orientation_is_applied_once(self):
+        image = open_image(make_image(size=(4000, 3000), orientation=6), min_size=(0, 900))
+        self.assertEqual(image.size, (750, 1000))
+        self.assertNotIn(ExifTags.Base.Orientation, image.getexif())
+        self.assertEqual(open_image(make_image(size=(400, 300), orientation=6)).size, (300, 400))
+
+
+class FlakyEmailBackend(locmem.EmailBackend):
+    """In-memory backend counting opened sessions and failing `failures` sends"""
+    failures = 0
+    sessions = 0
+
+    def open(self):
+        type(self).sessions += 1
+        return super().open()
+
+    def send_messages(self, messages):
+        if type(self).failures:
+            type(self).failures -= 1
+            raise ConnectionError('SMTP server unavailable')
+        return super().send_messages(messages)
+
+
+@override_settings(
+    EMAIL_BACKEND='core.tests.FlakyEmailBackend', CONTACT_EMAIL='owner@example.com', OUTBOX_RETRY_DELAY=60,
+    # Admin pages render without collectstatic's manifest
+    STORAGES={**settings.STORAGES, 'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'}},
+)
+class ContactOutboxTests(TestCase):
+    def setUp(self):
+        FlakyEmailBackend.failures = FlakyEmailBackend.sessions = 0
+        memory_buckets.clear()
+
+    def post_message(self, **data):
+        return self.client.post('/api/contact/', {
+            'name': 'Client', 'email': 'client@example.com', 'message': 'Bonjour', **data,
+        })
+
+    def test_submission_only_queues_the_notification(self):
+        response = self.post_message(subject='Cuisine')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(mail.outbox, [])
+        email = OutboxEmail.objects.get()
+        self.assertEqual((email.recipient, email.status), ('owner@example.com', 'pending'))
+
+    @override_settings(CONTACT_EMAIL='')
+    def test_no_notification_without_a_configured_recipient(self):
+        with self.assertLogs('core.outbox', 'WARNING'):
+            self.assertEqual(self.post_message().status_code, 201)
+        self.assertTrue(ContactMessage.objects.exists())
+        self.assertFalse(OutboxEmail.objects.exists())
+
+    def test_worker_sends_a_batch_over_one_connection(self):
+        for subject in ('Cuisine', 'Salle de bain', 'Combles'):
+            self.post_message(subject=subject)
+        call_command('process_outbox', '--once', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(FlakyEmailBackend.sessions, 1)
+        self.assertEqual(mail.outbox[0].subject, 'Nouveau message de contact: Cuisine')
+        self.assertIn('Bonjour', mail.outbox[0].alternatives[0].content)
+        self.assertEqual(set(OutboxEmail.objects.values_list('status', flat=True)), {'sent'})
+
+    def test_failures_back_off_then_become_dead_letters(self):
+        self.post_message()
+        FlakyEmailBackend.failures = 10
+        call_command('process_outbox', '--once', stdout=StringIO())
+        email = OutboxEmail.objects.get()
+        self.assertEqual((email.status, email.attempts), ('pending', 1))
+        self.assertGreater(email.run_after, timezone.now())
+        self.assertIn('SMTP server unavailable', email.last_error)
+
+        OutboxEmail.objects.update(max_attempts=2, run_after=timezone.now())
+        call_command('process_outbox', '--once', stdout=StringIO())
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('dead', 2))
+
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        response = self.client.get('/admin/core/contactmessage/')
+        self.assertContains(response, 'Échec définitif')
+        self.client.post('/admin/core/contactmessage/', {
+            'action': 'resend_notifications', '_selected_action': [email.message_id],
+        })
+        FlakyEmailBackend.failures = 0
+        call_command('process_outbox', '--once', stdout=StringIO())
+        email.refresh_from_db()
+        self.assertEqual(email.status, 'sent')
+        self.assertEqual(len(mail.outbox), 1)
+
+
+@override_settings(CONTACT_THROTTLE_RATES={'ip': (2, 6), 'global': (3, 60)}, CONTACT_EMAIL='')
+class ContactThrottleTests(TestCase):
+    def setUp(self):
+        memory_buckets.clear()
+        cache.clear()
+
+    def post_message(self, ip='203.0.113.1', **headers):
+        return self.client.post('/api/contact/', {
+            'name': 'Client', 'email': 'client@example.com', 'message': 'Bonjour',
+        }, REMOTE_ADDR=ip, **headers)
+
+    def test_per_ip_bucket(self):
+        self.assertEqual([self.post_message().status_code for _ in range(3)], [201, 201, 429])
+        self.assertEqual(self.post_message(ip='203.0.113.2').status_code, 201)
+
+    def test_forged_forwarded_for_does_not_open_buckets(self):
+        statuses = [self.post_message(HTTP_X_FORWARDED_FOR=f'198.51.100.{i}').status_code for i in range(3)]
+        self.assertEqual(statuses, [201, 201, 429])
+
+    def test_forwarded_for_behind_trusted_proxy(self):
+        with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'NUM_PROXIES': 1}):
+            self.post_message(HTTP_X_FORWARDED_FOR='198.51.100.1')
+            self.post_message(HTTP_X_FORWARDED_FOR='198.51.100.1')
+            self.assertEqual(self.post_message(HTTP_X_FORWARDED_FOR='198.51.100.2').status_code, 201)
+
+    def test_rejected_requests_are_cheap_and_say_when_to_retry(self):
+        self.post_message()
+        self.post_message()
+        with self.assertNumQueries(0):
+            response = self.post_message()
+        self.assertEqual(response.status_code, 429)
+        # 6 tokens a minute: the next one comes within 10 seconds
+        self.assertIn(int(response['Retry-After']), range(1, 11))
+
+    def test_global_bucket_caps_distributed_bursts(self):
+        statuses = [self.post_message(ip=f'203.0.113.{i}').status_code for i in range(1, 5)]
+        self.assertEqual(statuses, [201, 201, 201, 429])
+
+    def test_buckets_refill(self):
+        buckets = [('ip', 2, 1), ('global', 10, 1)]
+        self.assertEqual(memory_buckets.consume(buckets, now=100), 0)
+        self.assertEqual(memory_buckets.consume(buckets, now=100), 0)
+        self.assertAlmostEqual(memory_buckets.consume(buckets, now=100.25), 0.75)
+        self.assertEqual(memory_buckets.consume(buckets, now=101), 0)
+
+    @override_settings(THROTTLE_BACKEND='cache')
+    def test_shared_cache_backend(self):
+        self.post_message()
+        self.post_message()
+        # Another process sees the same buckets
+        self.assertGreater(CacheTokenBuckets().consume([('contact:ip:203.0.113.1', 2, 0.1)]), 0)
+        self.assertEqual(self.post_message().status_code, 429)
+        self.assertEqual(memory_buckets.states, {})
+
+
+@override_settings(
+    STORAGES={**settings.STORAGES, 'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'}},
+)
+class AdminPerformanceTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        self.service = Service.objects.create(title="Cuisine", description="Description")
+        self.project = Project.objects.create(title="Projet", description="Description", service=self.service)
+
+    def add_rows(self, count):
+        start = Testimonial.objects.count()
+        for i in range(start, start + count):
+            project = Project.objects.create(title=f"Projet {i}", description="Description", service=self.service)
+            Testimonial.objects.create(client_name=f"Client {i}", content="Super", project=project)
+            GalleryImage.objects.create(title=f"Image {i}", image=make_image(size=(400, 200)), linked_project=project)
+            ProjectImage.objects.create(project=self.project, image=make_image(size=(400, 200)))
+        process_jobs()
+
+    def count_queries(self, url):
+        self.client.get(url)  # warm the per-process caches (content types, ...)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return len(queries)
+
+    def test_query_counts_do_not_grow_with_rows(self):
+        urls = [
+            '/admin/core/project/',
+            '/admin/core/testimonial/',
+            '/admin/core/galleryimage/',
+            f'/admin/core/project/{self.project.pk}/change/',
+        ]
+        self.add_rows(2)
+        few = [self.count_queries(url) for url in urls]
+        self.add_rows(4)
+        self.assertEqual([self.count_queries(url) for url in urls], few)
+        # Pinned so that a new per-page query is noticed
+        self.assertEqual(few, [7, 6, 8, 8])
+
+    def test_thumbnails_use_derivatives(self):
+        self.add_rows(1)
+        image = GalleryImage.objects.get()
+        thumbnail = ImageDerivative.objects.get(source=image.image.name, format='webp', width=320)
+        response = self.client.get('/admin/core/galleryimage/')
+        self.assertContains(response, thumbnail.file.url)
+        self.assertNotContains(response, f'src="{image.image.url}"')
+
+
+class ProjectSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.service = Service.objects.create(title="Salle de bain", description="Description")
+        cls.kitchen = Project.objects.create(
+            title="Rénovation cuisine", short_description="Cuisine ouverte", description="Plan de travail en chêne",
+            location="Évry",
+        )
+        cls.bathroom = Project.objects.create(
+            title="Douche à l'italienne", description="Rénovation complète avec faïence", service=cls.service,
+        )
+        cls.hidden = Project.objects.create(title="Rénovation cachée", description="Description", is_active=False)
+
+    def setUp(self):
+        cache.clear()
+
+    def search(self, query):
+        response = self.client.get('/api/projects/search/', {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return [project['slug'] for project in response.json()]
+
+    def test_accents_and_case_are_folded(self):
+        self.assertEqual(self.search('EVRY'), [self.kitchen.slug])
+        self.assertEqual(self.search('faience'), [self.bathroom.slug])
+
+    def test_every_word_must_match_as_a_prefix(self):
+        self.assertEqual(self.search('renov cuis'), [self.kitchen.slug])
+        self.assertEqual(self.search('salle bain'), [self.bathroom.slug])
+        self.assertEqual(self.search('cuisine faience'), [])
+
+    def test_title_matches_rank_first(self):
+        # The kitchen has "rénovation" in its title, the bathroom in its description only
+        self.assertEqual(self.search('rénovation'), [self.kitchen.slug, self.bathroom.slug])
+
+    def test_index_follows_changes(self):
+        self.bathroom.title = "Salle d'eau"
+        self.bathroom.save()
+        self.service.title = "Sanitaires"
+        self.service.save()
+        self.assertEqual(self.search('sanitaires eau'), [self.bathroom.slug])
+        self.assertEqual(self.search('douche'), [])
+
+        self.kitchen.is_active = False
+        self.kitchen.save()
+        self.assertEqual(self.search('cuisine'), [])
+        self.service.delete()
+        self.assertEqual(self.search('sanitaires'), [])
+        self.bathroom.delete()
+        self.assertEqual(search_project_ids('eau'), [])
+
+    def test_operators_are_matched_literally(self):
+        self.assertEqual(self.search('cuisine OR "douche" NEAR(*'), [])
+        self.assertEqual(self.client.get('/api/projects/search/', {'q': ' '}).status_code, 400)
+
+    def test_rebuild_command(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM core_project_search')
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('2 projects indexed', out.getvalue())
+        self.assertEqual(self.search('cuisine'), [self.kitchen.slug])
+
+
+class ListFilterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        kitchen = Service.objects.create(title="Cuisine", slug="cuisine", description="Description")
+        bathroom = Service.objects.create(title="Salle de bain", slug="salle-de-bain", description="Description")
+        for i in range(12):
+            Project.objects.create(
+                title=f"Projet {i}", description="Description", service=kitchen if i % 2 else bathroom,
+                location="Évry" if i % 3 == 0 else "Paris", has_before_after=i % 4 == 0,
+                completion_date=None if i == 0 else date(2020 + i % 4, 6, 1),
+            )
+        cls.project = Project.objects.get(title="Projet 3")
+        for i in range(4):
+            GalleryImage.objects.create(
+                title=f"Image {i}", image=f"gallery/{i}.jpg", category='hero' if i % 2 else 'showcase',
+                linked_project=cls.project if i < 3 else None,
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def titles(self, url, params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return sorted(item['title'] for item in response.json()['results'])
+
+    def test_project_filters_combine(self):
+        expected = sorted(
+            Project.objects.filter(
+                service__slug='cuisine', location='Évry', completion_date__year__gte=2021,
+            ).values_list('title', flat=True)
+        )
+        self.assertEqual(expected, ["Projet 3", "Projet 9"])
+        params = {'service': 'cuisine', 'location': 'Évry', 'year_min': 2021, 'year_max': 2023}
+        self.assertEqual(self.titles('/api/projects/', params), expected)
+        self.assertEqual(self.titles('/api/projects/', {'has_before_after': 'true', 'year_max': 2020}), ["Projet 4", "Projet 8"])
+        self.assertEqual(len(self.titles('/api/projects/', {'service': '', 'has_before_after': ''})), 10)
+
+    @mock.patch.object(KeysetPagination, 'page_size', 4)
+    def test_filters_keep_pagination_and_cache(self):
+        first = self.client.get('/api/projects/', {'service': 'salle-de-bain'})
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertIn('service=salle-de-bain', first.json()['next'])
+        second = self.client.get(first.json()['next']).json()
+        self.assertEqual(len(first.json()['results']) + len(second['results']), 6)
+        self.assertEqual(self.client.get('/api/projects/', {'service': 'salle-de-bain'})['X-Cache'], 'HIT')
+        self.assertEqual(self.client.get('/api/projects/', {'service': 'cuisine'})['X-Cache'], 'MISS')
+
+    def test_invalid_filters_are_rejected(self):
+        for params in [{'year_min': 'soon'}, {'year_min': 2024, 'year_max': 2020}, {'has_before_after': 'peut-être'}]:
+            response = self.client.get('/api/projects/', params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertTrue(set(response.json()) & set(params))
+        self.assertEqual(self.client.get('/api/gallery/', {'category': 'unknown'}).status_code, 400)
+
+    def test_gallery_filters(self):
+        self.assertEqual(self.titles('/api/gallery/', {'project': self.project.slug}), ["Image 0", "Image 1", "Image 2"])
+        self.assertEqual(self.titles('/api/gallery/', {'project': self.project.slug, 'category': 'hero'}), ["Image 1"])
+        self.assertEqual(self.titles('/api/gallery/', {'project': 'inconnu'}), [])
+
+
+class SparseFieldsetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        service = Service.objects.create(title="Cuisine", description="Description")
+        for i in range(5):
+            project = Project.objects.create(
+                title=f"Projet {i}", description="Longue description " * 50, service=service,
+                featured_image=f"projects/featured/{i}.jpg",
+            )
+            ProjectImage.objects.create(project=project, image=f"projects/gallery/{i}.jpg")
+        cls.project = project
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, url, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200)
+        project_queries = [query['sql'] for query in queries if 'FROM "core_project"' in query['sql']]
+        return response.json(), project_queries
+
+    def test_list_does_not_fetch_unused_columns(self):
+        payload, queries = self.get('/api/projects/')
+        self.assertEqual(len(payload['results']), 5)
+        self.assertNotIn('"core_project"."description"', queries[-1])
+        self.assertIn('"core_service"."title"', queries[-1])
+
+    def test_fields_restrict_items_and_columns(self):
+        _, all_queries = self.get('/api/projects/')
+        payload, queries = self.get('/api/projects/', {'fields': 'slug,title,featured_image_url'})
+        self.assertEqual(set(payload['results'][0]), {'slug', 'title', 'featured_image_url'})
+        self.assertEqual(len(queries), len(all_queries))
+        self.assertNotIn('core_service', queries[-1])
+        self.assertNotIn('"core_project"."location"', queries[-1])
+
+    def test_omit_and_compact(self):
+        url = f'/api/projects/{self.project.slug}/'
+        payload, queries = self.get(url, {'omit': 'description,images'})
+        self.assertNotIn('description', payload)
+        self.assertNotIn('images', payload)
+        self.assertIn('short_description', payload)
+        self.assertNotIn('"core_project"."description"', queries[-1])
+
+        payload, _ = self.get(url, {'compact': 'true'})
+        for name in ('featured_image', 'before_image', 'is_active', 'created_at', 'updated_at'):
+            self.assertNotIn(name, payload)
+        self.assertIn('featured_image_url', payload)
+        self.assertEqual(set(payload['images'][0]), {'id', 'image_url', 'image_srcset', 'caption', 'is_visible', 'order'})
+
+        services, _ = self.get('/api/services/', {'compact': '1', 'fields': 'title,is_active'})
+        self.assertEqual(services['results'][0], {'title': "Cuisine", 'is_active': True})
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.client.get('/api/projects/', {'fields': 'title,secret'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('secret', response.json()['fields'])
+        self.assertEqual(self.client.get('/api/gallery/', {'compact': 'maybe'}).status_code, 400)
+
+    def test_home_sections(self):
+        Testimonial.objects.create(client_name="Client", content="Parfait", rating=5)
+        Project.objects.update(is_featured=True)
+        payload, _ = self.get('/api/home/')
+        self.assertEqual(
+            set(payload), {'company_info', 'services', 'featured_projects', 'hero_images', 'testimonials'},
+        )
+
+        # Validators, projects, their derivatives and testimonials: other sections are not queried
+        with self.assertNumQueries(4):
+            payload, queries = self.get('/api/home/', {'fields': 'featured_projects,testimonials', 'compact': '1'})
+        self.assertEqual(set(payload), {'featured_projects', 'testimonials'})
+        project = payload['featured_projects'][0]
+        self.assertIn('featured_image_url', project)
+        for name in ('featured_image', 'is_active', 'created_at', 'updated_at'):
+            self.assertNotIn(name, project)
+        self.assertNotIn('created_at', payload['testimonials'][0])
+        self.assertNotIn('"core_project"."description"', queries[0])
+
+        payload, _ = self.get('/api/home/', {'omit': 'company_info,hero_images'})
+        self.assertEqual(set(payload), {'services', 'featured_projects', 'testimonials'})
+        self.assertIn('featured_image', payload['featured_projects'][0])
+
+        response = self.client.get('/api/home/', {'fields': 'services,title'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('title', response.json()['fields'])
+
+
+class JSONRendererTests(TestCase):
+    data = {
+        'date': date(2024, 5, 1),
+        'created_at': timezone.make_aware(datetime(2024, 5, 1, 12, 30, 15, 123456), datetime_timezone.utc),
+        'price': Decimal('12.50'),
+        'label': gettext_lazy("Date de réalisation"),
+        'id': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+        'text': "Cuisine\u2028ouverte",
+        1: [None, True, 1.5],
+    }
+
+    def test_output_matches_drf(self):
+        expected = JSONRenderer().render(self.data)
+        self.assertIn(b'"2024-05-01T12:30:15.123456Z"', expected)
+        self.assertEqual(FastJSONRenderer().render(self.data), expected)
+        with mock.patch('core.renderers.orjson', None):
+            self.assertEqual(FastJSONRenderer().render(self.data), expected)
+        indented = FastJSONRenderer().render(self.data, 'application/json; indent=2')
+        self.assertEqual(indented, JSONRenderer().render(self.data, 'application/json; indent=2'))
+
+    @skipIf(orjson is None, "orjson n'est pas installé")
+    def test_orjson_is_used_when_installed(self):
+        with mock.patch('core.renderers.orjson', wraps=orjson) as spy:
+            self.assertEqual(FastJSONRenderer().render(self.data), JSONRenderer().render(self.data))
+            self.assertEqual(FastJSONParser().parse(BytesIO(b'{"note": 5}')), {'note': 5})
+        spy.dumps.assert_called_once()
+        spy.loads.assert_called_once()
+
+    def test_parser(self):
+        body = '{"nom": "Évry", "valeurs": [1, 2.5, null]}'
+        expected = {'nom': "Évry", 'valeurs': [1, 2.5, None]}
+        self.assertEqual(FastJSONParser().parse(BytesIO(body.encode())), expected)
+        latin1 = FastJSONParser().parse(BytesIO(body.encode('latin-1')), parser_context={'encoding': 'latin-1'})
+        self.assertEqual(latin1, expected)
+        for parse in (FastJSONParser().parse, mock.patch('core.renderers.orjson', None)(FastJSONParser().parse)):
+            with self.assertRaises(ParseError):
+                parse(BytesIO(b'{"value": NaN}'))
+
+    def test_api_uses_fast_renderer(self):
+        response = self.client.options('/api/projects/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('application/json', response['Content-Type'])
+        memory_buckets.clear()
+        response = self.client.post(
+            '/api/contact/', data=b'{"name": "A", "email": "pas-un-email"}', content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('email', response.json())
+
+    def test_benchmark_json(self):
+        out = StringIO()
+        call_command('benchmark_json', '--projects', '2', '--images', '3', '--gallery', '5', '--repeat', '1', stdout=out)
+        self.assertIn('speedup', out.getvalue())
+        self.assertNotIn('differs', out.getvalue())
+        self.assertEqual(Project.objects.count(), 0)
@@ -0,0 +1,134 @@
+"""
+Token-bucket throttling of the contact form.
+
+Every client IP has its own bucket and all clients share a global one, so a
+burst spread over many addresses is capped too. The IP is REMOTE_ADDR, or
+the X-Forwarded-For entry added by the last of REST_FRAMEWORK['NUM_PROXIES']
+trusted proxies: a forged header does not open a new bucket. A bucket holds up to
+`capacity` tokens and regains `per_minute` tokens a minute; a request takes
+one token from each of its buckets, or none when one of them is empty, and
+is then answered 429 with a Retry-After header (time until the next token).
+
+Buckets are kept in process memory by default: a dict behind a lock, no I/O
+per check. With several Passenger processes each one then throttles on its
+own; THROTTLE_BACKEND = 'cache' keeps the buckets in the Django cache
+instead (file-based or memcached, shared by the processes). Cache updates
+are not atomic, so concurrent requests may overshoot a limit by a few
+tokens.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+
+# Buckets kept per process, the least recently used ones are dropped beyond this
+MAX_MEMORY_BUCKETS = 10000
+
+
+def refill(state, capacity, rate, now):
+    """Tokens in a bucket at `now`; a missing bucket is full"""
+    if state is None:
+        return capacity
+    tokens, updated = state
+    return min(capacity, tokens + max(0, now - updated) * rate)
+
+
+class TokenBuckets:
+    """Bucket algorithm; subclasses store the (tokens, timestamp) state of every key"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+
+    def load(self, keys):
+        raise NotImplementedError
+
+    def store(self, states, timeout):
+        raise NotImplementedError
+
+    def consume(self, buckets, now=None):
+        """
+        Take one token from every (key, capacity, tokens per second) bucket.
+        Returns 0 when taken, else the seconds until all of them have one.
+        """
+        now = time.time() if now is None else now
+        with self.lock:
+            previous = self.load([key for key, _, _ in buckets])
+            tokens = {key: refill(previous[key], capacity, rate, now) for key, capacity, rate in buckets}
+            wait = max((1 - tokens[key]) / rate for key, _, rate in buckets)
+            if wait > 0:
+                return wait
+            # Time for a drained bucket to be full again, after which it can be forgotten
+            timeout = max(capacity / rate for _, capacity, rate in buckets)
+            self.store({key: (tokens[key] - 1, now) for key in tokens}, timeout)
+            return 0
+
+
+class MemoryTokenBuckets(TokenBuckets):
+    """Buckets of the current process"""
+
+    def __init__(self, max_buckets=MAX_MEMORY_BUCKETS):
+        super().__init__()
+        self.max_buckets = max_buckets
+        self.states = OrderedDict()
+
+    def load(self, keys):
+        return {key: self.states.get(key) for key in keys}
+
+    def store(self, states, timeout):
+        for key, state in states.items():
+            self.states[key] = state
+            self.states.move_to_end(key)
+        while len(self.states) > self.max_buckets:
+            self.states.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.states.clear()
+
+
+class CacheTokenBuckets(TokenBuckets):
+    """Buckets stored in a Django cache, shared by every process using it"""
+
+    def __init__(self, alias='default', prefix='core:throttle:'):
+        super().__init__()
+        self.alias = alias
+        self.prefix = prefix
+
+    def load(self, keys):
+        found = caches[self.alias].get_many([self.prefix + key for key in keys])
+        return {key: found.get(self.prefix + key) for key in keys}
+
+    def store(self, states, timeout):
+        caches[self.alias].set_many({self.prefix + key: state for key, state in states.items()}, timeout)
+
+
+memory_buckets = MemoryTokenBuckets()
+cache_buckets = CacheTokenBuckets()
+
+
+def get_buckets():
+    return cache_buckets if settings.THROTTLE_BACKEND == 'cache' else memory_buckets
+
+
+class ContactThrottle(BaseThrottle):
+    """Per-IP and global token buckets of the contact form (settings.CONTACT_THROTTLE_RATES)"""
+    scope = 'contact'
+
+    def allow_request(self, request, view):
+        rates = settings.CONTACT_THROTTLE_RATES
+        buckets = [
+            (f'{self.scope}:ip:{self.get_ident(request)}', *self.bucket(rates['ip'])),
+            (f'{self.scope}:global', *self.bucket(rates['global'])),
+        ]
+        self.wait_seconds = get_buckets().consume(buckets)
+        return self.wait_seconds == 0
+
+    def bucket(self, rate):
+        capacity, per_minute = rate
+        return capacity, per_minute / 60
+
+    def wait(self):
+        return self.wait_seconds
@@ -2,7 +2,8 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     CompanyInfoViewSet, ServiceViewSet, ProjectViewSet,
-    TestimonialViewSet, ContactMessageViewSet, GalleryImageViewSet
+    TestimonialViewSet, ContactMessageViewSet, GalleryImageViewSet,
+    HomeViewSet
 )
 
 router = DefaultRouter()
@@ -12,6 +13,7 @@ router.register(r'projects', ProjectViewSet, basename='project')
 router.register(r'testimonials', TestimonialViewSet, basename='testimonial')
 router.register(r'contact', ContactMessageViewSet, basename='contact')
 router.register(r'gallery', GalleryImageViewSet, basename='gallery')
+router.register(r'home', HomeViewSet, basename='home')
 
 urlpatterns = [
     path('', include(router.urls)),
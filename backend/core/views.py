@@ -1,57 +1,88 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from django.conf import settings
 from django.shortcuts import get_object_or_404
-from .models import CompanyInfo, Service, Project, Testimonial, ContactMessage, GalleryImage
+from django.db.models import Prefetch
+from .cache import CachedResponseMixin
+from .conditional import ConditionalGetMixin
+from .fieldsets import SparseFieldsetMixin, parse_fieldset, select_sections, serialized_queryset
+from .filters import GalleryImageFilter, ProjectFilter, QueryParamFilterBackend
+from .outbox import queue_contact_notification
+from .pagination import KeysetOrPageNumberPagination
+from .snapshots import SnapshotMixin
+from .search import search_project_ids
+from .throttling import ContactThrottle
+from .models import (
+    CompanyInfo, Service, Project, ProjectImage, Testimonial, ContactMessage, GalleryImage, ImageDerivative
+)
 from .serializers import (
     CompanyInfoSerializer, ServiceSerializer, 
     ProjectListSerializer, ProjectDetailSerializer,
     TestimonialSerializer, ContactMessageSerializer, GalleryImageSerializer
 )
-from django.conf import settings
-from django.core.mail import send_mail, BadHeaderError
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
+from django.db import transaction
 
 
-class CompanyInfoViewSet(viewsets.ReadOnlyModelViewSet):
+class CompanyInfoViewSet(SnapshotMixin, CachedResponseMixin, ConditionalGetMixin, SparseFieldsetMixin,
+                         viewsets.ReadOnlyModelViewSet):
     """
     API endpoint for company information.
     Only GET requests are allowed (read-only).
     """
     queryset = CompanyInfo.objects.all()
+    conditional_models = (CompanyInfo,)
     serializer_class = CompanyInfoSerializer
     
     def list(self, request):
         """Return the single company info instance"""
-        company_info = CompanyInfo.objects.first()
+        company_info = self.get_queryset().first()
         if company_info:
             serializer = self.get_serializer(company_info)
             return Response(serializer.data)
         return Response({}, status=status.HTTP_404_NOT_FOUND)
 
 
-class ServiceViewSet(viewsets.ReadOnlyModelViewSet):
+class ServiceViewSet(SnapshotMixin, CachedResponseMixin, ConditionalGetMixin, SparseFieldsetMixin,
+                     viewsets.ReadOnlyModelViewSet):
     """
     API endpoint for services.
     list: Get all active services
     retrieve: Get a specific service by slug
     """
     queryset = Service.objects.filter(is_active=True)
+    conditional_models = (Service,)
     serializer_class = ServiceSerializer
     lookup_field = 'slug'
 
 
-class ProjectViewSet(viewsets.ReadOnlyModelViewSet):
+class ProjectViewSet(SnapshotMixin, CachedResponseMixin, ConditionalGetMixin, SparseFieldsetMixin,
+                     viewsets.ReadOnlyModelViewSet):
     """
     API endpoint for projects.
-    list: Get all active projects
+    list: Get all active projects, filtered by service, location, completion year
+          and before/after availability (see core/filters.py)
     retrieve: Get a specific project by slug with full details
     featured: Get featured projects only
+    search: Full-text search of projects (?q=), best matches first
     """
-    queryset = Project.objects.filter(is_active=True)
+    queryset = Project.objects.filter(is_active=True).select_related('service')
+    conditional_models = (Project, Service, ProjectImage, ImageDerivative)
+    pagination_class = KeysetOrPageNumberPagination
+    filter_backends = [QueryParamFilterBackend]
+    filter_class = ProjectFilter
     lookup_field = 'slug'
     
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'retrieve':
+            # Only visible images are exposed, fetched in a single query
+            queryset = queryset.prefetch_related(
+                Prefetch('images', queryset=ProjectImage.objects.filter(is_visible=True))
+            )
+        return queryset
+    
     def get_serializer_class(self):  # type: ignore[override]
         if self.action == 'retrieve':
             return ProjectDetailSerializer
@@ -60,17 +91,32 @@ class ProjectViewSet(viewsets.ReadOnlyModelViewSet):
     @action(detail=False, methods=['get'])
     def featured(self, request):
         """Get only featured projects"""
-        featured_projects = self.queryset.filter(is_featured=True)
-        serializer = ProjectListSerializer(featured_projects, many=True)
+        featured_projects = self.get_queryset().filter(is_featured=True)
+        serializer = self.get_serializer(featured_projects, many=True)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """Search projects by title, descriptions, location and service title"""
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            raise ValidationError({'q': 'Ce paramètre est requis.'})
+        ids = search_project_ids(query, limit=settings.SEARCH_MAX_RESULTS)
+        projects = self.get_queryset().in_bulk(ids)
+        results = [projects[pk] for pk in ids if pk in projects]
+        serializer = self.get_serializer(results, many=True)
         return Response(serializer.data)
 
 
-class TestimonialViewSet(viewsets.ReadOnlyModelViewSet):
+class TestimonialViewSet(SnapshotMixin, CachedResponseMixin, ConditionalGetMixin, SparseFieldsetMixin,
+                         viewsets.ReadOnlyModelViewSet):
     """
     API endpoint for testimonials.
     list: Get all active testimonials
     """
-    queryset = Testimonial.objects.filter(is_active=True)
+    queryset = Testimonial.objects.filter(is_active=True).select_related('project')
+    conditional_models = (Testimonial, Project)
+    pagination_class = KeysetOrPageNumberPagination
     serializer_class = TestimonialSerializer
 
 
@@ -82,52 +128,83 @@ class ContactMessageViewSet(viewsets.ModelViewSet):
     queryset = ContactMessage.objects.all()
     serializer_class = ContactMessageSerializer
     http_method_names = ['post']  # Only allow POST requests
+    # Checked in memory before the serializer runs (429 + Retry-After when exhausted)
+    throttle_classes = [ContactThrottle]
     
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         self.perform_create(serializer)
-
-        # Send notification email to site owner (non-blocking)
-        try:
-            owner_email = getattr(settings, 'SITE_OWNER_EMAIL', None)
-            if owner_email:
-                data = serializer.validated_data
-                subject = f"Nouveau message de contact: {data.get('subject') or 'Sans sujet'}"
-                # Render a simple HTML email (fallback to plain text)
-                html_message = render_to_string('emails/new_contact.html', {'data': data})
-                plain_message = strip_tags(html_message) if html_message else data.get('message', '')
-                send_mail(
-                    subject=subject,
-                    message=plain_message,
-                    from_email=getattr(settings, 'DEFAULT_FROM_EMAIL', None),
-                    recipient_list=[owner_email],
-                    html_message=html_message if html_message else None,
-                    fail_silently=True,
-                )
-        except BadHeaderError:
-            # Don't fail the request if email headers are bad
-            pass
-
         return Response(
             {'message': 'Votre message a été envoyé avec succès. Nous vous recontacterons bientôt.'},
             status=status.HTTP_201_CREATED
         )
 
+    def perform_create(self, serializer):
+        # The notification email is sent by the `process_outbox` worker
+        with transaction.atomic():
+            queue_contact_notification(serializer.save())
 
-class GalleryImageViewSet(viewsets.ReadOnlyModelViewSet):
+
+class GalleryImageViewSet(SnapshotMixin, CachedResponseMixin, ConditionalGetMixin, SparseFieldsetMixin,
+                          viewsets.ReadOnlyModelViewSet):
     """
     API endpoint for gallery images.
-    list: Get all active gallery images
+    list: Get all active gallery images, filtered by category and linked project
     hero: Get hero images for homepage
     """
-    queryset = GalleryImage.objects.filter(is_active=True)
+    queryset = GalleryImage.objects.filter(is_active=True).select_related('linked_project')
+    conditional_models = (GalleryImage, Project, ImageDerivative)
+    pagination_class = KeysetOrPageNumberPagination
+    filter_backends = [QueryParamFilterBackend]
+    filter_class = GalleryImageFilter
     serializer_class = GalleryImageSerializer
     
     @action(detail=False, methods=['get'])
     def hero(self, request):
         """Get only hero images for homepage"""
-        hero_images = self.queryset.filter(category='hero')
-        serializer = self.get_serializer(hero_images, many=True, context={'request': request})
+        hero_images = self.get_queryset().filter(category='hero')
+        serializer = self.get_serializer(hero_images, many=True)
         return Response(serializer.data)
 
+
+class HomeViewSet(SnapshotMixin, CachedResponseMixin, ConditionalGetMixin, viewsets.ViewSet):
+    """
+    API endpoint aggregating everything the homepage needs.
+    list: Get company info, active services, featured projects,
+          hero images and active testimonials in a single response
+    """
+    conditional_models = (CompanyInfo, Service, Project, GalleryImage, Testimonial, ImageDerivative)
+
+    def get_sections(self):
+        """(name, serializer class, queryset, many) of each section of the payload"""
+        return [
+            ('company_info', CompanyInfoSerializer, CompanyInfo.objects.all(), False),
+            ('services', ServiceSerializer, Service.objects.filter(is_active=True), True),
+            ('featured_projects', ProjectListSerializer,
+             Project.objects.filter(is_active=True, is_featured=True).select_related('service'), True),
+            ('hero_images', GalleryImageSerializer,
+             GalleryImage.objects.filter(is_active=True, category='hero').select_related('linked_project'), True),
+            ('testimonials', TestimonialSerializer,
+             Testimonial.objects.filter(is_active=True).select_related('project'), True),
+        ]
+
+    def list(self, request):
+        """Return the homepage payload using one query per requested section"""
+        sections = self.get_sections()
+        names, fieldset = select_sections(
+            parse_fieldset(request.query_params), [name for name, *_ in sections],
+        )
+        context = {'request': request, 'fieldset': fieldset}
+        data = {}
+        for name, serializer_class, queryset, many in sections:
+            if name not in names:
+                continue
+            queryset = serialized_queryset(queryset, serializer_class(context=context))
+            if many:
+                data[name] = serializer_class(queryset, many=True, context=context).data
+            else:
+                instance = queryset.first()
+                data[name] = serializer_class(instance, context=context).data if instance else None
+        return Response(data)
+
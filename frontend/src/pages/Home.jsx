@@ -29,13 +29,7 @@ import LightbulbIcon from '@mui/icons-material/Lightbulb';
 import BuildIcon from '@mui/icons-material/Build';
 import PaletteIcon from '@mui/icons-material/Palette';
 import ConstructionIcon from '@mui/icons-material/Construction';
-import { 
-  getCompanyInfo, 
-  getServices, 
-  getFeaturedProjects, 
-  getTestimonials,
-  getHeroImages
-} from '../services/api';
+import { getHomeData } from '../services/api';
 import { siteConfig } from '../config/site';
 
 const Home = () => {
@@ -62,18 +56,12 @@ const Home = () => {
     
     const fetchData = async () => {
       try {
-        const [companyData, servicesData, projectsData, testimonialsData, heroData] = await Promise.all([
-          getCompanyInfo(),
-          getServices(),
-          getFeaturedProjects(),
-          getTestimonials(),
-          getHeroImages().catch(() => []), // Gallery is optional
-        ]);
-        setCompanyInfo(companyData);
-        setServices(servicesData.results || servicesData);
-        setProjects(projectsData.results || projectsData);
-        setTestimonials(testimonialsData.results || testimonialsData);
-        setHeroImages(heroData || []);
+        const homeData = await getHomeData();
+        setCompanyInfo(homeData.company_info);
+        setServices(homeData.services || []);
+        setProjects(homeData.featured_projects || []);
+        setTestimonials(homeData.testimonials || []);
+        setHeroImages(homeData.hero_images || []);
       } catch (error) {
         console.error('Error fetching data:', error);
       } finally {
@@ -24,12 +24,21 @@ import { siteConfig } from '../config/site';
 
 const Projects = () => {
   const theme = useTheme();
-  const [projects, setProjects] = useState([]);
   const [filteredProjects, setFilteredProjects] = useState([]);
   const [loading, setLoading] = useState(true);
   const [activeFilter, setActiveFilter] = useState('Tout');
   
-  const filters = ['Tout', 'Cuisine', 'Salle de bain', 'Rangement', 'Autre'];
+  // Service slug of each filter, filtering is done by the API
+  const filterServices = {
+    'Tout': null,
+    'Cuisine': 'cuisine',
+    'Salle de bain': 'salle-de-bain',
+    'Rangement': 'rangement',
+    'Autre': 'renovation-generale',
+  };
+  const filters = Object.keys(filterServices);
+  // Only what the cards show
+  const cardFields = 'id,slug,title,short_description,location,completion_date,featured_image_url,service_name,is_featured';
   
   // Helper function to get full image URL
   const getImageUrl = (imagePath) => {
@@ -43,10 +52,12 @@ const Projects = () => {
 
   useEffect(() => {
     document.title = `Réalisations - ${siteConfig.siteName}`;
-    
-    getProjects()
+  }, []);
+
+  useEffect(() => {
+    const service = filterServices[activeFilter];
+    getProjects(service ? { service, fields: cardFields } : { fields: cardFields })
       .then(data => {
-        setProjects(data.results || data);
         setFilteredProjects(data.results || data);
         setLoading(false);
       })
@@ -54,19 +65,11 @@ const Projects = () => {
         console.error('Error fetching projects:', error);
         setLoading(false);
       });
-  }, []);
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [activeFilter]);
 
   const handleFilter = (filter) => {
     setActiveFilter(filter);
-    if (filter === 'Tout') {
-      setFilteredProjects(projects);
-    } else {
-      const filtered = projects.filter(project => 
-        project.service_name?.toLowerCase().includes(filter.toLowerCase()) ||
-        project.title?.toLowerCase().includes(filter.toLowerCase())
-      );
-      setFilteredProjects(filtered);
-    }
   };
 
   if (loading) {
@@ -8,6 +8,12 @@ const api = axios.create({
   },
 });
 
+// Homepage (company info, services, featured projects, hero images, testimonials)
+export const getHomeData = async () => {
+  const response = await api.get('/home/');
+  return response.data;
+};
+
 // Company Info
 export const getCompanyInfo = async () => {
   const response = await api.get('/company-info/');
@@ -31,6 +37,11 @@ export const getProjects = async (params = {}) => {
   return response.data;
 };
 
+export const searchProjects = async (query) => {
+  const response = await api.get('/projects/search/', { params: { q: query } });
+  return response.data;
+};
+
 export const getFeaturedProjects = async () => {
   const response = await api.get('/projects/featured/');
   return response.data;